@@ -14,11 +14,16 @@ import voluptuous as vol
 from homeassistant import (
     core, config as conf_util, loader, components as core_components)
 from homeassistant.components import persistent_notification
-from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
-from homeassistant.setup import async_setup_component
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, PLATFORM_FORMAT
+from homeassistant.helpers import config_per_platform
+from homeassistant.setup import (
+    async_setup_component, DATA_REQUIREMENTS, DATA_SETUP_TIME)
 from homeassistant.util.logging import AsyncHandler
-from homeassistant.util.package import async_get_user_site, get_user_site
-from homeassistant.util.yaml import clear_secret_cache
+from homeassistant.util.package import (
+    async_get_user_site, get_user_site, load_requirements_cache,
+    save_requirements_cache)
+from homeassistant.util.yaml import (
+    clear_secret_cache, load_yaml_cache, save_yaml_cache)
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.signal import async_register_signal_handling
 
@@ -26,6 +31,12 @@ _LOGGER = logging.getLogger(__name__)
 
 ERROR_LOG_FILENAME = 'home-assistant.log'
 
+# Requirements met in the current environment, to skip checking them
+REQUIREMENTS_CACHE_FILE = '.requirements.json'
+
+# Parsed YAML files, to only parse the changed files at start
+YAML_CACHE_FILE = '.yaml_cache'
+
 # hass.data key for logging information.
 DATA_LOGGING = 'logging'
 
@@ -127,6 +138,15 @@ def async_from_config_dict(config: Dict[str, Any],
     components = set(key.split(' ')[0] for key in config.keys()
                      if key != core.DOMAIN)
 
+    if not skip_pip:
+        requirements_path = hass.config.path(REQUIREMENTS_CACHE_FILE)
+        requirements_met = yield from hass.async_add_job(
+            load_requirements_cache, requirements_path)
+        cached_requirements = set(requirements_met)
+        hass.data[DATA_REQUIREMENTS] = requirements_met
+
+    yield from async_preload_components(hass, config, components)
+
     # setup components
     # pylint: disable=not-an-iterable
     res = yield from core_components.async_setup(hass, config)
@@ -155,13 +175,75 @@ def async_from_config_dict(config: Dict[str, Any],
 
     yield from hass.async_block_till_done()
 
+    if not skip_pip and requirements_met != cached_requirements:
+        yield from hass.async_add_job(
+            save_requirements_cache, requirements_path, requirements_met)
+
     stop = time()
+    async_log_setup_times(hass)
     _LOGGER.info("Home Assistant initialized in %.2fs", stop-start)
 
     async_register_signal_handling(hass)
     return hass
 
 
+@asyncio.coroutine
+def async_preload_components(hass: core.HomeAssistant,
+                             config: Dict[str, Any], components) -> None:
+    """Import the configured components, their platforms and dependencies.
+
+    The modules are imported in the executor, setup will find them in the
+    cache of the loader.
+    This method is a coroutine.
+    """
+    start = time()
+    preloaded = set()
+    pending = set(components)
+
+    while pending:
+        names = list(pending)
+        preloaded.update(names)
+
+        modules = yield from asyncio.gather(*[
+            hass.async_add_job(loader.preload_component, name)
+            for name in names], loop=hass.loop, return_exceptions=True)
+
+        pending = set()
+
+        for name, module in zip(names, modules):
+            # Failures are logged when the component is set up
+            if module is None or isinstance(module, Exception):
+                continue
+
+            pending.update(getattr(module, 'DEPENDENCIES', []))
+
+            if '.' in name:
+                continue
+
+            for platform, _ in config_per_platform(config, name):
+                if isinstance(platform, str):
+                    pending.add(PLATFORM_FORMAT.format(name, platform))
+
+        pending -= preloaded
+
+    _LOGGER.info("Imported %d components and platforms in %.2fs",
+                 len(preloaded), time() - start)
+
+
+@core.callback
+def async_log_setup_times(hass: core.HomeAssistant) -> None:
+    """Log how long the setup of each component took, slowest first."""
+    setup_time = hass.data.get(DATA_SETUP_TIME)
+
+    if not setup_time:
+        return
+
+    _LOGGER.info("Setup times of components:\n%s", '\n'.join(
+        '{:>8.2f}s  {}'.format(seconds, domain) for domain, seconds
+        in sorted(setup_time.items(), key=lambda item: item[1],
+                  reverse=True)))
+
+
 def from_config_file(config_path: str,
                      hass: Optional[core.HomeAssistant]=None,
                      verbose: bool=False,
@@ -204,9 +286,16 @@ def async_from_config_file(config_path: str,
 
     async_enable_logging(hass, verbose, log_rotate_days, log_file)
 
+    def load_config():
+        """Load the configuration using the cache of parsed files."""
+        cache_path = hass.config.path(YAML_CACHE_FILE)
+        load_yaml_cache(cache_path)
+        config_dict = conf_util.load_yaml_config_file(config_path)
+        save_yaml_cache(cache_path)
+        return config_dict
+
     try:
-        config_dict = yield from hass.async_add_job(
-            conf_util.load_yaml_config_file, config_path)
+        config_dict = yield from hass.async_add_job(load_config)
     except HomeAssistantError as err:
         _LOGGER.error("Error loading %s: %s", config_path, err)
         return None
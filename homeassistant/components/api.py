@@ -23,6 +23,7 @@ from homeassistant.const import (
     URL_API_STATES, URL_API_STATES_ENTITY, URL_API_STREAM, URL_API_TEMPLATE,
     __version__)
 from homeassistant.exceptions import TemplateError
+from homeassistant.helpers.entity_component import async_poll_stats
 from homeassistant.helpers.state import AsyncTrackStates
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.helpers import template
@@ -51,6 +52,8 @@ def setup(hass, config):
     hass.http.register_view(APIDomainServicesView)
     hass.http.register_view(APIComponentsView)
     hass.http.register_view(APITemplateView)
+    hass.http.register_view(APITemplateStatsView)
+    hass.http.register_view(APIPollStatsView)
 
     log_path = hass.data.get(DATA_LOGGING, None)
     if log_path:
@@ -357,6 +360,32 @@ class APITemplateView(HomeAssistantView):
                                      HTTP_BAD_REQUEST)
 
 
+class APITemplateStatsView(HomeAssistantView):
+    """View to get the render statistics of the templates."""
+
+    url = '/api/template_stats'
+    name = "api:template-stats"
+
+    @ha.callback
+    def get(self, request):
+        """Return the render counts and times, slowest first."""
+        return self.json(
+            template.async_render_stats(request.app['hass']))
+
+
+class APIPollStatsView(HomeAssistantView):
+    """View to get the polling statistics of the entity platforms."""
+
+    url = '/api/poll_stats'
+    name = "api:poll-stats"
+
+    @ha.callback
+    def get(self, request):
+        """Return the poll latencies and overruns by domain and platform."""
+        return self.json(
+            async_poll_stats(request.app['hass']))
+
+
 @asyncio.coroutine
 def async_services_json(hass):
     """Generate services data to JSONify."""
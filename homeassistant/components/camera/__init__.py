@@ -50,6 +50,17 @@ STATE_IDLE = 'idle'
 DEFAULT_CONTENT_TYPE = 'image/jpeg'
 ENTITY_IMAGE_URL = '/api/camera_proxy/{0}?token={1}'
 
+DATA_FRAME_BROKERS = 'camera_frame_brokers'
+
+# Default seconds between two frames of an MJPEG stream
+FRAME_INTERVAL = 0.5
+
+# Seconds to wait for an image from a camera
+FRAME_TIMEOUT = 10
+
+# Number of frames used to compute the frame rate
+FPS_WINDOW = 20
+
 TOKEN_CHANGE_INTERVAL = timedelta(minutes=5)
 _RND = SystemRandom()
 
@@ -99,6 +110,23 @@ def async_get_image(hass, entity_id, timeout=10):
         raise HomeAssistantError(
             "No entity '{0}' for grab a image".format(entity_id))
 
+    # Share the frames of the cameras of this instance
+    brokers = hass.data.get(DATA_FRAME_BROKERS)
+    broker = brokers.async_get(entity_id) if brokers is not None else None
+
+    if broker is not None:
+        try:
+            with async_timeout.timeout(timeout, loop=hass.loop):
+                image = yield from broker.async_get_frame()
+        except asyncio.TimeoutError:
+            raise HomeAssistantError(
+                "Timeout on grab a image from {0}".format(entity_id))
+
+        if not image:
+            raise HomeAssistantError(
+                "No image from {0}".format(entity_id))
+        return image
+
     url = "{0}{1}".format(
         hass.config.api.base_url,
         state.attributes.get(ATTR_ENTITY_PICTURE)
@@ -123,9 +151,12 @@ def async_get_image(hass, entity_id, timeout=10):
 def async_setup(hass, config):
     """Set up the camera component."""
     component = EntityComponent(_LOGGER, DOMAIN, hass, SCAN_INTERVAL)
+    brokers = hass.data[DATA_FRAME_BROKERS] = FrameBrokers(
+        hass, component.entities)
 
     hass.http.register_view(CameraImageView(component.entities))
     hass.http.register_view(CameraMjpegStream(component.entities))
+    hass.http.register_view(CameraStatsView(brokers))
 
     yield from component.async_setup(config)
 
@@ -175,7 +206,8 @@ def async_setup(hass, config):
                     "Can't write %s, no access to path!", snapshot_file)
                 continue
 
-            image = yield from camera.async_camera_image()
+            image = yield from brokers.async_get(
+                camera.entity_id).async_get_frame()
 
             def _write_image(to_file, image_data):
                 """Executor helper to write image."""
@@ -226,6 +258,11 @@ class Camera(Entity):
         """Return true if the device is recording."""
         return False
 
+    @property
+    def frame_interval(self):
+        """Return the minimum seconds between two frames of a stream."""
+        return FRAME_INTERVAL
+
     @property
     def brand(self):
         """Return the camera brand."""
@@ -256,8 +293,16 @@ class Camera(Entity):
     def handle_async_mjpeg_stream(self, request):
         """Generate an HTTP MJPEG stream from camera images.
 
+        The images are shared with the other streams of the camera. The
+        optional fps query parameter lowers the frame rate of the stream.
+
         This method must be run in the event loop.
         """
+        try:
+            fps = float(request.query.get('fps', 0))
+        except ValueError:
+            fps = 0
+
         response = web.StreamResponse()
 
         response.content_type = ('multipart/x-mixed-replace; '
@@ -273,32 +318,34 @@ class Camera(Entity):
                     self.content_type, len(img_bytes)),
                 'utf-8') + img_bytes + b'\r\n')
 
+        broker = self.hass.data[DATA_FRAME_BROKERS].async_get(self.entity_id)
+        subscription = broker.async_subscribe(1 / fps if fps > 0 else None)
         last_image = None
 
         try:
             while True:
-                img_bytes = yield from self.async_camera_image()
+                img_bytes = yield from subscription.queue.get()
                 if not img_bytes:
                     break
 
-                if img_bytes and img_bytes != last_image:
-                    write(img_bytes)
+                write(img_bytes)
 
-                    # Chrome seems to always ignore first picture,
-                    # print it twice.
-                    if last_image is None:
-                        write(img_bytes)
+                # Chrome seems to always ignore first picture,
+                # print it twice.
+                if last_image is None:
+                    write(img_bytes)
 
-                    last_image = img_bytes
-                    yield from response.drain()
+                last_image = img_bytes
 
-                yield from asyncio.sleep(.5)
+                # Frames are dropped while a slow client is written to
+                yield from response.drain()
 
         except asyncio.CancelledError:
             _LOGGER.debug("Stream closed by frontend.")
             response = None
 
         finally:
+            broker.async_unsubscribe(subscription)
             if response is not None:
                 yield from response.write_eof()
 
@@ -353,6 +400,221 @@ class Camera(Entity):
                 _RND.getrandbits(256).to_bytes(32, 'little')).hexdigest())
 
 
+class FrameSubscription(object):
+    """Representation of a stream receiving the frames of a camera."""
+
+    __slots__ = ['interval', 'queue', 'last_frame', 'last_time']
+
+    def __init__(self, interval, loop):
+        """Initialize the subscription."""
+        self.interval = interval
+        self.queue = asyncio.Queue(maxsize=1, loop=loop)
+        self.last_frame = None
+        self.last_time = None
+
+
+class FrameBroker(object):
+    """Fetch the images of a camera once for all its consumers.
+
+    Streams subscribe to the frames and only keep the newest frame they
+    have not sent yet, older frames are dropped for slow clients. Single
+    images are served from the frames while streaming and concurrent
+    requests share the same fetch.
+    """
+
+    def __init__(self, hass, camera):
+        """Initialize the broker."""
+        self.hass = hass
+        self.camera = camera
+        self.frame = None
+        self.frame_time = None
+        self.frames = 0
+        self.dropped = 0
+        self.errors = 0
+        self._frame_times = collections.deque(maxlen=FPS_WINDOW)
+        self._subscriptions = []
+        self._published = None
+        self._fetch = None
+        self._stream = None
+
+    @property
+    def fps(self):
+        """Return the recent frame rate of the streams."""
+        times = self._frame_times
+        if self._stream is None or len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    @asyncio.coroutine
+    def async_get_frame(self):
+        """Return an image of the camera.
+
+        While streaming the last frame is returned, otherwise a new image is
+        fetched or the image being fetched for another consumer.
+        """
+        if self._stream is not None and self.frame is not None and \
+                self.hass.loop.time() - self.frame_time <= \
+                self.camera.frame_interval:
+            return self.frame
+
+        return (yield from self._async_fetch_shared())
+
+    @asyncio.coroutine
+    def _async_fetch_shared(self):
+        """Fetch an image or wait for the image being fetched."""
+        if self._fetch is None:
+            self._fetch = self.hass.async_add_job(self._async_fetch())
+
+        # A cancelled consumer must not cancel the fetch of the others
+        return (yield from asyncio.shield(self._fetch, loop=self.hass.loop))
+
+    @asyncio.coroutine
+    def _async_fetch(self):
+        """Fetch an image from the camera."""
+        loop = self.hass.loop
+
+        try:
+            with async_timeout.timeout(FRAME_TIMEOUT, loop=loop):
+                image = yield from self.camera.async_camera_image()
+        except asyncio.TimeoutError:
+            self.errors += 1
+            raise
+        finally:
+            self._fetch = None
+
+        if image:
+            self.frame = image
+            self.frame_time = loop.time()
+            self.frames += 1
+            self._frame_times.append(self.frame_time)
+
+        return image
+
+    @callback
+    def async_subscribe(self, interval=None):
+        """Subscribe a stream to the frames, at most one every interval."""
+        interval = max(interval or 0, self.camera.frame_interval)
+        subscription = FrameSubscription(interval, self.hass.loop)
+        self._subscriptions.append(subscription)
+
+        if self._stream is None:
+            self._frame_times.clear()
+            self._stream = self.hass.async_add_job(self._async_stream())
+
+        return subscription
+
+    @callback
+    def async_unsubscribe(self, subscription):
+        """Stop passing frames to a stream."""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+        if not self._subscriptions and self._stream is not None:
+            self._stream.cancel()
+            self._stream = None
+
+    @asyncio.coroutine
+    def _async_stream(self):
+        """Fetch frames while streams are subscribed."""
+        loop = self.hass.loop
+
+        while self._subscriptions:
+            start = loop.time()
+
+            try:
+                image = yield from self._async_fetch_shared()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception(
+                    "Error on receive image from %s", self.camera.entity_id)
+                self.errors += 1
+                image = None
+
+            self._async_publish(image)
+
+            if not image:
+                # End the streams like a camera without images
+                self._subscriptions = []
+                self._published = None
+                self._stream = None
+                return
+
+            interval = min(subscription.interval
+                           for subscription in self._subscriptions)
+            yield from asyncio.sleep(
+                max(interval - (loop.time() - start), 0), loop=loop)
+
+    @callback
+    def _async_publish(self, image):
+        """Pass an image to the streams that are due a new frame."""
+        now = self.hass.loop.time()
+
+        # Compare the image once, the streams compare by identity
+        if image and image == self._published:
+            image = self._published
+        self._published = image
+
+        for subscription in self._subscriptions:
+            if image and image is subscription.last_frame:
+                continue
+
+            # Allow some jitter in the fetch times of the broker
+            if image and subscription.last_frame is not None and \
+                    now - subscription.last_time < \
+                    subscription.interval * 0.9:
+                continue
+
+            queue = subscription.queue
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+
+            queue.put_nowait(image)
+            subscription.last_frame = image
+            subscription.last_time = now
+
+    @callback
+    def async_as_dict(self):
+        """Return the statistics of the broker."""
+        return {
+            'streams': len(self._subscriptions),
+            'fps': self.fps,
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'errors': self.errors,
+        }
+
+
+class FrameBrokers(object):
+    """Keep the frame brokers of the cameras."""
+
+    def __init__(self, hass, entities):
+        """Initialize the brokers of the camera entities."""
+        self.hass = hass
+        self.entities = entities
+        self._brokers = {}
+
+    @callback
+    def async_get(self, entity_id):
+        """Return the broker of a camera or None."""
+        camera = self.entities.get(entity_id)
+
+        if camera is None:
+            return None
+
+        broker = self._brokers.get(entity_id)
+        if broker is None or broker.camera is not camera:
+            broker = self._brokers[entity_id] = FrameBroker(self.hass, camera)
+        return broker
+
+    @callback
+    def async_as_dict(self):
+        """Return the statistics of the brokers by entity id."""
+        return {entity_id: broker.async_as_dict()
+                for entity_id, broker in self._brokers.items()}
+
+
 class CameraView(HomeAssistantView):
     """Base CameraView."""
 
@@ -395,9 +657,13 @@ class CameraImageView(CameraView):
     @asyncio.coroutine
     def handle(self, request, camera):
         """Serve camera image."""
+        broker = request.app['hass'].data[DATA_FRAME_BROKERS].async_get(
+            camera.entity_id)
+
         with suppress(asyncio.CancelledError, asyncio.TimeoutError):
-            with async_timeout.timeout(10, loop=request.app['hass'].loop):
-                image = yield from camera.async_camera_image()
+            with async_timeout.timeout(FRAME_TIMEOUT,
+                                       loop=request.app['hass'].loop):
+                image = yield from broker.async_get_frame()
 
             if image:
                 return web.Response(body=image,
@@ -416,3 +682,19 @@ class CameraMjpegStream(CameraView):
     def handle(self, request, camera):
         """Serve camera image."""
         yield from camera.handle_async_mjpeg_stream(request)
+
+
+class CameraStatsView(HomeAssistantView):
+    """View to get the statistics of the camera frame brokers."""
+
+    url = '/api/camera_stats'
+    name = 'api:camera:stats'
+
+    def __init__(self, brokers):
+        """Initialize the camera stats view."""
+        self.brokers = brokers
+
+    @asyncio.coroutine
+    def get(self, request):
+        """Return the frame rate and dropped frames of the cameras."""
+        return self.json(self.brokers.async_as_dict())
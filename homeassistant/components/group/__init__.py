@@ -9,7 +9,6 @@ import logging
 
 import voluptuous as vol
 
-from homeassistant import core as ha
 from homeassistant.const import (
     ATTR_ENTITY_ID, CONF_ICON, CONF_NAME, STATE_CLOSED, STATE_HOME,
     STATE_NOT_HOME, STATE_OFF, STATE_ON, STATE_OPEN, STATE_LOCKED,
@@ -19,13 +18,15 @@ from homeassistant.core import callback
 from homeassistant.loader import bind_hass
 from homeassistant.helpers.entity import Entity, async_generate_entity_id
 from homeassistant.helpers.entity_component import EntityComponent
-from homeassistant.helpers.event import async_track_state_change
+from homeassistant.helpers.event import (
+    async_track_state_change, async_track_state_change_domains)
 import homeassistant.helpers.config_validation as cv
 from homeassistant.util.async import run_coroutine_threadsafe
 
 DOMAIN = 'group'
 
 ENTITY_ID_FORMAT = DOMAIN + '.{}'
+GROUP_PREFIX = DOMAIN + '.'
 
 CONF_ENTITIES = 'entities'
 CONF_VIEW = 'view'
@@ -43,6 +44,7 @@ ATTR_VIEW = 'view'
 ATTR_VISIBLE = 'visible'
 
 DATA_ALL_GROUPS = 'data_all_groups'
+DATA_EXPANDED_GROUPS = 'group_expanded'
 
 SERVICE_SET_VISIBILITY = 'set_visibility'
 SERVICE_SET = 'set'
@@ -195,37 +197,135 @@ def expand_entity_ids(hass, entity_ids):
     Async friendly.
     """
     found_ids = []
+    seen = set()
+
     for entity_id in entity_ids:
         if not isinstance(entity_id, str):
             continue
 
         entity_id = entity_id.lower()
 
-        try:
-            # If entity_id points at a group, expand it
-            domain, _ = ha.split_entity_id(entity_id)
+        if entity_id in seen:
+            continue
+
+        seen.add(entity_id)
+
+        if not entity_id.startswith(GROUP_PREFIX):
+            found_ids.append(entity_id)
+            continue
+
+        for member_id in _expand_group(hass, entity_id):
+            if member_id not in seen:
+                seen.add(member_id)
+                found_ids.append(member_id)
+
+    return found_ids
+
+
+class ExpandedGroups(object):
+    """Cache of the expanded members of groups.
+
+    An expansion is dropped when the entity_id attribute of one of the
+    groups it visited changes.
+    """
+
+    def __init__(self):
+        """Initialize the cache."""
+        self.expanded = {}
+        self.dependents = {}
+        self.generation = 0
+
+    def add(self, group_id, found_ids, visited, generation):
+        """Cache an expansion computed at generation.
 
-            if domain == DOMAIN:
-                child_entities = get_entity_ids(hass, entity_id)
-                if entity_id in child_entities:
-                    child_entities = list(child_entities)
-                    child_entities.remove(entity_id)
-                found_ids.extend(
-                    ent_id for ent_id
-                    in expand_entity_ids(hass, child_entities)
-                    if ent_id not in found_ids)
+        Async friendly.
+        """
+        # A visited group changed while expanding
+        if generation != self.generation:
+            return
 
-            else:
-                if entity_id not in found_ids:
-                    found_ids.append(entity_id)
+        self.expanded[group_id] = found_ids
+        for visited_id in visited:
+            self.dependents.setdefault(visited_id, set()).add(group_id)
 
-        except AttributeError:
-            # Raised by split_entity_id if entity_id is not a string
-            pass
+    @callback
+    def async_group_changed(self, event):
+        """Drop the expansions of a group whose members changed."""
+        old_state = event.data.get('old_state')
+        new_state = event.data.get('new_state')
+
+        if _state_members(old_state) == _state_members(new_state):
+            return
+
+        self.generation += 1
+        for group_id in self.dependents.pop(event.data['entity_id'], ()):
+            self.expanded.pop(group_id, None)
+
+
+@callback
+def _async_setup_expanded_groups(hass):
+    """Set up the cache of expanded groups."""
+    if DATA_EXPANDED_GROUPS in hass.data:
+        return
+
+    expanded = hass.data[DATA_EXPANDED_GROUPS] = ExpandedGroups()
+    async_track_state_change_domains(
+        hass, (DOMAIN,), expanded.async_group_changed)
+
+
+def _expand_group(hass, group_id):
+    """Return the expanded members of a group.
+
+    Expansions are cached when a group has been created.
+    """
+    cache = hass.data.get(DATA_EXPANDED_GROUPS)
+
+    if cache is not None:
+        found_ids = cache.expanded.get(group_id)
+        if found_ids is not None:
+            return found_ids
+        generation = cache.generation
+
+    found_ids = []
+    visited = []
+    _expand_entity_ids(hass, (group_id,), found_ids, set(), visited)
 
+    found_ids = tuple(found_ids)
+    if cache is not None:
+        cache.add(group_id, found_ids, visited, generation)
     return found_ids
 
 
+def _expand_entity_ids(hass, entity_ids, found_ids, seen, visited):
+    """Add the expanded entity_ids not seen before to found_ids."""
+    for entity_id in entity_ids:
+        if not isinstance(entity_id, str):
+            continue
+
+        entity_id = entity_id.lower()
+
+        if entity_id in seen:
+            continue
+
+        seen.add(entity_id)
+
+        # If entity_id points at a group, expand it
+        if entity_id.startswith(GROUP_PREFIX):
+            visited.append(entity_id)
+            _expand_entity_ids(
+                hass, _state_members(hass.states.get(entity_id)),
+                found_ids, seen, visited)
+        else:
+            found_ids.append(entity_id)
+
+
+def _state_members(state):
+    """Return the entity_id attribute of a group state as a tuple."""
+    if state is None:
+        return ()
+    return tuple(state.attributes.get(ATTR_ENTITY_ID) or ())
+
+
 @bind_hass
 def get_entity_ids(hass, entity_id, domain_filter=None):
     """Get members of this group.
@@ -413,6 +513,8 @@ class Group(Entity):
         self._user_defined = user_defined
         self._order = order
         self._assumed_state = False
+        self._on_count = 0
+        self._assumed_count = 0
         self._async_unsub_state_changed = None
 
     @staticmethod
@@ -435,6 +537,8 @@ class Group(Entity):
 
         This method must be run in the event loop.
         """
+        _async_setup_expanded_groups(hass)
+
         group = Group(
             hass, name,
             order=len(hass.states.async_entity_ids(DOMAIN)),
@@ -549,6 +653,9 @@ class Group(Entity):
                 self.hass, self.tracking, self._async_state_changed_listener
             )
 
+            # Members may have changed since the last update
+            self._async_update_group_state()
+
     def stop(self):
         """Unregister the group from Home Assistant."""
         run_coroutine_threadsafe(self.async_stop(), self.hass.loop).result()
@@ -588,8 +695,8 @@ class Group(Entity):
         if self._async_unsub_state_changed is None:
             return
 
-        self._async_update_group_state(new_state)
-        yield from self.async_update_ha_state()
+        if self._async_member_changed(old_state, new_state):
+            yield from self.async_update_ha_state()
 
     @property
     def _tracking_states(self):
@@ -605,62 +712,70 @@ class Group(Entity):
         return states
 
     @callback
-    def _async_update_group_state(self, tr_state=None):
-        """Update group state.
+    def _async_update_group_state(self):
+        """Count the members that are on or have an assumed state.
+
+        This method must be run in the event loop.
+        """
+        states = self._tracking_states
 
-        Optionally you can provide the only state changed since last update
-        allowing this method to take shortcuts.
+        if self.group_on is None:
+            for state in states:
+                gr_on, gr_off = _get_group_on_off(state.state)
+                if gr_on is not None:
+                    self.group_on, self.group_off = gr_on, gr_off
+                    break
+
+        self._on_count = sum(
+            1 for state in states if state.state == self.group_on)
+        self._assumed_count = sum(
+            1 for state in states
+            if state.attributes.get(ATTR_ASSUMED_STATE))
+
+        self._async_set_group_state()
+
+    @callback
+    def _async_member_changed(self, old_state, new_state):
+        """Update the counts from the old and new state of a member.
+
+        Returns if the state of the group changed.
 
         This method must be run in the event loop.
         """
-        # To store current states of group entities. Might not be needed.
-        states = None
-        gr_state = self._state
-        gr_on = self.group_on
-        gr_off = self.group_off
-
-        # We have not determined type of group yet
-        if gr_on is None:
-            if tr_state is None:
-                states = self._tracking_states
-
-                for state in states:
-                    gr_on, gr_off = \
-                        _get_group_on_off(state.state)
-                    if gr_on is not None:
-                        break
-            else:
-                gr_on, gr_off = _get_group_on_off(tr_state.state)
-
-            if gr_on is not None:
-                self.group_on, self.group_off = gr_on, gr_off
+        prev = self._state, self._assumed_state
+
+        if self.group_on is None and new_state is not None and \
+                _get_group_on_off(new_state.state)[0] is not None:
+            # The first member with a groupable state sets the type
+            self._async_update_group_state()
+            return (self._state, self._assumed_state) != prev
+
+        self._on_count += _is_group_on(new_state, self.group_on) - \
+            _is_group_on(old_state, self.group_on)
+        self._assumed_count += _is_assumed(new_state) - \
+            _is_assumed(old_state)
+
+        self._async_set_group_state()
+        return (self._state, self._assumed_state) != prev
+
+    @callback
+    def _async_set_group_state(self):
+        """Set the group state from the member counts."""
+        self._assumed_state = self._assumed_count > 0
 
         # We cannot determine state of the group
-        if gr_on is None:
+        if self.group_on is None:
             return
 
-        if tr_state is None or ((gr_state == gr_on and
-                                 tr_state.state == gr_off) or
-                                tr_state.state not in (gr_on, gr_off)):
-            if states is None:
-                states = self._tracking_states
-
-            if any(state.state == gr_on for state in states):
-                self._state = gr_on
-            else:
-                self._state = gr_off
+        self._state = self.group_on if self._on_count else self.group_off
 
-        elif tr_state.state in (gr_on, gr_off):
-            self._state = tr_state.state
 
-        if tr_state is None or self._assumed_state and \
-           not tr_state.attributes.get(ATTR_ASSUMED_STATE):
-            if states is None:
-                states = self._tracking_states
+def _is_group_on(state, group_on):
+    """Return 1 if a member state is the on state of the group, else 0."""
+    return 1 if state is not None and state.state == group_on else 0
 
-            self._assumed_state = any(
-                state.attributes.get(ATTR_ASSUMED_STATE) for state
-                in states)
 
-        elif tr_state.attributes.get(ATTR_ASSUMED_STATE):
-            self._assumed_state = True
+def _is_assumed(state):
+    """Return 1 if a member state is assumed, else 0."""
+    return 1 if state is not None and \
+        state.attributes.get(ATTR_ASSUMED_STATE) else 0
@@ -8,19 +8,27 @@ import asyncio
 from collections import defaultdict
 from datetime import timedelta
 from itertools import groupby
+import json
 import logging
+import threading
 import time
 
+from aiohttp import web
 import voluptuous as vol
 
 from homeassistant.const import (
-    HTTP_BAD_REQUEST, CONF_DOMAINS, CONF_ENTITIES, CONF_EXCLUDE, CONF_INCLUDE)
+    HTTP_BAD_REQUEST, CONF_DOMAINS, CONF_ENTITIES, CONF_EXCLUDE, CONF_INCLUDE,
+    CONTENT_TYPE_JSON)
+from homeassistant.core import State
 import homeassistant.util.dt as dt_util
+from homeassistant.util.async import run_coroutine_threadsafe
 from homeassistant.components import recorder, script
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.const import ATTR_HIDDEN
-from homeassistant.components.recorder.util import session_scope, execute
+from homeassistant.components.recorder.util import (
+    session_scope, execute, rows_to_native)
 import homeassistant.helpers.config_validation as cv
+from homeassistant.remote import JSONEncoder
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,6 +46,20 @@ CONFIG_SCHEMA = vol.Schema({
 SIGNIFICANT_DOMAINS = ('thermostat', 'climate')
 IGNORE_DOMAINS = ('zone', 'scene',)
 
+# Attributes of downsampled states
+ATTR_MIN_VALUE = 'min_value'
+ATTR_MAX_VALUE = 'max_value'
+
+# Ranges up to this length are aggregated from the recorded states
+STATISTICS_RAW_MAX_RANGE = timedelta(days=1)
+# Ranges up to this length use hourly statistics, longer ranges daily ones
+STATISTICS_HOURLY_MAX_RANGE = timedelta(days=14)
+
+# Number of rows fetched from the database at once when streaming
+STREAM_CHUNK_SIZE = 1000
+# Number of encoded entity histories buffered for a streaming response
+STREAM_QUEUE_SIZE = 10
+
 
 def last_recorder_run(hass):
     """Retrieve the last closed recorder run from the database."""
@@ -53,49 +75,168 @@ def last_recorder_run(hass):
         return res
 
 
+def _significant_states_query(session, start_time, end_time, entity_ids,
+                              filters):
+    """Return the query for the significant states."""
+    from homeassistant.components.recorder.models import States
+
+    query = session.query(States).filter(
+        (States.domain.in_(SIGNIFICANT_DOMAINS) |
+         (States.last_changed == States.last_updated)) &
+        (States.last_updated > start_time))
+
+    if filters:
+        query = filters.apply(query, entity_ids)
+
+    if end_time is not None:
+        query = query.filter(States.last_updated < end_time)
+
+    return query
+
+
+def _include_significant(state):
+    """Test if a state is included in the significant states."""
+    return (_is_significant(state) and
+            not state.attributes.get(ATTR_HIDDEN, False))
+
+
 def get_significant_states(hass, start_time, end_time=None, entity_ids=None,
-                           filters=None, include_start_time_state=True):
+                           filters=None, include_start_time_state=True,
+                           max_points=None):
     """
     Return states changes during UTC period start_time - end_time.
 
     Significant states are all states where there is a state change,
     as well as all states from certain domains (for instance
     thermostat so that we get current temperature in our graphs).
+
+    Numeric series with more than max_points states are downsampled.
     """
     timer_start = time.perf_counter()
     from homeassistant.components.recorder.models import States
 
     with session_scope(hass=hass) as session:
-        query = session.query(States).filter(
-            (States.domain.in_(SIGNIFICANT_DOMAINS) |
-             (States.last_changed == States.last_updated)) &
-            (States.last_updated > start_time))
-
-        if filters:
-            query = filters.apply(query, entity_ids)
-
-        if end_time is not None:
-            query = query.filter(States.last_updated < end_time)
-
+        query = _significant_states_query(
+            session, start_time, end_time, entity_ids, filters)
         query = query.order_by(States.last_updated)
 
         states = (
             state for state in execute(query)
-            if (_is_significant(state) and
-                not state.attributes.get(ATTR_HIDDEN, False)))
+            if _include_significant(state))
 
     if _LOGGER.isEnabledFor(logging.DEBUG):
         elapsed = time.perf_counter() - timer_start
         _LOGGER.debug(
             'get_significant_states took %fs', elapsed)
 
-    return states_to_json(
+    result = states_to_json(
         hass, states, start_time, entity_ids, filters,
         include_start_time_state)
 
+    if max_points is not None:
+        for ent_id in result:
+            result[ent_id] = downsample(result[ent_id], max_points)
+
+    return result
+
+
+def stream_significant_states(hass, start_time, end_time, entity_ids,
+                              filters, include_start_time_state, max_points,
+                              write):
+    """Pass the significant states during a UTC period to write per entity.
+
+    Rows are fetched from the database in chunks and the states of an entity
+    are passed on as soon as they have been read, optionally downsampled to
+    max_points. Stops when write returns False.
+    """
+    from homeassistant.components.recorder.models import States
+
+    start_states = {}
+    if include_start_time_state:
+        for state in get_states(hass, start_time, entity_ids, filters=filters):
+            state.last_changed = start_time
+            state.last_updated = start_time
+            start_states[state.entity_id] = state
+
+    with session_scope(hass=hass) as session:
+        query = _significant_states_query(
+            session, start_time, end_time, entity_ids, filters)
+        query = query.order_by(States.entity_id, States.last_updated) \
+            .yield_per(STREAM_CHUNK_SIZE)
+
+        states = (
+            state for state in rows_to_native(query)
+            if _include_significant(state))
+
+        for ent_id, group in groupby(states, lambda state: state.entity_id):
+            series = []
+            if ent_id in start_states:
+                series.append(start_states.pop(ent_id))
+            series.extend(group)
+
+            if not write(downsample(series, max_points)):
+                return
+
+    # Entities without changes during the period
+    for ent_id in sorted(start_states):
+        if not write([start_states[ent_id]]):
+            return
+
+
+def downsample(states, max_points):
+    """Reduce a numeric series of states to at most max_points states.
+
+    The period of the series is divided in max_points buckets of equal
+    length. Each bucket is represented by a state with the mean as state,
+    the minimum and maximum as attributes and the time of the first state
+    in the bucket. Non-numeric states, like unavailable, are kept as they
+    are and end the current bucket.
+    """
+    if max_points is None or len(states) <= max_points:
+        return states
+
+    first = states[0].last_updated
+    width = (states[-1].last_updated - first).total_seconds() / max_points
+
+    if width <= 0:
+        return states
+
+    series = []
+    bucket = None
+    for state in states:
+        try:
+            value = float(state.state)
+        except ValueError:
+            series.append(state)
+            bucket = None
+            continue
+
+        idx = min(int((state.last_updated - first).total_seconds() / width),
+                  max_points - 1)
+
+        if bucket is None or bucket[0] != idx:
+            bucket = (idx, state, [])
+            series.append(bucket)
+
+        bucket[2].append(value)
+
+    return [_bucket_state(*entry[1:]) if isinstance(entry, tuple) else entry
+            for entry in series]
+
+
+def _bucket_state(bucket_first, bucket_values):
+    """Return the state representing a bucket of numeric values."""
+    attributes = dict(bucket_first.attributes)
+    attributes[ATTR_MIN_VALUE] = min(bucket_values)
+    attributes[ATTR_MAX_VALUE] = max(bucket_values)
+    return State(
+        bucket_first.entity_id,
+        sum(bucket_values) / len(bucket_values), attributes,
+        bucket_first.last_changed, bucket_first.last_updated)
+
 
 def state_changes_during_period(hass, start_time, end_time=None,
-                                entity_id=None):
+                                entity_id=None, include_start_time_state=True):
     """Return states changes during UTC period start_time - end_time."""
     from homeassistant.components.recorder.models import States
 
@@ -115,7 +256,65 @@ def state_changes_during_period(hass, start_time, end_time=None,
         states = execute(
             query.order_by(States.last_updated))
 
-    return states_to_json(hass, states, start_time, entity_ids)
+    return states_to_json(hass, states, start_time, entity_ids,
+                          include_start_time_state=include_start_time_state)
+
+
+def get_statistics(hass, start_time, end_time=None, entity_ids=None,
+                   period=None):
+    """Return statistics of numeric entities during UTC period.
+
+    Returns {'entity_id': [list of statistics]} with the count, min, max,
+    mean, last and sum per hour or day. Short ranges are aggregated from the
+    recorded states, longer ranges are read from the statistics compiled by
+    the recorder, which are kept when old states are purged.
+    """
+    from homeassistant.components.recorder.models import States, Statistics
+    from homeassistant.components.recorder.statistics import (
+        PERIOD_DAY, PERIOD_HOUR, aggregate_states, period_start)
+
+    if end_time is None:
+        end_time = dt_util.utcnow()
+
+    if period is None:
+        period = PERIOD_HOUR \
+            if end_time - start_time <= STATISTICS_HOURLY_MAX_RANGE \
+            else PERIOD_DAY
+
+    result = defaultdict(list)
+
+    if period == PERIOD_HOUR and \
+            end_time - start_time <= STATISTICS_RAW_MAX_RANGE:
+        with session_scope(hass=hass) as session:
+            query = session.query(States).filter(
+                (States.last_updated >= start_time) &
+                (States.last_updated < end_time))
+
+            if entity_ids is not None:
+                query = query.filter(States.entity_id.in_(entity_ids))
+
+            states = execute(query.order_by(States.last_updated))
+
+        aggregates = aggregate_states(states, (period,))
+        for key in sorted(aggregates):
+            result[key[0]].append(aggregates[key].as_dict(*key))
+
+        return result
+
+    with session_scope(hass=hass) as session:
+        query = session.query(Statistics).filter(
+            (Statistics.period == period) &
+            (Statistics.start >= period_start(period, start_time)) &
+            (Statistics.start < end_time))
+
+        if entity_ids is not None:
+            query = query.filter(Statistics.entity_id.in_(entity_ids))
+
+        for stats in execute(
+                query.order_by(Statistics.entity_id, Statistics.start)):
+            result[stats['entity_id']].append(stats)
+
+    return result
 
 
 def get_states(hass, utc_point_in_time, entity_ids=None, run=None,
@@ -250,6 +449,7 @@ def async_setup(hass, config):
     use_include_order = config[DOMAIN].get(CONF_ORDER)
 
     hass.http.register_view(HistoryPeriodView(filters, use_include_order))
+    hass.http.register_view(HistoryStreamView(filters))
     yield from hass.components.frontend.async_register_built_in_panel(
         'history', 'history', 'mdi:poll-box')
 
@@ -272,40 +472,19 @@ class HistoryPeriodView(HomeAssistantView):
     def get(self, request, datetime=None):
         """Return history over a period of time."""
         timer_start = time.perf_counter()
-        if datetime:
-            datetime = dt_util.parse_datetime(datetime)
-
-            if datetime is None:
-                return self.json_message('Invalid datetime', HTTP_BAD_REQUEST)
+        params = _parse_period_params(self, request, datetime)
 
-        now = dt_util.utcnow()
-
-        one_day = timedelta(days=1)
-        if datetime:
-            start_time = dt_util.as_utc(datetime)
-        else:
-            start_time = now - one_day
-
-        if start_time > now:
+        if isinstance(params, web.Response):
+            return params
+        elif params is None:
             return self.json([])
 
-        end_time = request.query.get('end_time')
-        if end_time:
-            end_time = dt_util.parse_datetime(end_time)
-            if end_time:
-                end_time = dt_util.as_utc(end_time)
-            else:
-                return self.json_message('Invalid end_time', HTTP_BAD_REQUEST)
-        else:
-            end_time = start_time + one_day
-        entity_ids = request.query.get('filter_entity_id')
-        if entity_ids:
-            entity_ids = entity_ids.lower().split(',')
-        include_start_time_state = 'skip_initial_state' not in request.query
+        (start_time, end_time, entity_ids, include_start_time_state,
+         max_points) = params
 
         result = yield from request.app['hass'].async_add_job(
             get_significant_states, request.app['hass'], start_time, end_time,
-            entity_ids, self.filters, include_start_time_state)
+            entity_ids, self.filters, include_start_time_state, max_points)
         result = result.values()
         if _LOGGER.isEnabledFor(logging.DEBUG):
             elapsed = time.perf_counter() - timer_start
@@ -330,6 +509,133 @@ class HistoryPeriodView(HomeAssistantView):
         return self.json(result)
 
 
+class HistoryStreamView(HomeAssistantView):
+    """Stream history period requests as chunked JSON."""
+
+    url = '/api/history/stream'
+    name = 'api:history:stream'
+    extra_urls = ['/api/history/stream/{datetime}']
+
+    def __init__(self, filters):
+        """Initialize the history stream view."""
+        self.filters = filters
+
+    @asyncio.coroutine
+    def get(self, request, datetime=None):
+        """Stream history over a period of time."""
+        hass = request.app['hass']
+        params = _parse_period_params(self, request, datetime)
+
+        if isinstance(params, web.Response):
+            return params
+        elif params is None:
+            return self.json([])
+
+        (start_time, end_time, entity_ids, include_start_time_state,
+         max_points) = params
+        chunks = asyncio.Queue(STREAM_QUEUE_SIZE, loop=hass.loop)
+        stop = threading.Event()
+
+        def write(states):
+            """Encode states of an entity and queue them for writing."""
+            if stop.is_set():
+                return False
+            chunk = json.dumps(states, cls=JSONEncoder).encode('UTF-8')
+            run_coroutine_threadsafe(chunks.put(chunk), hass.loop).result()
+            return True
+
+        def produce():
+            """Read the history from the database."""
+            try:
+                stream_significant_states(
+                    hass, start_time, end_time, entity_ids, self.filters,
+                    include_start_time_state, max_points, write)
+            finally:
+                run_coroutine_threadsafe(chunks.put(None), hass.loop).result()
+
+        response = web.StreamResponse()
+        response.content_type = CONTENT_TYPE_JSON
+        response.enable_chunked_encoding()
+        yield from response.prepare(request)
+
+        producer = hass.async_add_job(produce)
+        chunk = b'['
+
+        try:
+            response.write(b'[')
+            chunk = yield from chunks.get()
+
+            while chunk is not None:
+                response.write(chunk)
+                yield from response.drain()
+                chunk = yield from chunks.get()
+                if chunk is not None:
+                    response.write(b',')
+
+            response.write(b']')
+            yield from response.write_eof()
+        finally:
+            # Unblock the producer if the client went away
+            stop.set()
+            while chunk is not None:
+                chunk = yield from chunks.get()
+
+        yield from producer
+        return response
+
+
+def _parse_period_params(view, request, datetime):
+    """Parse the parameters of a history period request.
+
+    Returns a response on invalid parameters or None if the period starts
+    in the future.
+    """
+    if datetime:
+        datetime = dt_util.parse_datetime(datetime)
+
+        if datetime is None:
+            return view.json_message('Invalid datetime', HTTP_BAD_REQUEST)
+
+    now = dt_util.utcnow()
+
+    one_day = timedelta(days=1)
+    if datetime:
+        start_time = dt_util.as_utc(datetime)
+    else:
+        start_time = now - one_day
+
+    if start_time > now:
+        return None
+
+    end_time = request.query.get('end_time')
+    if end_time:
+        end_time = dt_util.parse_datetime(end_time)
+        if end_time:
+            end_time = dt_util.as_utc(end_time)
+        else:
+            return view.json_message('Invalid end_time', HTTP_BAD_REQUEST)
+    else:
+        end_time = start_time + one_day
+    entity_ids = request.query.get('filter_entity_id')
+    if entity_ids:
+        entity_ids = entity_ids.lower().split(',')
+    include_start_time_state = 'skip_initial_state' not in request.query
+
+    max_points = request.query.get('max_points')
+    if max_points:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            max_points = 0
+        if max_points < 1:
+            return view.json_message('Invalid max_points', HTTP_BAD_REQUEST)
+    else:
+        max_points = None
+
+    return (start_time, end_time, entity_ids, include_start_time_state,
+            max_points)
+
+
 class Filters(object):
     """Container for the configured include and exclude filters."""
 
@@ -4,10 +4,13 @@ A component which allows you to send data to an Influx database.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/influxdb/
 """
-from datetime import timedelta
-from functools import wraps, partial
+import json
 import logging
+import os
+import queue
 import re
+import threading
+import time
 
 import requests.exceptions
 import voluptuous as vol
@@ -15,10 +18,11 @@ import voluptuous as vol
 from homeassistant.const import (
     EVENT_STATE_CHANGED, STATE_UNAVAILABLE, STATE_UNKNOWN, CONF_HOST,
     CONF_PORT, CONF_SSL, CONF_VERIFY_SSL, CONF_USERNAME, CONF_PASSWORD,
-    CONF_EXCLUDE, CONF_INCLUDE, CONF_DOMAINS, CONF_ENTITIES)
-from homeassistant.helpers import state as state_helper
+    CONF_EXCLUDE, CONF_INCLUDE, CONF_DOMAINS, CONF_ENTITIES,
+    EVENT_HOMEASSISTANT_STOP)
+from homeassistant.helpers import state as state_helper, discovery
 from homeassistant.helpers.entity_values import EntityValues
-from homeassistant.util import utcnow
+from homeassistant.remote import JSONEncoder
 import homeassistant.helpers.config_validation as cv
 
 REQUIREMENTS = ['influxdb==4.1.1']
@@ -35,50 +39,72 @@ CONF_COMPONENT_CONFIG_GLOB = 'component_config_glob'
 CONF_COMPONENT_CONFIG_DOMAIN = 'component_config_domain'
 CONF_RETRY_COUNT = 'max_retries'
 CONF_RETRY_QUEUE = 'retry_queue_limit'
+CONF_BATCH_SIZE = 'batch_size'
+CONF_BATCH_MAX_AGE = 'batch_max_age'
+CONF_SPOOL_LIMIT = 'spool_limit'
 
 DEFAULT_DATABASE = 'home_assistant'
 DEFAULT_VERIFY_SSL = True
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_BATCH_MAX_AGE = 0
+DEFAULT_SPOOL_LIMIT = 100000
 DOMAIN = 'influxdb'
 TIMEOUT = 5
 
+# Seconds to wait before writing to the database again after an error
+RETRY_DELAY = 20
+
+# Points that could not be written are appended to this file
+SPOOL_FILE = 'influxdb.spool'
+
 COMPONENT_CONFIG_SCHEMA_ENTRY = vol.Schema({
     vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string,
 })
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
-        vol.Optional(CONF_HOST): cv.string,
-        vol.Inclusive(CONF_USERNAME, 'authentication'): cv.string,
-        vol.Inclusive(CONF_PASSWORD, 'authentication'): cv.string,
-        vol.Optional(CONF_EXCLUDE, default={}): vol.Schema({
-            vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
-            vol.Optional(CONF_DOMAINS, default=[]):
-                vol.All(cv.ensure_list, [cv.string])
-        }),
-        vol.Optional(CONF_INCLUDE, default={}): vol.Schema({
-            vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
-            vol.Optional(CONF_DOMAINS, default=[]):
-                vol.All(cv.ensure_list, [cv.string])
-        }),
-        vol.Optional(CONF_DB_NAME, default=DEFAULT_DATABASE): cv.string,
-        vol.Optional(CONF_PORT): cv.port,
-        vol.Optional(CONF_SSL): cv.boolean,
-        vol.Optional(CONF_RETRY_COUNT, default=0): cv.positive_int,
-        vol.Optional(CONF_RETRY_QUEUE, default=20): cv.positive_int,
-        vol.Optional(CONF_DEFAULT_MEASUREMENT): cv.string,
-        vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string,
-        vol.Optional(CONF_TAGS, default={}):
-            vol.Schema({cv.string: cv.string}),
-        vol.Optional(CONF_TAGS_ATTRIBUTES, default=[]):
-            vol.All(cv.ensure_list, [cv.string]),
-        vol.Optional(CONF_VERIFY_SSL, default=DEFAULT_VERIFY_SSL): cv.boolean,
-        vol.Optional(CONF_COMPONENT_CONFIG, default={}):
-            vol.Schema({cv.entity_id: COMPONENT_CONFIG_SCHEMA_ENTRY}),
-        vol.Optional(CONF_COMPONENT_CONFIG_GLOB, default={}):
-            vol.Schema({cv.string: COMPONENT_CONFIG_SCHEMA_ENTRY}),
-        vol.Optional(CONF_COMPONENT_CONFIG_DOMAIN, default={}):
-            vol.Schema({cv.string: COMPONENT_CONFIG_SCHEMA_ENTRY}),
-    }),
+    DOMAIN: vol.All(
+        cv.deprecated(CONF_RETRY_COUNT),
+        cv.deprecated(CONF_RETRY_QUEUE),
+        vol.Schema({
+            vol.Optional(CONF_HOST): cv.string,
+            vol.Inclusive(CONF_USERNAME, 'authentication'): cv.string,
+            vol.Inclusive(CONF_PASSWORD, 'authentication'): cv.string,
+            vol.Optional(CONF_EXCLUDE, default={}): vol.Schema({
+                vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
+                vol.Optional(CONF_DOMAINS, default=[]):
+                    vol.All(cv.ensure_list, [cv.string])
+            }),
+            vol.Optional(CONF_INCLUDE, default={}): vol.Schema({
+                vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
+                vol.Optional(CONF_DOMAINS, default=[]):
+                    vol.All(cv.ensure_list, [cv.string])
+            }),
+            vol.Optional(CONF_DB_NAME, default=DEFAULT_DATABASE): cv.string,
+            vol.Optional(CONF_PORT): cv.port,
+            vol.Optional(CONF_SSL): cv.boolean,
+            vol.Optional(CONF_RETRY_COUNT): cv.positive_int,
+            vol.Optional(CONF_RETRY_QUEUE): cv.positive_int,
+            vol.Optional(CONF_BATCH_SIZE, default=DEFAULT_BATCH_SIZE):
+                vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(CONF_BATCH_MAX_AGE, default=DEFAULT_BATCH_MAX_AGE):
+                vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(CONF_SPOOL_LIMIT, default=DEFAULT_SPOOL_LIMIT):
+                cv.positive_int,
+            vol.Optional(CONF_DEFAULT_MEASUREMENT): cv.string,
+            vol.Optional(CONF_OVERRIDE_MEASUREMENT): cv.string,
+            vol.Optional(CONF_TAGS, default={}):
+                vol.Schema({cv.string: cv.string}),
+            vol.Optional(CONF_TAGS_ATTRIBUTES, default=[]):
+                vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(CONF_VERIFY_SSL, default=DEFAULT_VERIFY_SSL):
+                cv.boolean,
+            vol.Optional(CONF_COMPONENT_CONFIG, default={}):
+                vol.Schema({cv.entity_id: COMPONENT_CONFIG_SCHEMA_ENTRY}),
+            vol.Optional(CONF_COMPONENT_CONFIG_GLOB, default={}):
+                vol.Schema({cv.string: COMPONENT_CONFIG_SCHEMA_ENTRY}),
+            vol.Optional(CONF_COMPONENT_CONFIG_DOMAIN, default={}):
+                vol.Schema({cv.string: COMPONENT_CONFIG_SCHEMA_ENTRY}),
+        })),
 }, extra=vol.ALLOW_EXTRA)
 
 RE_DIGIT_TAIL = re.compile(r'^[^\.]*\d+\.?\d+[^\.]*$')
@@ -126,8 +152,6 @@ def setup(hass, config):
         conf[CONF_COMPONENT_CONFIG],
         conf[CONF_COMPONENT_CONFIG_DOMAIN],
         conf[CONF_COMPONENT_CONFIG_GLOB])
-    max_tries = conf.get(CONF_RETRY_COUNT)
-    queue_limit = conf.get(CONF_RETRY_QUEUE)
 
     try:
         influx = InfluxDBClient(**kwargs)
@@ -222,92 +246,197 @@ def setup(hass, config):
 
         json_body[0]['tags'].update(tags)
 
-        _write_data(json_body)
+        writer.queue.put(json_body[0])
 
-    @RetryOnError(hass, retry_limit=max_tries, retry_delay=20,
-                  queue_limit=queue_limit)
-    def _write_data(json_body):
-        try:
-            influx.write_points(json_body)
-        except exceptions.InfluxDBClientError:
-            _LOGGER.exception("Error saving event %s to InfluxDB", json_body)
+    writer = hass.data[DOMAIN] = InfluxThread(
+        influx, conf[CONF_BATCH_SIZE], conf[CONF_BATCH_MAX_AGE],
+        hass.config.path(SPOOL_FILE), conf[CONF_SPOOL_LIMIT])
+    writer.start()
+
+    def shutdown(event):
+        """Write the remaining points and stop the writer."""
+        writer.queue.put(None)
+        writer.join()
 
     hass.bus.listen(EVENT_STATE_CHANGED, influx_event_listener)
+    hass.bus.listen_once(EVENT_HOMEASSISTANT_STOP, shutdown)
+
+    discovery.load_platform(hass, 'sensor', DOMAIN, {}, config)
 
     return True
 
 
-class RetryOnError(object):
-    """A class for retrying a failed task a certain amount of tries.
+class InfluxThread(threading.Thread):
+    """Write points to InfluxDB in batches from a dedicated thread.
 
-    This method decorator makes a method retrying on errors. If there was an
-    uncaught exception, it schedules another try to execute the task after a
-    retry delay. It does this up to the maximum number of retries.
+    Points queued while a batch is written are written together in the next
+    batch. Points that could not be written because the database is not
+    reachable are spooled to disk and written once it is reachable again.
+    """
 
-    It can be used for all probable "self-healing" problems like network
-    outages. The task will be rescheduled using HAs scheduling mechanism.
+    def __init__(self, influx, batch_size, batch_max_age, spool_path,
+                 spool_limit):
+        """Initialize the writer."""
+        threading.Thread.__init__(self, name='InfluxDB')
+        self.influx = influx
+        self.queue = queue.Queue()
+        self.batch_size = batch_size
+        self.batch_max_age = batch_max_age
+        self.spool_path = spool_path
+        self.spool_limit = spool_limit
+        self.retry_delay = RETRY_DELAY
+        self._retry_at = 0
+        # Counters exposed as sensors
+        self.points_flushed = 0
+        self.points_dropped = 0
+        self.points_spooled = self._count_spooled()
+        self.flush_latency = None
+
+    @property
+    def points_buffered(self):
+        """Return the number of points waiting to be written."""
+        return self.queue.qsize()
+
+    def block_till_done(self):
+        """Block till all queued points are handled."""
+        self.queue.join()
+
+    def run(self):
+        """Write the queued points until the writer is stopped."""
+        stopping = False
+
+        while not stopping:
+            point = self.queue.get()
+
+            if point is None:
+                batch = []
+                stopping = True
+            else:
+                batch = [point]
+                stopping = self._get_batch(batch)
 
-    It takes a Hass instance, a maximum number of retries and a retry delay
-    in seconds as arguments.
+            if batch:
+                self._write_batch(batch)
 
-    The queue limit defines the maximum number of calls that are allowed to
-    be queued at a time. If this number is reached, every new call discards
-    an old one.
-    """
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self.queue.task_done()
 
-    def __init__(self, hass, retry_limit=0, retry_delay=20, queue_limit=100):
-        """Initialize the decorator."""
-        self.hass = hass
-        self.retry_limit = retry_limit
-        self.retry_delay = timedelta(seconds=retry_delay)
-        self.queue_limit = queue_limit
-
-    def __call__(self, method):
-        """Decorate the target method."""
-        from homeassistant.helpers.event import track_point_in_utc_time
-
-        @wraps(method)
-        def wrapper(*args, **kwargs):
-            """Wrapped method."""
-            # pylint: disable=protected-access
-            if not hasattr(wrapper, "_retry_queue"):
-                wrapper._retry_queue = []
-
-            def scheduled(retry=0, untrack=None, event=None):
-                """Call the target method.
-
-                It is called directly at the first time and then called
-                scheduled within the Hass mainloop.
-                """
-                if untrack is not None:
-                    wrapper._retry_queue.remove(untrack)
-
-                # pylint: disable=broad-except
-                try:
-                    method(*args, **kwargs)
-                except Exception as ex:
-                    if retry == self.retry_limit:
-                        raise
-                    if len(wrapper._retry_queue) >= self.queue_limit:
-                        last = wrapper._retry_queue.pop(0)
-                        if 'remove' in last:
-                            func = last['remove']
-                            func()
-                        if 'exc' in last:
-                            _LOGGER.error(
-                                "Retry queue overflow, drop oldest entry: %s",
-                                str(last['exc']))
-
-                    target = utcnow() + self.retry_delay
-                    tracking = {'target': target}
-                    remove = track_point_in_utc_time(self.hass,
-                                                     partial(scheduled,
-                                                             retry + 1,
-                                                             tracking),
-                                                     target)
-                    tracking['remove'] = remove
-                    tracking["exc"] = ex
-                    wrapper._retry_queue.append(tracking)
-
-            scheduled()
-        return wrapper
+    def _get_batch(self, batch):
+        """Add queued points to the batch.
+
+        Returns True if the writer has to stop after this batch.
+        """
+        deadline = time.monotonic() + self.batch_max_age
+
+        while len(batch) < self.batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                if timeout > 0:
+                    point = self.queue.get(timeout=timeout)
+                else:
+                    point = self.queue.get_nowait()
+            except queue.Empty:
+                return False
+
+            if point is None:
+                return True
+
+            batch.append(point)
+
+        return False
+
+    def _write_batch(self, batch):
+        """Write a batch, spooling it if the database is not reachable."""
+        if time.monotonic() < self._retry_at or \
+                (self.points_spooled and not self._write_spool()):
+            self._spool(batch)
+            return
+
+        if self._write(batch) is None:
+            self._spool(batch)
+
+    def _write(self, batch):
+        """Write points to the database.
+
+        Returns if the points were handled or None if the database could
+        not be reached.
+        """
+        from influxdb import exceptions
+
+        start = time.monotonic()
+        try:
+            self.influx.write_points(batch)
+        except exceptions.InfluxDBClientError:
+            # Rejected by the database, writing again would fail again
+            _LOGGER.exception("Error saving %d points to InfluxDB",
+                              len(batch))
+            self.points_dropped += len(batch)
+            return False
+        except (exceptions.InfluxDBServerError, IOError) as err:
+            _LOGGER.error("Error connecting to InfluxDB: %s", err)
+            self._retry_at = time.monotonic() + self.retry_delay
+            return None
+
+        self.flush_latency = time.monotonic() - start
+        self.points_flushed += len(batch)
+        return True
+
+    def _spool(self, batch):
+        """Append a batch to the spool file."""
+        if self.points_spooled + len(batch) > self.spool_limit:
+            _LOGGER.warning("InfluxDB spool is full, dropping %d points",
+                            len(batch))
+            self.points_dropped += len(batch)
+            return
+
+        try:
+            with open(self.spool_path, 'a') as spool:
+                spool.write(json.dumps(batch, cls=JSONEncoder))
+                spool.write('\n')
+        except OSError as err:
+            _LOGGER.error("Error spooling InfluxDB points: %s", err)
+            self.points_dropped += len(batch)
+            return
+
+        self.points_spooled += len(batch)
+
+    def _write_spool(self):
+        """Write the spooled batches in order.
+
+        Returns True if the spool is empty.
+        """
+        try:
+            with open(self.spool_path) as spool:
+                lines = spool.readlines()
+        except FileNotFoundError:
+            self.points_spooled = 0
+            return True
+        except OSError as err:
+            _LOGGER.error("Error reading InfluxDB spool: %s", err)
+            return False
+
+        for idx, line in enumerate(lines):
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                _LOGGER.error("Skipping invalid line in InfluxDB spool")
+                continue
+
+            if self._write(batch) is None:
+                with open(self.spool_path, 'w') as spool:
+                    spool.writelines(lines[idx:])
+                return False
+
+            self.points_spooled -= len(batch)
+
+        os.remove(self.spool_path)
+        self.points_spooled = 0
+        return True
+
+    def _count_spooled(self):
+        """Return the number of points spooled before a restart."""
+        try:
+            with open(self.spool_path) as spool:
+                return sum(len(json.loads(line)) for line in spool)
+        except (OSError, ValueError):
+            return 0
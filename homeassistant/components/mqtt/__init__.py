@@ -10,7 +10,6 @@ import os
 import socket
 import time
 import ssl
-import re
 import requests.certs
 
 import voluptuous as vol
@@ -28,6 +27,7 @@ from homeassistant.util.async import (
 from homeassistant.const import (
     EVENT_HOMEASSISTANT_STOP, CONF_VALUE_TEMPLATE, CONF_USERNAME,
     CONF_PASSWORD, CONF_PORT, CONF_PROTOCOL, CONF_PAYLOAD)
+from homeassistant.components.mqtt.router import TopicRouter
 from homeassistant.components.mqtt.server import HBMQTT_CONFIG_SCHEMA
 
 REQUIREMENTS = ['paho-mqtt==1.3.1']
@@ -37,6 +37,7 @@ _LOGGER = logging.getLogger(__name__)
 DOMAIN = 'mqtt'
 
 DATA_MQTT = 'mqtt'
+DATA_MQTT_ROUTER = 'mqtt_router'
 
 SERVICE_PUBLISH = 'publish'
 SIGNAL_MQTT_MESSAGE_RECEIVED = 'mqtt_message_received'
@@ -222,32 +223,25 @@ def publish_template(hass, topic, payload_template, qos=None, retain=None):
 def async_subscribe(hass, topic, msg_callback, qos=DEFAULT_QOS,
                     encoding='utf-8'):
     """Subscribe to an MQTT topic."""
-    @callback
-    def async_mqtt_topic_subscriber(dp_topic, dp_payload, dp_qos):
-        """Match subscribed MQTT topic."""
-        if not _match_topic(topic, dp_topic):
-            return
+    async_remove = async_get_router(hass).async_subscribe(
+        topic, msg_callback, encoding)
 
-        if encoding is not None:
-            try:
-                payload = dp_payload.decode(encoding)
-                _LOGGER.debug("Received message on %s: %s", dp_topic, payload)
-            except (AttributeError, UnicodeDecodeError):
-                _LOGGER.error("Illegal payload encoding %s from "
-                              "MQTT topic: %s, Payload: %s",
-                              encoding, dp_topic, dp_payload)
-                return
-        else:
-            _LOGGER.debug("Received binary message on %s", dp_topic)
-            payload = dp_payload
+    yield from hass.data[DATA_MQTT].async_subscribe(topic, qos)
+    return async_remove
 
-        hass.async_run_job(msg_callback, dp_topic, payload, dp_qos)
 
-    async_remove = async_dispatcher_connect(
-        hass, SIGNAL_MQTT_MESSAGE_RECEIVED, async_mqtt_topic_subscriber)
+@callback
+@bind_hass
+def async_get_router(hass):
+    """Return the router of received messages to the subscriptions."""
+    router = hass.data.get(DATA_MQTT_ROUTER)
 
-    yield from hass.data[DATA_MQTT].async_subscribe(topic, qos)
-    return async_remove
+    if router is None:
+        router = hass.data[DATA_MQTT_ROUTER] = TopicRouter(hass)
+        async_dispatcher_connect(
+            hass, SIGNAL_MQTT_MESSAGE_RECEIVED, router.async_route)
+
+    return router
 
 
 @bind_hass
@@ -642,27 +636,6 @@ def _raise_on_error(result):
             'Error talking to MQTT: {}'.format(mqtt.error_string(result)))
 
 
-def _match_topic(subscription, topic):
-    """Test if topic matches subscription."""
-    reg_ex_parts = []
-    suffix = ""
-    if subscription.endswith('#'):
-        subscription = subscription[:-2]
-        suffix = "(.*)"
-    sub_parts = subscription.split('/')
-    for sub_part in sub_parts:
-        if sub_part == "+":
-            reg_ex_parts.append(r"([^\/]+)")
-        else:
-            reg_ex_parts.append(re.escape(sub_part))
-
-    reg_ex = "^" + (r'\/'.join(reg_ex_parts)) + suffix + "$"
-
-    reg = re.compile(reg_ex)
-
-    return reg.match(topic) is not None
-
-
 class MqttAvailability(Entity):
     """Mixin used for platforms that report availability."""
 
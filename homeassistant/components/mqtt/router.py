@@ -0,0 +1,178 @@
+"""
+Route received MQTT messages to the matching subscriptions.
+
+For more details about this component, please refer to the documentation at
+https://home-assistant.io/components/mqtt/
+"""
+import logging
+
+from homeassistant.core import callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# Returned by the payload decoding when the payload could not be decoded
+_DECODE_FAILED = object()
+
+
+class Subscription(object):
+    """Representation of a subscription to an MQTT topic filter."""
+
+    __slots__ = ['topic', 'msg_callback', 'encoding']
+
+    def __init__(self, topic, msg_callback, encoding):
+        """Initialize the subscription."""
+        self.topic = topic
+        self.msg_callback = msg_callback
+        self.encoding = encoding
+
+
+class _TopicNode(object):
+    """Level of a topic filter in the topic trie."""
+
+    __slots__ = ['children', 'subscriptions']
+
+    def __init__(self):
+        """Initialize the node."""
+        self.children = {}
+        self.subscriptions = []
+
+
+class TopicRouter(object):
+    """Trie of topic filters to find the subscriptions matching a topic.
+
+    Topic filters are split into levels, a '+' level matches any single
+    level and a '#' level matches the parent level and all levels below.
+    """
+
+    def __init__(self, hass):
+        """Initialize the router."""
+        self.hass = hass
+        self._root = _TopicNode()
+
+    @callback
+    def async_subscribe(self, topic, msg_callback, encoding='utf-8'):
+        """Route messages matching a topic filter to msg_callback.
+
+        Returns a function to remove the subscription.
+        """
+        subscription = Subscription(topic, msg_callback, encoding)
+        node = self._root
+
+        for level in topic.split('/'):
+            child = node.children.get(level)
+            if child is None:
+                child = node.children[level] = _TopicNode()
+            node = child
+
+        node.subscriptions.append(subscription)
+
+        @callback
+        def async_remove():
+            """Remove the subscription."""
+            self._remove(subscription)
+
+        return async_remove
+
+    def _remove(self, subscription):
+        """Remove a subscription and prune the unused nodes."""
+        path = [self._root]
+
+        for level in subscription.topic.split('/'):
+            node = path[-1].children.get(level)
+            if node is None:
+                return
+            path.append(node)
+
+        try:
+            path[-1].subscriptions.remove(subscription)
+        except ValueError:
+            return
+
+        levels = subscription.topic.split('/')
+        while len(path) > 1 and \
+                not path[-1].subscriptions and not path[-1].children:
+            path.pop()
+            del path[-1].children[levels[len(path) - 1]]
+
+    def match(self, topic):
+        """Return the subscriptions matching a topic."""
+        result = []
+        nodes = [self._root]
+
+        for level in topic.split('/'):
+            next_nodes = []
+
+            for node in nodes:
+                children = node.children
+                if not children:
+                    continue
+
+                wildcard = children.get('#')
+                if wildcard is not None:
+                    result.extend(wildcard.subscriptions)
+
+                child = children.get(level)
+                if child is not None:
+                    next_nodes.append(child)
+
+                child = children.get('+')
+                if child is not None:
+                    next_nodes.append(child)
+
+            if not next_nodes:
+                return result
+
+            nodes = next_nodes
+
+        for node in nodes:
+            result.extend(node.subscriptions)
+
+            # A filter like 'topic/#' also matches 'topic'
+            wildcard = node.children.get('#')
+            if wildcard is not None:
+                result.extend(wildcard.subscriptions)
+
+        return result
+
+    @callback
+    def async_route(self, topic, payload, qos):
+        """Pass a received message to the matching subscriptions.
+
+        The payload is decoded once per encoding.
+        """
+        subscriptions = self.match(topic)
+
+        if not subscriptions:
+            return
+
+        payloads = {}
+
+        for subscription in subscriptions:
+            encoding = subscription.encoding
+
+            if encoding is None:
+                decoded = payload
+            else:
+                decoded = payloads.get(encoding)
+                if decoded is None:
+                    decoded = payloads[encoding] = _decode_payload(
+                        topic, payload, encoding)
+
+            if decoded is _DECODE_FAILED:
+                continue
+
+            self.hass.async_run_job(
+                subscription.msg_callback, topic, decoded, qos)
+
+
+def _decode_payload(topic, payload, encoding):
+    """Decode a payload or return _DECODE_FAILED."""
+    try:
+        decoded = payload.decode(encoding)
+    except (AttributeError, LookupError, UnicodeDecodeError):
+        _LOGGER.error("Illegal payload encoding %s from MQTT topic: %s, "
+                      "Payload: %s", encoding, topic, payload)
+        return _DECODE_FAILED
+
+    _LOGGER.debug("Received message on %s: %s", topic, decoded)
+    return decoded
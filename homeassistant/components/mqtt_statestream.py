@@ -87,11 +87,17 @@ def async_setup(hass, config):
                     True)
 
         if publish_attributes:
-            for key, val in new_state.attributes.items():
+            # Retained messages of unchanged attributes are still valid
+            changed, removed = new_state.attributes_diff(old_state)
+            for key, val in changed.items():
                 if val:
                     encoded_val = json.dumps(val, cls=JSONEncoder)
                     hass.components.mqtt.async_publish(mybase + key,
                                                        encoded_val, 1, True)
 
+            # An empty retained message clears the one of a removed attribute
+            for key in removed:
+                hass.components.mqtt.async_publish(mybase + key, '', 1, True)
+
     async_track_state_change(hass, MATCH_ALL, _state_publisher)
     return True
@@ -0,0 +1,420 @@
+"""
+Profile the event loop and the jobs executed by Home Assistant.
+
+For more details about this component, please refer to the documentation at
+https://home-assistant.io/components/profiler/
+"""
+import asyncio
+from collections import deque
+import functools
+import logging
+import time
+
+import voluptuous as vol
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.const import MATCH_ALL
+from homeassistant.core import (
+    EventBus, EventOrigin, HomeAssistant, callback, is_callback)
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+DOMAIN = 'profiler'
+DEPENDENCIES = ['http']
+
+DATA_PROFILER = 'profiler'
+
+CONF_BUFFER_SIZE = 'buffer_size'
+
+DEFAULT_BUFFER_SIZE = 10000
+
+ATTR_CPROFILE = 'cprofile'
+
+SERVICE_START = 'start'
+SERVICE_STOP = 'stop'
+
+# Seconds between two measurements of the event loop lag
+LAG_INTERVAL = 1
+
+# Number of recorded jobs returned by the API by default
+DEFAULT_RECORDS = 100
+
+# cProfile statistics are saved to this file in the config dir
+PROFILE_FILE = 'profiler_{}.prof'
+
+KIND_CALLBACK = 'callback'
+KIND_COROUTINE = 'coroutine'
+KIND_EXECUTOR = 'executor'
+KIND_LOOP_LAG = 'loop_lag'
+
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.Schema({
+        vol.Optional(CONF_BUFFER_SIZE, default=DEFAULT_BUFFER_SIZE):
+            cv.positive_int,
+    }),
+}, extra=vol.ALLOW_EXTRA)
+
+SERVICE_START_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_CPROFILE, default=False): cv.boolean,
+})
+
+SERVICE_STOP_SCHEMA = vol.Schema({})
+
+
+@asyncio.coroutine
+def async_setup(hass, config):
+    """Set up the profiler component."""
+    profiler = hass.data[DATA_PROFILER] = Profiler(
+        hass, config[DOMAIN][CONF_BUFFER_SIZE])
+
+    hass.http.register_view(ProfilerView(profiler))
+
+    @asyncio.coroutine
+    def async_handle_start(service):
+        """Start profiling."""
+        profiler.async_start(service.data[ATTR_CPROFILE])
+
+    @asyncio.coroutine
+    def async_handle_stop(service):
+        """Stop profiling and save the cProfile statistics."""
+        profile = profiler.async_stop()
+
+        if profile is None:
+            return
+
+        path = hass.config.path(PROFILE_FILE.format(
+            dt_util.utcnow().strftime('%Y%m%d%H%M%S')))
+        yield from hass.async_add_job(profile.dump_stats, path)
+        _LOGGER.info("Saved profile statistics to %s", path)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_START, async_handle_start,
+        schema=SERVICE_START_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, SERVICE_STOP, async_handle_stop, schema=SERVICE_STOP_SCHEMA)
+
+    return True
+
+
+def _job_name(target):
+    """Return the name of the function executed by a job."""
+    while isinstance(target, functools.partial):
+        target = target.func
+
+    name = getattr(target, '__qualname__', None)
+
+    if name is None:
+        return repr(target)
+
+    module = getattr(target, '__module__', None)
+    if module is None:
+        # Coroutine objects do not have a module
+        code = getattr(target, 'cr_code', getattr(target, 'gi_code', None))
+        return name if code is None else '{} ({})'.format(
+            name, code.co_filename)
+
+    return '{}.{}'.format(module, name)
+
+
+class JobStats(object):
+    """Statistics of the jobs executing the same function."""
+
+    __slots__ = ['count', 'total', 'max', 'max_lag']
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.max_lag = 0.0
+
+    def add(self, lag, duration):
+        """Add an executed job."""
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.max_lag = max(self.max_lag, lag)
+
+
+class Profiler(object):
+    """Record the execution of jobs while profiling.
+
+    Jobs are timed by wrapping the targets passed to async_add_job and
+    async_run_job. For coroutines only the time spent between two
+    suspensions is counted, which is the time they block the event loop.
+    """
+
+    def __init__(self, hass, buffer_size):
+        """Initialize the profiler."""
+        self.hass = hass
+        self.records = deque(maxlen=buffer_size)
+        self.jobs = {}
+        self.events = {}
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self.executor_queue = 0
+        self.max_executor_queue = 0
+        self.started = None
+        self._profile = None
+        self._probe = None
+
+    @property
+    def running(self):
+        """Return if profiling."""
+        return self.started is not None
+
+    @callback
+    def async_start(self, cprofile=False):
+        """Start recording jobs, events and the loop lag."""
+        if self.running:
+            return
+
+        self.records.clear()
+        self.jobs.clear()
+        self.events.clear()
+        self.max_loop_lag = self.max_executor_queue = 0
+        self.started = dt_util.utcnow()
+
+        # Instance attributes take precedence over the class methods
+        self.hass.async_add_job = self._async_add_job
+        self.hass.async_run_job = self._async_run_job
+        self.hass.bus.async_fire = self._async_fire
+
+        self._probe = self.hass.loop.call_later(
+            LAG_INTERVAL, self._async_probe,
+            self.hass.loop.time() + LAG_INTERVAL)
+
+        if cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        _LOGGER.info("Profiler started")
+
+    @callback
+    def async_stop(self):
+        """Stop profiling, return the cProfile profile if one was running."""
+        if not self.running:
+            return None
+
+        del self.hass.async_add_job
+        del self.hass.async_run_job
+        del self.hass.bus.async_fire
+
+        self._probe.cancel()
+        self._probe = None
+        self.started = None
+
+        profile, self._profile = self._profile, None
+        if profile is not None:
+            profile.disable()
+
+        _LOGGER.info("Profiler stopped")
+        return profile
+
+    @callback
+    def _async_record(self, kind, name, lag, duration):
+        """Record the execution of a job."""
+        self.records.append((time.time(), kind, name, lag, duration))
+
+        stats = self.jobs.get(name)
+        if stats is None:
+            stats = self.jobs[name] = JobStats()
+        stats.add(lag, duration)
+
+    @callback
+    def _async_probe(self, expected):
+        """Measure how late the event loop runs a scheduled callback."""
+        loop = self.hass.loop
+        self.loop_lag = loop.time() - expected
+        self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+        self.records.append(
+            (time.time(), KIND_LOOP_LAG, None, self.loop_lag, 0))
+
+        # pylint: disable=protected-access
+        self.executor_queue = self.hass.executor._work_queue.qsize()
+        self.max_executor_queue = max(
+            self.max_executor_queue, self.executor_queue)
+
+        self._probe = loop.call_later(
+            LAG_INTERVAL, self._async_probe, loop.time() + LAG_INTERVAL)
+
+    @callback
+    def _async_add_job(self, target, *args):
+        """Add a job that records its execution."""
+        name = _job_name(target)
+        scheduled = self.hass.loop.time()
+
+        if asyncio.iscoroutine(target):
+            target = self._timed_coroutine(name, target, scheduled)
+        elif is_callback(target):
+            target = self._timed_callback(name, target, scheduled)
+        elif asyncio.iscoroutinefunction(target):
+            target = self._timed_coroutine(name, target(*args), scheduled)
+            args = ()
+        else:
+            target = self._timed_executor_job(name, target, scheduled)
+
+        return HomeAssistant.async_add_job(self.hass, target, *args)
+
+    @callback
+    def _async_run_job(self, target, *args):
+        """Run a job that records its execution.
+
+        Callbacks are called directly, so they have no lag.
+        """
+        if not asyncio.iscoroutine(target) and is_callback(target):
+            self._timed_callback(
+                _job_name(target), target, self.hass.loop.time())(*args)
+        else:
+            self._async_add_job(target, *args)
+
+    def _timed_callback(self, name, target, scheduled):
+        """Wrap a callback to record its execution."""
+        @callback
+        def timed_callback(*args):
+            """Run the callback."""
+            start = self.hass.loop.time()
+            try:
+                return target(*args)
+            finally:
+                self._async_record(
+                    KIND_CALLBACK, name, start - scheduled,
+                    self.hass.loop.time() - start)
+
+        return timed_callback
+
+    def _timed_executor_job(self, name, target, scheduled):
+        """Wrap a function run in the executor to record its execution.
+
+        The lag of an executor job is the time it waited in the queue.
+        """
+        loop = self.hass.loop
+
+        def timed_job(*args):
+            """Run the job."""
+            start = loop.time()
+            try:
+                return target(*args)
+            finally:
+                loop.call_soon_threadsafe(
+                    self._async_record, KIND_EXECUTOR, name,
+                    start - scheduled, loop.time() - start)
+
+        return timed_job
+
+    @asyncio.coroutine
+    def _timed_coroutine(self, name, coro, scheduled):
+        """Run a coroutine and record the time spent in its steps."""
+        loop = self.hass.loop
+        lag = None
+        duration = 0.0
+        value = error = None
+
+        while True:
+            start = loop.time()
+            if lag is None:
+                lag = start - scheduled
+
+            try:
+                if error is None:
+                    future = coro.send(value)
+                else:
+                    future = coro.throw(error)
+            except StopIteration as result:
+                duration += loop.time() - start
+                self._async_record(KIND_COROUTINE, name, lag, duration)
+                return result.value
+            except BaseException:
+                duration += loop.time() - start
+                self._async_record(KIND_COROUTINE, name, lag, duration)
+                raise
+
+            duration += loop.time() - start
+            value = error = None
+
+            try:
+                value = yield future
+            except BaseException as err:  # pylint: disable=broad-except
+                error = err
+
+    @callback
+    def _async_fire(self, event_type, event_data=None,
+                    origin=EventOrigin.local):
+        """Fire an event and count the listeners it is passed to."""
+        # pylint: disable=protected-access
+        listeners = self.hass.bus._listeners
+        fan_out = len(listeners.get(event_type, ())) + \
+            len(listeners.get(MATCH_ALL, ()))
+
+        stats = self.events.get(event_type)
+        if stats is None:
+            stats = self.events[event_type] = [0, 0]
+        stats[0] += 1
+        stats[1] += fan_out
+
+        EventBus.async_fire(self.hass.bus, event_type, event_data, origin)
+
+    @callback
+    def async_as_dict(self, records=DEFAULT_RECORDS):
+        """Return the recorded statistics and the most recent records."""
+        jobs = sorted(self.jobs.items(), key=lambda item: item[1].total,
+                      reverse=True)
+        recent = list(self.records)[-records:] if records else []
+
+        return {
+            'running': self.running,
+            'started': self.started,
+            'loop_lag': {
+                'last': self.loop_lag,
+                'max': self.max_loop_lag,
+            },
+            'executor_queue': {
+                'last': self.executor_queue,
+                'max': self.max_executor_queue,
+            },
+            'jobs': [{
+                'name': name,
+                'count': stats.count,
+                'total': stats.total,
+                'max': stats.max,
+                'max_lag': stats.max_lag,
+            } for name, stats in jobs],
+            'events': {
+                event_type: {'fired': fired, 'listeners': listeners}
+                for event_type, (fired, listeners) in self.events.items()
+            },
+            'records': [{
+                'time': timestamp,
+                'kind': kind,
+                'name': name,
+                'lag': lag,
+                'duration': duration,
+            } for timestamp, kind, name, lag, duration in recent],
+        }
+
+
+class ProfilerView(HomeAssistantView):
+    """View to get the profiler statistics."""
+
+    url = '/api/profiler'
+    name = 'api:profiler'
+
+    def __init__(self, profiler):
+        """Initialize the profiler view."""
+        self.profiler = profiler
+
+    @asyncio.coroutine
+    def get(self, request):
+        """Return the profiler statistics."""
+        try:
+            records = int(request.query.get('records', DEFAULT_RECORDS))
+        except ValueError:
+            records = -1
+
+        if records < 0:
+            return self.json_message('Invalid records', 400)
+
+        return self.json(self.profiler.async_as_dict(records))
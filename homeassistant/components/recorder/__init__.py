@@ -13,7 +13,7 @@ import logging
 import queue
 import threading
 import time
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 
@@ -30,7 +30,7 @@ from homeassistant.helpers.entityfilter import generate_filter
 from homeassistant.helpers.typing import ConfigType
 import homeassistant.util.dt as dt_util
 
-from . import purge, migration
+from . import purge, migration, statistics
 from .const import DATA_INSTANCE
 from .util import session_scope
 
@@ -56,9 +56,16 @@ CONF_DB_URL = 'db_url'
 CONF_PURGE_KEEP_DAYS = 'purge_keep_days'
 CONF_PURGE_INTERVAL = 'purge_interval'
 CONF_EVENT_TYPES = 'event_types'
+CONF_COMMIT_MAX_BATCH = 'commit_max_batch'
+CONF_COMMIT_MAX_LATENCY = 'commit_max_latency'
 
 CONNECT_RETRY_WAIT = 3
 
+DEFAULT_COMMIT_MAX_BATCH = 100
+DEFAULT_COMMIT_MAX_LATENCY = 0
+
+ATTRIBUTES_IDS_CACHE_SIZE = 2048
+
 FILTER_SCHEMA = vol.Schema({
     vol.Optional(CONF_EXCLUDE, default={}): vol.Schema({
         vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
@@ -81,6 +88,11 @@ CONFIG_SCHEMA = vol.Schema({
         vol.Inclusive(CONF_PURGE_INTERVAL, 'purge'):
             vol.All(vol.Coerce(int), vol.Range(min=1)),
         vol.Optional(CONF_DB_URL): cv.string,
+        vol.Optional(CONF_COMMIT_MAX_BATCH, default=DEFAULT_COMMIT_MAX_BATCH):
+            vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_COMMIT_MAX_LATENCY,
+                     default=DEFAULT_COMMIT_MAX_LATENCY):
+            vol.All(vol.Coerce(float), vol.Range(min=0)),
     })
 }, extra=vol.ALLOW_EXTRA)
 
@@ -121,6 +133,10 @@ def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     conf = config.get(DOMAIN, {})
     keep_days = conf.get(CONF_PURGE_KEEP_DAYS)
     purge_interval = conf.get(CONF_PURGE_INTERVAL)
+    commit_max_batch = conf.get(CONF_COMMIT_MAX_BATCH,
+                                DEFAULT_COMMIT_MAX_BATCH)
+    commit_max_latency = conf.get(CONF_COMMIT_MAX_LATENCY,
+                                  DEFAULT_COMMIT_MAX_LATENCY)
 
     db_url = conf.get(CONF_DB_URL, None)
     if not db_url:
@@ -131,7 +147,9 @@ def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     exclude = conf.get(CONF_EXCLUDE, {})
     instance = hass.data[DATA_INSTANCE] = Recorder(
         hass=hass, keep_days=keep_days, purge_interval=purge_interval,
-        uri=db_url, include=include, exclude=exclude)
+        uri=db_url, include=include, exclude=exclude,
+        commit_max_batch=commit_max_batch,
+        commit_max_latency=commit_max_latency)
     instance.async_initialize()
     instance.start()
 
@@ -155,13 +173,23 @@ class Recorder(threading.Thread):
 
     def __init__(self, hass: HomeAssistant, keep_days: int,
                  purge_interval: int, uri: str,
-                 include: Dict, exclude: Dict) -> None:
+                 include: Dict, exclude: Dict,
+                 commit_max_batch: int=DEFAULT_COMMIT_MAX_BATCH,
+                 commit_max_latency: float=DEFAULT_COMMIT_MAX_LATENCY) \
+            -> None:
         """Initialize the recorder."""
         threading.Thread.__init__(self, name='Recorder')
 
         self.hass = hass
         self.keep_days = keep_days
         self.purge_interval = purge_interval
+        self.commit_max_batch = commit_max_batch
+        self.commit_max_latency = commit_max_latency
+        # Ids of the shared attributes that were recently written
+        self._attributes_ids = OrderedDict()  # type: OrderedDict
+        # Most recent last_updated per entity, protected from purging
+        self.latest_updated = {}  # type: Dict[str, datetime]
+        self.latest_updated_loaded = False
         self.queue = queue.Queue()  # type: Any
         self.recording_start = dt_util.utcnow()
         self.db_url = uri
@@ -189,9 +217,8 @@ class Recorder(threading.Thread):
 
     def run(self):
         """Start processing events to save."""
-        from .models import States, Events
+        from .models import Events
         from homeassistant.components import persistent_notification
-        from sqlalchemy import exc
 
         tries = 1
         connected = False
@@ -280,8 +307,15 @@ class Recorder(threading.Thread):
         if result is shutdown_task:
             return
 
+        # Purge or shutdown task that ended the previous batch
+        pending = []
+        purge_run = purge_task = None
+
         while True:
-            event = self.queue.get()
+            if pending:
+                event = pending.pop()
+            else:
+                event = self.queue.get()
 
             if event is None:
                 self._close_run()
@@ -289,49 +323,181 @@ class Recorder(threading.Thread):
                 self.queue.task_done()
                 return
             elif isinstance(event, PurgeTask):
-                purge.purge_old_data(self, event.keep_days)
-                self.queue.task_done()
-                continue
-            elif event.event_type == EVENT_TIME_CHANGED:
+                # Purge in batches, continuing after the events that got
+                # queued in the meantime
+                if purge_run is None:
+                    purge_run = purge.PurgeRun(event.keep_days)
+                    purge_task = event
+
+                if event is purge_task:
+                    if purge.purge_batch(self, purge_run):
+                        purge_run = None
+                    else:
+                        self.queue.put(event)
+                else:
+                    _LOGGER.debug("Purge already in progress, ignoring %s",
+                                  event)
+
                 self.queue.task_done()
                 continue
-            elif event.event_type in self.exclude_t:
+
+            batch = self._get_batch(event, pending)
+            events = [event for event in batch if self._keep_event(event)]
+
+            if events:
+                self._commit_events(events)
+
+            for _ in batch:
                 self.queue.task_done()
-                continue
 
-            entity_id = event.data.get(ATTR_ENTITY_ID)
-            if entity_id is not None:
-                if not self.entity_filter(entity_id):
-                    self.queue.task_done()
-                    continue
-
-            tries = 1
-            updated = False
-            while not updated and tries <= 10:
-                if tries != 1:
-                    time.sleep(CONNECT_RETRY_WAIT)
-                try:
-                    with session_scope(session=self.get_session()) as session:
+    def _get_batch(self, event, pending):
+        """Drain the queue into a batch of events to commit together.
+
+        The batch is limited by commit_max_batch and commit_max_latency.
+        A purge or shutdown task ends the batch and is added to pending
+        so it is processed after the batch has been committed.
+        """
+        batch = [event]
+        deadline = time.monotonic() + self.commit_max_latency
+
+        while len(batch) < self.commit_max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    event = self.queue.get(timeout=remaining)
+                else:
+                    event = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if event is None or isinstance(event, PurgeTask):
+                pending.append(event)
+                break
+
+            batch.append(event)
+
+        return batch
+
+    def _keep_event(self, event):
+        """Return if the event should be recorded."""
+        if event.event_type == EVENT_TIME_CHANGED or \
+                event.event_type in self.exclude_t:
+            return False
+
+        entity_id = event.data.get(ATTR_ENTITY_ID)
+        return entity_id is None or self.entity_filter(entity_id)
+
+    def _commit_events(self, events):
+        """Write a batch of events in a single transaction."""
+        from .models import States, Events, StateAttributes
+        from sqlalchemy import exc
+
+        tries = 1
+        updated = False
+        while not updated and tries <= 10:
+            if tries != 1:
+                time.sleep(CONNECT_RETRY_WAIT)
+            new_attributes_ids = {}
+            try:
+                with session_scope(session=self.get_session()) as session:
+                    dbevents = []
+                    dbstates = []
+                    new_attributes = {}
+                    for event in events:
                         dbevent = Events.from_event(event)
-                        session.add(dbevent)
+                        dbevents.append(dbevent)
+
+                        if event.event_type != EVENT_STATE_CHANGED:
+                            continue
+
+                        # Store the attributes in the shared table
+                        dbstate = States.from_event(event)
+                        shared_attrs = dbstate.attributes
+                        dbstate.attributes = None
+                        dbstate.attributes_id = self._get_attributes_id(
+                            session, shared_attrs)
+                        dbstates.append((dbevent, dbstate, shared_attrs))
+
+                        if dbstate.attributes_id is None and \
+                                shared_attrs not in new_attributes:
+                            new_attributes[shared_attrs] = StateAttributes(
+                                hash=StateAttributes.hash_shared_attrs(
+                                    shared_attrs),
+                                shared_attrs=shared_attrs)
+
+                    session.add_all(dbevents)
+                    session.add_all(new_attributes.values())
+                    # Flush to get the ids of the events and attributes
+                    session.flush()
+
+                    for shared_attrs, dbattributes in new_attributes.items():
+                        new_attributes_ids[shared_attrs] = \
+                            dbattributes.attributes_id
+
+                    for dbevent, dbstate, shared_attrs in dbstates:
+                        dbstate.event_id = dbevent.event_id
+                        if dbstate.attributes_id is None:
+                            dbstate.attributes_id = \
+                                new_attributes_ids[shared_attrs]
+
+                    if dbstates:
+                        session.bulk_save_objects(
+                            [dbstate for _, dbstate, _ in dbstates])
+                        statistics.compile_statistics(session, [
+                            event.data.get('new_state') for event in events
+                            if event.event_type == EVENT_STATE_CHANGED])
+                updated = True
+
+            except exc.OperationalError as err:
+                _LOGGER.error("Error in database connectivity: %s. "
+                              "(retrying in %s seconds)", err,
+                              CONNECT_RETRY_WAIT)
+                tries += 1
+
+        if not updated:
+            _LOGGER.error("Error in database update. Could not save "
+                          "after %d tries. Giving up", tries)
+            return
+
+        for shared_attrs, attributes_id in new_attributes_ids.items():
+            self._cache_attributes_id(shared_attrs, attributes_id)
+
+        for event in events:
+            if event.event_type == EVENT_STATE_CHANGED:
+                new_state = event.data.get('new_state')
+                self.latest_updated[event.data['entity_id']] = \
+                    event.time_fired if new_state is None \
+                    else new_state.last_updated
+
+    def _get_attributes_id(self, session, shared_attrs):
+        """Return the id of stored shared attributes or None if unknown."""
+        from .models import StateAttributes
+
+        attributes_id = self._attributes_ids.get(shared_attrs)
+        if attributes_id is not None:
+            self._attributes_ids.move_to_end(shared_attrs)
+            return attributes_id
+
+        res = session.query(StateAttributes.attributes_id).filter(
+            (StateAttributes.hash ==
+             StateAttributes.hash_shared_attrs(shared_attrs)) &
+            (StateAttributes.shared_attrs == shared_attrs)).first()
 
-                        if event.event_type == EVENT_STATE_CHANGED:
-                            dbstate = States.from_event(event)
-                            dbstate.event_id = dbevent.event_id
-                            session.add(dbstate)
-                    updated = True
+        if res is None:
+            return None
 
-                except exc.OperationalError as err:
-                    _LOGGER.error("Error in database connectivity: %s. "
-                                  "(retrying in %s seconds)", err,
-                                  CONNECT_RETRY_WAIT)
-                    tries += 1
+        self._cache_attributes_id(shared_attrs, res[0])
+        return res[0]
 
-            if not updated:
-                _LOGGER.error("Error in database update. Could not save "
-                              "after %d tries. Giving up", tries)
+    def clear_attributes_ids(self):
+        """Forget the ids of written shared attributes."""
+        self._attributes_ids.clear()
 
-            self.queue.task_done()
+    def _cache_attributes_id(self, shared_attrs, attributes_id):
+        """Remember the id of stored shared attributes."""
+        self._attributes_ids[shared_attrs] = attributes_id
+        if len(self._attributes_ids) > ATTRIBUTES_IDS_CACHE_SIZE:
+            self._attributes_ids.popitem(last=False)
 
     @callback
     def event_listener(self, event):
@@ -362,6 +528,9 @@ class Recorder(threading.Thread):
                 old_isolation = dbapi_connection.isolation_level
                 dbapi_connection.isolation_level = None
                 cursor = dbapi_connection.cursor()
+                # Only has effect for new databases, purging converts
+                # existing ones.
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
                 cursor.execute("PRAGMA journal_mode=WAL")
                 cursor.close()
                 dbapi_connection.isolation_level = old_isolation
@@ -380,6 +549,10 @@ class Recorder(threading.Thread):
 
         self.engine = create_engine(self.db_url, **kwargs)
         models.Base.metadata.create_all(self.engine)
+        # Cached data belongs to the previous database
+        self._attributes_ids.clear()
+        self.latest_updated.clear()
+        self.latest_updated_loaded = False
         self.get_session = scoped_session(sessionmaker(bind=self.engine))
 
     def _close_connection(self):
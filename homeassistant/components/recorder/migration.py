@@ -114,6 +114,21 @@ def _drop_index(engine, table_name, index_name):
                         "critical operation.", index_name, table_name)
 
 
+def _add_columns(engine, table_name, columns_def):
+    """Add columns to a table."""
+    from sqlalchemy import text
+
+    _LOGGER.info("Adding columns %s to table %s. Note: this can take several "
+                 "minutes on large databases and slow computers. Please "
+                 "be patient!",
+                 ', '.join(column.split(' ')[0] for column in columns_def),
+                 table_name)
+
+    for column_def in columns_def:
+        engine.execute(text("ALTER TABLE {table} ADD COLUMN {column}".format(
+            table=table_name, column=column_def)))
+
+
 def _apply_update(engine, new_version, old_version):
     """Perform operations to bring schema up to date."""
     if new_version == 1:
@@ -143,6 +158,18 @@ def _apply_update(engine, new_version, old_version):
         _drop_index(engine, "states", "ix_states_entity_id_created")
 
         _create_index(engine, "states", "ix_states_entity_id_last_updated")
+    elif new_version == 5:
+        # Attributes are stored deduplicated in the state_attributes table,
+        # which is created with the other missing tables. Existing rows keep
+        # their inline attributes.
+        _add_columns(engine, "states", [
+            'attributes_id INTEGER REFERENCES state_attributes(attributes_id)'
+        ])
+        _create_index(engine, "states", "ix_states_attributes_id")
+    elif new_version == 6:
+        # The statistics table is created with the other missing tables.
+        # Statistics are compiled for states recorded from now on.
+        pass
     else:
         raise ValueError("No schema migration defined for version {}"
                          .format(new_version))
@@ -1,11 +1,15 @@
 """Models for SQLAlchemy."""
+from collections import OrderedDict
 import json
 from datetime import datetime
 import logging
+import threading
+import weakref
+import zlib
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text,
-    distinct)
+    BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer,
+    String, Text, distinct)
 from sqlalchemy.ext.declarative import declarative_base
 
 import homeassistant.util.dt as dt_util
@@ -16,10 +20,20 @@ from homeassistant.remote import JSONEncoder
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 4
+SCHEMA_VERSION = 6
+
+# Number of decoded shared attributes kept in memory
+ATTRIBUTES_CACHE_SIZE = 2048
+# Number of shared attributes loaded with one query, stays below the
+# maximum number of variables of a SQLite query
+ATTRIBUTES_QUERY_SIZE = 500
 
 _LOGGER = logging.getLogger(__name__)
 
+# Decoded shared attributes by attributes_id, for each database engine
+_ATTRIBUTES_CACHES = weakref.WeakKeyDictionary()  # type: ignore
+_ATTRIBUTES_CACHE_LOCK = threading.Lock()
+
 
 class Events(Base):  # type: ignore
     """Event history data."""
@@ -47,7 +61,7 @@ class Events(Base):  # type: ignore
                 self.event_type,
                 json.loads(self.event_data),
                 EventOrigin(self.origin),
-                _process_timestamp(self.time_fired)
+                process_timestamp(self.time_fired)
             )
         except ValueError:
             # When json.loads fails
@@ -64,6 +78,8 @@ class States(Base):   # type: ignore
     entity_id = Column(String(255))
     state = Column(String(255))
     attributes = Column(Text)
+    attributes_id = Column(
+        Integer, ForeignKey('state_attributes.attributes_id'), index=True)
     event_id = Column(Integer, ForeignKey('events.event_id'))
     last_changed = Column(DateTime(timezone=True), default=datetime.utcnow)
     last_updated = Column(DateTime(timezone=True), default=datetime.utcnow,
@@ -106,15 +122,166 @@ class States(Base):   # type: ignore
         try:
             return State(
                 self.entity_id, self.state,
-                json.loads(self.attributes),
-                _process_timestamp(self.last_changed),
-                _process_timestamp(self.last_updated)
+                self._native_attributes(),
+                process_timestamp(self.last_changed),
+                process_timestamp(self.last_updated)
             )
         except ValueError:
             # When json.loads fails
             _LOGGER.exception("Error converting row to state: %s", self)
             return None
 
+    def _native_attributes(self):
+        """Return the attributes, resolving shared attributes if needed."""
+        if self.attributes_id is None:
+            return json.loads(self.attributes)
+
+        from sqlalchemy.orm.session import Session
+
+        session = Session.object_session(self)
+
+        if session is None:
+            raise ValueError("Detached state with attributes_id {}".format(
+                self.attributes_id))
+
+        with _ATTRIBUTES_CACHE_LOCK:
+            cache = _attributes_cache(session.get_bind())
+            attributes = cache.get(self.attributes_id)
+            if attributes is not None:
+                cache.move_to_end(self.attributes_id)
+                return attributes
+
+        shared = session.query(StateAttributes).get(self.attributes_id)
+        if shared is None:
+            raise ValueError("Unknown attributes_id {}".format(
+                self.attributes_id))
+
+        attributes = json.loads(shared.shared_attrs)
+
+        with _ATTRIBUTES_CACHE_LOCK:
+            _cache_attributes(cache, self.attributes_id, attributes)
+
+        return attributes
+
+
+class StateAttributes(Base):   # type: ignore
+    """Attributes shared between state changes, keyed by content hash."""
+
+    __tablename__ = 'state_attributes'
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the content hash of the serialized attributes."""
+        return zlib.crc32(shared_attrs.encode('utf-8'))
+
+
+def load_shared_attributes(rows):
+    """Load the shared attributes of state rows that are not cached yet.
+
+    Loads them with a query per ATTRIBUTES_QUERY_SIZE attributes instead of
+    a query per row when the rows are converted to native states.
+    """
+    from sqlalchemy.orm.session import Session
+
+    states = [row for row in rows
+              if isinstance(row, States) and row.attributes_id is not None]
+    session = Session.object_session(states[0]) if states else None
+
+    if session is None:
+        return
+
+    with _ATTRIBUTES_CACHE_LOCK:
+        cache = _attributes_cache(session.get_bind())
+        missing = sorted(set(
+            row.attributes_id for row in states
+            if row.attributes_id not in cache))
+
+    for idx in range(0, len(missing), ATTRIBUTES_QUERY_SIZE):
+        query = session.query(StateAttributes).filter(
+            StateAttributes.attributes_id.in_(
+                missing[idx:idx + ATTRIBUTES_QUERY_SIZE]))
+
+        for shared in query:
+            try:
+                attributes = json.loads(shared.shared_attrs)
+            except ValueError:
+                # Reported when converting the rows using them
+                continue
+
+            with _ATTRIBUTES_CACHE_LOCK:
+                _cache_attributes(cache, shared.attributes_id, attributes)
+
+
+def _attributes_cache(engine):
+    """Return the cache of decoded shared attributes of an engine.
+
+    Needs to be called with the cache lock held.
+    """
+    cache = _ATTRIBUTES_CACHES.get(engine)
+    if cache is None:
+        cache = _ATTRIBUTES_CACHES[engine] = OrderedDict()
+    return cache
+
+
+def _cache_attributes(cache, attributes_id, attributes):
+    """Add decoded shared attributes to a cache.
+
+    Needs to be called with the cache lock held.
+    """
+    cache[attributes_id] = attributes
+    cache.move_to_end(attributes_id)
+    if len(cache) > ATTRIBUTES_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def clear_attributes_cache(engine):
+    """Clear the cache of decoded shared attributes of a database engine.
+
+    Needs to be called when shared attributes are deleted as their ids can
+    be reused by the database.
+    """
+    with _ATTRIBUTES_CACHE_LOCK:
+        _ATTRIBUTES_CACHES.pop(engine, None)
+
+
+class Statistics(Base):   # type: ignore
+    """Aggregates of the numeric states of an entity over a period."""
+
+    __tablename__ = 'statistics'
+    id = Column(Integer, primary_key=True)
+    entity_id = Column(String(255))
+    period = Column(String(8))
+    start = Column(DateTime(timezone=True))
+    count = Column(Integer)
+    min = Column(Float)
+    max = Column(Float)
+    mean = Column(Float)
+    last = Column(Float)
+    sum = Column(Float)
+
+    __table_args__ = (
+        # Used for fetching the statistics of entities for a range
+        # (get_statistics in history.py)
+        Index('ix_statistics_entity_id_period_start',
+              'entity_id', 'period', 'start', unique=True),)
+
+    def to_native(self):
+        """Return the statistics as a dictionary."""
+        return {
+            'entity_id': self.entity_id,
+            'period': self.period,
+            'start': process_timestamp(self.start),
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'last': self.last,
+            'sum': self.sum,
+        }
+
 
 class RecorderRuns(Base):   # type: ignore
     """Representation of recorder run."""
@@ -164,7 +331,7 @@ class SchemaChanges(Base):   # type: ignore
     changed = Column(DateTime(timezone=True), default=datetime.utcnow)
 
 
-def _process_timestamp(ts):
+def process_timestamp(ts):
     """Process a timestamp into datetime object."""
     if ts is None:
         return None
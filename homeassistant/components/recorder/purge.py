@@ -1,6 +1,7 @@
 """Purge old data helper."""
 from datetime import timedelta
 import logging
+import time
 
 import homeassistant.util.dt as dt_util
 
@@ -8,51 +9,275 @@ from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of rows deleted per table in a single batch
+PURGE_BATCH_SIZE = 1000
+
+# Number of free pages returned to the file system per batch
+VACUUM_PAGES_PER_BATCH = 1000
+
+# Value of PRAGMA auto_vacuum for incremental mode
+SQLITE_AUTO_VACUUM_INCREMENTAL = 2
+
+STEP_STATES = 'states'
+STEP_EVENTS = 'events'
+STEP_ATTRIBUTES = 'attributes'
+STEP_VACUUM = 'vacuum'
+STEPS = (STEP_STATES, STEP_EVENTS, STEP_ATTRIBUTES, STEP_VACUUM)
+
+
+class PurgeRun(object):
+    """Track the progress of a purge that is executed in batches."""
+
+    def __init__(self, purge_days):
+        """Initialize the purge run."""
+        self.purge_before = dt_util.utcnow() - timedelta(days=purge_days)
+        self.step = STEP_STATES
+        self.last_id = 0
+        self.batches = 0
+        self.deleted = {STEP_STATES: 0, STEP_EVENTS: 0, STEP_ATTRIBUTES: 0}
+        self.elapsed = 0
+
+    @property
+    def done(self):
+        """Return if all steps have been executed."""
+        return self.step is None
+
+    @property
+    def rows_per_second(self):
+        """Return the number of rows deleted per second spent purging."""
+        if not self.elapsed:
+            return 0
+        return sum(self.deleted.values()) / self.elapsed
+
+    def next_step(self):
+        """Continue with the next step."""
+        idx = STEPS.index(self.step) + 1
+        self.step = STEPS[idx] if idx < len(STEPS) else None
+        self.last_id = 0
+
+    def __repr__(self):
+        """Return the representation."""
+        return ("<PurgeRun step={} batches={} states={} events={} "
+                "attributes={} rows/s={:.0f}>").format(
+                    self.step, self.batches, self.deleted[STEP_STATES],
+                    self.deleted[STEP_EVENTS], self.deleted[STEP_ATTRIBUTES],
+                    self.rows_per_second)
+
 
 def purge_old_data(instance, purge_days):
-    """Purge events and states older than purge_days ago."""
-    from .models import States, Events
+    """Purge events and states older than purge_days ago.
+
+    Runs all batches at once, the recorder uses purge_batch to be able to
+    record events in between.
+    """
+    purge_run = PurgeRun(purge_days)
+
+    while not purge_batch(instance, purge_run):
+        pass
+
+    return purge_run
+
+
+def purge_batch(instance, purge_run, batch_size=PURGE_BATCH_SIZE):
+    """Execute the next batch of a purge run.
+
+    Returns True when the purge run is done.
+    """
+    start = time.monotonic()
+
+    if purge_run.step == STEP_STATES:
+        deleted = _purge_states(instance, purge_run, batch_size)
+    elif purge_run.step == STEP_EVENTS:
+        deleted = _purge_events(instance, purge_run, batch_size)
+    elif purge_run.step == STEP_ATTRIBUTES:
+        deleted = _purge_attributes(instance, purge_run, batch_size)
+    else:
+        deleted = None
+        if not _incremental_vacuum(instance):
+            purge_run.next_step()
+
+    if deleted is not None:
+        purge_run.deleted[purge_run.step] += deleted
+
+        if purge_run.last_id is None:
+            purge_run.next_step()
+
+    purge_run.batches += 1
+    purge_run.elapsed += time.monotonic() - start
+
+    if not purge_run.done:
+        _LOGGER.debug("Purge in progress: %s", purge_run)
+        return False
+
+    _LOGGER.info(
+        "Purged %s states, %s events and %s shared attributes in %d "
+        "batches (%.0f rows/s)", purge_run.deleted[STEP_STATES],
+        purge_run.deleted[STEP_EVENTS], purge_run.deleted[STEP_ATTRIBUTES],
+        purge_run.batches, purge_run.rows_per_second)
+    return True
+
+
+def _next_ids(session, purge_run, batch_size, column, *extra_columns,
+              criterion=None):
+    """Return the next batch of primary keys and advance the purge run."""
+    query = session.query(column, *extra_columns) \
+        .filter(column > purge_run.last_id)
+
+    if criterion is not None:
+        query = query.filter(criterion)
+
+    rows = query.order_by(column).limit(batch_size).all()
+
+    if len(rows) < batch_size:
+        purge_run.last_id = None
+    else:
+        purge_run.last_id = rows[-1][0]
+
+    return rows
+
+
+def _purge_states(instance, purge_run, batch_size):
+    """Delete a batch of old states.
+
+    For each entity, the most recent state is protected from deletion s.t. we
+    can properly restore state even if the entity has not been updated in a
+    long time.
+    """
+    from .models import States, process_timestamp
+
+    with session_scope(session=instance.get_session()) as session:
+        latest = _latest_updated(instance, session)
+
+        rows = _next_ids(
+            session, purge_run, batch_size,
+            States.state_id, States.entity_id, States.last_updated,
+            criterion=States.last_updated < purge_run.purge_before)
+
+        state_ids = [
+            state_id for state_id, entity_id, last_updated in rows
+            if entity_id in latest and
+            process_timestamp(last_updated) < latest[entity_id]]
+
+        if not state_ids:
+            return 0
+
+        return session.query(States) \
+            .filter(States.state_id.in_(state_ids)) \
+            .delete(synchronize_session=False)
+
+
+def _latest_updated(instance, session):
+    """Return the last_updated of the most recent state of each entity.
+
+    The table is only scanned for the first purge, the recorder keeps the
+    result up to date with the states it writes.
+    """
+    from .models import States, process_timestamp
     from sqlalchemy import func
 
-    purge_before = dt_util.utcnow() - timedelta(days=purge_days)
+    latest = instance.latest_updated
+
+    if instance.latest_updated_loaded:
+        return latest
+
+    for entity_id, last_updated in session.query(
+            States.entity_id, func.max(States.last_updated)) \
+            .group_by(States.entity_id):
+        last_updated = process_timestamp(last_updated)
+        if entity_id not in latest or latest[entity_id] < last_updated:
+            latest[entity_id] = last_updated
+
+    instance.latest_updated_loaded = True
+    return latest
+
+
+def _purge_events(instance, purge_run, batch_size):
+    """Delete a batch of old events.
+
+    We also need to protect the events belonging to the remaining states.
+    Otherwise, if the SQL server has "ON DELETE CASCADE" as default, it will
+    delete the protected state when deleting its associated event. Also, we
+    would be producing NULLed foreign keys otherwise.
+    """
+    from .models import States, Events
+
+    with session_scope(session=instance.get_session()) as session:
+        event_ids = [row[0] for row in _next_ids(
+            session, purge_run, batch_size, Events.event_id,
+            criterion=Events.time_fired < purge_run.purge_before)]
+
+        if not event_ids:
+            return 0
+
+        protected = set(row[0] for row in session.query(States.event_id)
+                        .filter(States.event_id.in_(event_ids)))
+        event_ids = [event_id for event_id in event_ids
+                     if event_id not in protected]
+
+        if not event_ids:
+            return 0
+
+        return session.query(Events) \
+            .filter(Events.event_id.in_(event_ids)) \
+            .delete(synchronize_session=False)
+
+
+def _purge_attributes(instance, purge_run, batch_size):
+    """Delete a batch of shared attributes no state refers to anymore."""
+    from .models import States, StateAttributes, clear_attributes_cache
 
     with session_scope(session=instance.get_session()) as session:
-        # For each entity, the most recent state is protected from deletion
-        # s.t. we can properly restore state even if the entity has not been
-        # updated in a long time
-        protected_states = session.query(States.state_id, States.event_id,
-                                         func.max(States.last_updated)) \
-                              .group_by(States.entity_id).all()
-
-        protected_state_ids = tuple((state[0] for state in protected_states))
-        protected_event_ids = tuple((state[1] for state in protected_states))
-
-        deleted_rows = session.query(States) \
-                              .filter((States.last_updated < purge_before)) \
-                              .filter(~States.state_id.in_(
-                                  protected_state_ids)) \
-                              .delete(synchronize_session=False)
-        _LOGGER.debug("Deleted %s states", deleted_rows)
-
-        # We also need to protect the events belonging to the protected states.
-        # Otherwise, if the SQL server has "ON DELETE CASCADE" as default, it
-        # will delete the protected state when deleting its associated
-        # event. Also, we would be producing NULLed foreign keys otherwise.
-        deleted_rows = session.query(Events) \
-            .filter((Events.time_fired < purge_before)) \
-            .filter(~Events.event_id.in_(
-                protected_event_ids
-            )) \
+        attributes_ids = [row[0] for row in _next_ids(
+            session, purge_run, batch_size, StateAttributes.attributes_id)]
+
+        if not attributes_ids:
+            return 0
+
+        used = set(row[0] for row in session.query(States.attributes_id)
+                   .filter(States.attributes_id.in_(attributes_ids)))
+        attributes_ids = [attributes_id for attributes_id in attributes_ids
+                          if attributes_id not in used]
+
+        if not attributes_ids:
+            return 0
+
+        deleted = session.query(StateAttributes) \
+            .filter(StateAttributes.attributes_id.in_(attributes_ids)) \
             .delete(synchronize_session=False)
-        _LOGGER.debug("Deleted %s events", deleted_rows)
-
-    # Execute sqlite vacuum command to free up space on disk
-    _LOGGER.debug("DB engine driver: %s", instance.engine.driver)
-    if instance.engine.driver == 'pysqlite':
-        from sqlalchemy import exc
-
-        _LOGGER.info("Vacuuming SQLite to free space")
-        try:
-            instance.engine.execute("VACUUM")
-        except exc.OperationalError as err:
-            _LOGGER.error("Error vacuuming SQLite: %s.", err)
+
+    # Ids of deleted attributes can be reused by the database
+    clear_attributes_cache(instance.engine)
+    instance.clear_attributes_ids()
+
+    return deleted
+
+
+def _incremental_vacuum(instance):
+    """Return free SQLite pages to the file system.
+
+    Returns True while there are free pages left.
+    """
+    from sqlalchemy import exc
+
+    if instance.engine.driver != 'pysqlite':
+        return False
+
+    try:
+        with instance.engine.connect() as conn:
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").scalar()
+
+            if auto_vacuum != SQLITE_AUTO_VACUUM_INCREMENTAL:
+                # Databases created before incremental vacuum was enabled
+                # need a full vacuum once to switch mode.
+                _LOGGER.info("Vacuuming SQLite to enable incremental "
+                             "vacuum. This will only happen once")
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+                return False
+
+            conn.execute("PRAGMA incremental_vacuum({})".format(
+                VACUUM_PAGES_PER_BATCH))
+            return conn.execute("PRAGMA freelist_count").scalar() > 0
+    except exc.OperationalError as err:
+        _LOGGER.error("Error vacuuming SQLite: %s.", err)
+        return False
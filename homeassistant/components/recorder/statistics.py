@@ -0,0 +1,185 @@
+"""Long-term statistics of numeric states."""
+from datetime import timedelta
+import logging
+
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+import homeassistant.util.dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+PERIOD_HOUR = 'hour'
+PERIOD_DAY = 'day'
+PERIODS = (PERIOD_HOUR, PERIOD_DAY)
+
+QUERY_MAX_ENTITIES = 500
+
+
+def period_start(period, moment):
+    """Return the UTC start of the period that contains moment.
+
+    Days start at local midnight.
+    """
+    if period == PERIOD_HOUR:
+        return dt_util.as_utc(moment).replace(
+            minute=0, second=0, microsecond=0)
+
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(dt_util.as_local(moment)))
+
+
+def period_end(period, start):
+    """Return the UTC end of the period starting at start."""
+    if period == PERIOD_HOUR:
+        return start + timedelta(hours=1)
+
+    # Add more than a day to be safe for DST changes
+    return period_start(period, start + timedelta(hours=26))
+
+
+def numeric_value(state):
+    """Return the value of a numeric state with a unit or None."""
+    if state is None or ATTR_UNIT_OF_MEASUREMENT not in state.attributes:
+        return None
+
+    try:
+        return float(state.state)
+    except ValueError:
+        return None
+
+
+class Aggregate(object):
+    """Aggregate of the values of an entity over a period."""
+
+    __slots__ = ['count', 'min', 'max', 'last', 'sum']
+
+    def __init__(self, count=0, min_value=None, max_value=None, last=None,
+                 sum_value=0.0):
+        """Initialize the aggregate."""
+        self.count = count
+        self.min = min_value
+        self.max = max_value
+        self.last = last
+        self.sum = sum_value
+
+    @property
+    def mean(self):
+        """Return the mean of the values."""
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+    def add(self, value):
+        """Add a value, values need to be added in chronological order."""
+        if not self.count:
+            self.min = self.max = value
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        self.count += 1
+        self.last = value
+        self.sum += value
+
+    def merge(self, other):
+        """Add the values of a more recent aggregate."""
+        if not other.count:
+            return
+        if not self.count:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.last = other.last
+        self.sum += other.sum
+
+    def as_dict(self, entity_id, period, start):
+        """Return the aggregate in the format of stored statistics."""
+        return {
+            'entity_id': entity_id,
+            'period': period,
+            'start': start,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'last': self.last,
+            'sum': self.sum,
+        }
+
+
+def aggregate_states(states, periods=PERIODS):
+    """Aggregate numeric states per entity, period and period start.
+
+    States need to be in chronological order.
+    """
+    aggregates = {}
+
+    for state in states:
+        value = numeric_value(state)
+        if value is None:
+            continue
+
+        for period in periods:
+            key = (state.entity_id, period,
+                   period_start(period, state.last_updated))
+            aggregate = aggregates.get(key)
+            if aggregate is None:
+                aggregate = aggregates[key] = Aggregate()
+            aggregate.add(value)
+
+    return aggregates
+
+
+def _existing_statistics(session, aggregates):
+    """Return the stored statistics of the aggregates by key."""
+    from .models import Statistics, process_timestamp
+
+    entity_ids = sorted(set(key[0] for key in aggregates))
+    starts = set(key[2] for key in aggregates)
+    rows = {}
+
+    # Stay below the maximum number of variables of a SQLite query
+    for idx in range(0, len(entity_ids), QUERY_MAX_ENTITIES):
+        query = session.query(Statistics).filter(
+            Statistics.entity_id.in_(
+                entity_ids[idx:idx + QUERY_MAX_ENTITIES]) &
+            Statistics.start.in_(starts))
+
+        for row in query:
+            rows[(row.entity_id, row.period,
+                  process_timestamp(row.start))] = row
+
+    return rows
+
+
+def compile_statistics(session, states):
+    """Add the numeric states to the hourly and daily statistics.
+
+    Has to be called with the states of a commit in chronological order,
+    within the transaction writing them.
+    """
+    from .models import Statistics
+
+    aggregates = aggregate_states(states)
+    rows = _existing_statistics(session, aggregates)
+
+    for (entity_id, period, start), aggregate in aggregates.items():
+        row = rows.get((entity_id, period, start))
+
+        if row is None:
+            row = Statistics(entity_id=entity_id, period=period, start=start)
+            session.add(row)
+        else:
+            stored = Aggregate(row.count, row.min, row.max, row.last,
+                               row.sum)
+            stored.merge(aggregate)
+            aggregate = stored
+
+        row.count = aggregate.count
+        row.min = aggregate.min
+        row.max = aggregate.max
+        row.mean = aggregate.mean
+        row.last = aggregate.last
+        row.sum = aggregate.sum
+
+    return len(aggregates)
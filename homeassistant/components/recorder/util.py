@@ -1,5 +1,6 @@
 """SQLAlchemy util functions."""
 from contextlib import contextmanager
+from itertools import islice
 import logging
 import time
 
@@ -9,6 +10,9 @@ _LOGGER = logging.getLogger(__name__)
 
 RETRIES = 3
 QUERY_RETRY_WAIT = 0.1
+# Rows converted to native objects at once, stays below the size of the
+# cache of shared attributes
+NATIVE_CHUNK_SIZE = 1000
 
 
 @contextmanager
@@ -59,10 +63,7 @@ def execute(qry):
     for tryno in range(0, RETRIES):
         try:
             timer_start = time.perf_counter()
-            result = [
-                row for row in
-                (row.to_native() for row in qry)
-                if row is not None]
+            result = list(rows_to_native(qry))
 
             if _LOGGER.isEnabledFor(logging.DEBUG):
                 elapsed = time.perf_counter() - timer_start
@@ -78,3 +79,24 @@ def execute(qry):
                 raise
             else:
                 time.sleep(QUERY_RETRY_WAIT)
+
+
+def rows_to_native(rows):
+    """Convert rows to HA native form, skipping rows that fail to convert.
+
+    The shared attributes of the states are loaded per chunk of rows.
+    """
+    from .models import load_shared_attributes
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, NATIVE_CHUNK_SIZE))
+        if not chunk:
+            return
+
+        load_shared_attributes(chunk)
+
+        for row in chunk:
+            native = row.to_native()
+            if native is not None:
+                yield native
@@ -115,6 +115,10 @@ class HistoryStatsSensor(Entity):
         self.value = 0
         self.count = 0
 
+        # Totals up to the last processed state change of the period, so
+        # only newer state changes have to be queried on the next update
+        self._processed = None
+
         def force_refresh(*args):
             """Force the component to refresh."""
             self.schedule_update_ha_state(True)
@@ -195,23 +199,31 @@ class HistoryStatsSensor(Entity):
             # Don't compute anything as the value cannot have changed
             return
 
-        # Get history between start and end
+        if self._processed is not None and \
+                self._processed[0] == start_timestamp:
+            # Same period start, continue after the processed changes
+            _, last_state, last_time, elapsed, count, query_start = \
+                self._processed
+            resume = True
+        else:
+            last_state = False
+            last_time = start_timestamp
+            elapsed = 0
+            count = 0
+            query_start = start
+            resume = False
+
+        # Get history between the start (or last processed change) and end,
+        # the state at the last processed change is already accounted for
         history_list = history.state_changes_during_period(
-            self.hass, start, end, str(self._entity_id))
+            self.hass, query_start, end, str(self._entity_id),
+            include_start_time_state=not resume)
 
-        if self._entity_id not in history_list.keys():
+        if not resume and self._entity_id not in history_list.keys():
             return
 
-        # Get the first state
-        last_state = history.get_state(self.hass, start, self._entity_id)
-        last_state = (last_state is not None and
-                      last_state == self._entity_state)
-        last_time = start_timestamp
-        elapsed = 0
-        count = 0
-
         # Make calculations
-        for item in history_list.get(self._entity_id):
+        for item in history_list.get(self._entity_id, []):
             current_state = item.state == self._entity_state
             current_time = item.last_changed.timestamp()
 
@@ -222,6 +234,10 @@ class HistoryStatsSensor(Entity):
 
             last_state = current_state
             last_time = current_time
+            query_start = max(query_start, item.last_updated)
+
+        self._processed = (start_timestamp, last_state, last_time, elapsed,
+                           count, query_start)
 
         # Count time elapsed between last history state and end of measure
         if last_state:
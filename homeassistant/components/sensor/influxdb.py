@@ -8,6 +8,7 @@ import logging
 from datetime import timedelta
 
 import voluptuous as vol
+from homeassistant.components.influxdb import DOMAIN as INFLUXDB_DOMAIN
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (CONF_HOST, CONF_PORT, CONF_USERNAME,
                                  CONF_PASSWORD, CONF_SSL, CONF_VERIFY_SSL,
@@ -66,8 +67,25 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=60)
 
 
+# Counters of the InfluxDB writer: attribute, name and unit
+WRITER_COUNTERS = (
+    ('points_buffered', 'InfluxDB points buffered', 'points'),
+    ('points_flushed', 'InfluxDB points flushed', 'points'),
+    ('points_dropped', 'InfluxDB points dropped', 'points'),
+    ('points_spooled', 'InfluxDB points spooled', 'points'),
+    ('flush_latency', 'InfluxDB flush latency', 'ms'),
+)
+
+
 def setup_platform(hass, config, add_devices, discovery_info=None):
     """Set up the InfluxDB component."""
+    if discovery_info is not None:
+        # Discovered by the InfluxDB component to monitor its writer
+        writer = hass.data[INFLUXDB_DOMAIN]
+        add_devices([InfluxWriterSensor(writer, *counter)
+                     for counter in WRITER_COUNTERS], True)
+        return
+
     influx_conf = {
         'host': config[CONF_HOST],
         'password': config.get(CONF_PASSWORD),
@@ -158,6 +176,42 @@ class InfluxSensor(Entity):
         self._state = value
 
 
+class InfluxWriterSensor(Entity):
+    """Representation of a counter of the InfluxDB writer."""
+
+    def __init__(self, writer, attribute, name, unit_of_measurement):
+        """Initialize the sensor."""
+        self._writer = writer
+        self._attribute = attribute
+        self._name = name
+        self._unit_of_measurement = unit_of_measurement
+        self._state = None
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        return self._state
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement of this entity, if any."""
+        return self._unit_of_measurement
+
+    def update(self):
+        """Get the latest value of the counter."""
+        value = getattr(self._writer, self._attribute)
+
+        if value is not None and self._unit_of_measurement == 'ms':
+            value = round(value * 1000, 1)
+
+        self._state = value
+
+
 class InfluxSensorData(object):
     """Class for handling the data retrieval."""
 
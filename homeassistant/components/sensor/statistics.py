@@ -6,20 +6,20 @@ https://home-assistant.io/components/sensor.statistics/
 """
 import asyncio
 import logging
-import statistics
-from collections import deque
 
 import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
-    CONF_NAME, CONF_ENTITY_ID, STATE_UNKNOWN, ATTR_UNIT_OF_MEASUREMENT)
-from homeassistant.core import callback
+    CONF_NAME, CONF_ENTITY_ID, STATE_UNKNOWN, ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_HOMEASSISTANT_START)
+from homeassistant.core import CoreState, callback
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import async_track_state_change
 from homeassistant.util import dt as dt_util
-from homeassistant.components.recorder.util import session_scope, execute
+from homeassistant.util.rolling import RollingWindow
+from homeassistant.components.recorder.util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,10 +38,15 @@ ATTR_TOTAL = 'total'
 CONF_SAMPLING_SIZE = 'sampling_size'
 CONF_MAX_AGE = 'max_age'
 
+DATA_PENDING_SENSORS = 'statistics_pending_sensors'
+
 DEFAULT_NAME = 'Stats'
 DEFAULT_SIZE = 20
 ICON = 'mdi:calculator'
 
+# Maximum number of sensors initialized by one database query
+QUERY_SENSORS = 100
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
     vol.Required(CONF_ENTITY_ID): cv.entity_id,
     vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
@@ -59,12 +64,107 @@ def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
     sampling_size = config.get(CONF_SAMPLING_SIZE)
     max_age = config.get(CONF_MAX_AGE, None)
 
-    async_add_devices(
-        [StatisticsSensor(hass, entity_id, name, sampling_size, max_age)],
-        True)
+    sensor = StatisticsSensor(hass, entity_id, name, sampling_size, max_age)
+
+    if 'recorder' in hass.config.components:
+        # only use the database if it's configured
+        yield from async_initialize_from_database(hass, sensor)
+
+    async_add_devices([sensor], True)
     return True
 
 
+@asyncio.coroutine
+def async_initialize_from_database(hass, sensor):
+    """Initialize a sensor with the states stored by the recorder.
+
+    The sensors set up before Home Assistant is started are initialized
+    together with a single query once it has started.
+    """
+    if hass.state == CoreState.running:
+        yield from _async_initialize_sensors(hass, [sensor])
+        return
+
+    pending = hass.data.get(DATA_PENDING_SENSORS)
+
+    if pending is None:
+        pending = hass.data[DATA_PENDING_SENSORS] = []
+
+        @asyncio.coroutine
+        def async_initialize_pending(event):
+            """Initialize the sensors set up before the start."""
+            sensors = hass.data.pop(DATA_PENDING_SENSORS)
+            yield from _async_initialize_sensors(hass, sensors)
+
+            for pending_sensor in sensors:
+                pending_sensor.async_schedule_update_ha_state(True)
+
+        hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_START, async_initialize_pending)
+
+    pending.append(sensor)
+
+
+@asyncio.coroutine
+def _async_initialize_sensors(hass, sensors):
+    """Load the recorded states of the sources of the sensors."""
+    for idx in range(0, len(sensors), QUERY_SENSORS):
+        chunk = sensors[idx:idx + QUERY_SENSORS]
+        states = yield from hass.async_add_job(
+            _load_states, hass, chunk, dt_util.utcnow())
+
+        for sensor in chunk:
+            sensor.async_initialize(states.get(sensor.source_entity_id, []))
+
+
+def _load_states(hass, sensors, now):
+    """Return the last states of the sources of the sensors, oldest first.
+
+    One query selects the latest sampling_size states of every source,
+    skipping states older than max_age.
+    """
+    from sqlalchemy import select, union_all
+    from homeassistant.components.recorder.models import (
+        States, process_timestamp)
+
+    # Sensors with the same source share the widest window
+    windows = {}
+    for sensor in sensors:
+        entity_id = sensor.source_entity_id
+        if entity_id not in windows:
+            windows[entity_id] = (sensor.sampling_size, sensor.max_age)
+            continue
+
+        size, max_age = windows[entity_id]
+        if sensor.max_age is None or (
+                max_age is not None and sensor.max_age > max_age):
+            max_age = sensor.max_age
+        windows[entity_id] = (max(size, sensor.sampling_size), max_age)
+
+    table = States.__table__
+    queries = []
+    for entity_id, (size, max_age) in windows.items():
+        query = select([table.c.entity_id, table.c.state,
+                        table.c.last_updated]) \
+            .where(table.c.entity_id == entity_id)
+        if max_age is not None:
+            query = query.where(table.c.last_updated > now - max_age)
+        queries.append(select([query.order_by(
+            table.c.last_updated.desc()).limit(size).alias()]))
+
+    states = {}
+    with session_scope(hass=hass) as session:
+        for entity_id, state, last_updated in session.execute(
+                union_all(*queries)):
+            states.setdefault(entity_id, []).append(
+                (state, process_timestamp(last_updated)))
+
+    for entity_states in states.values():
+        entity_states.reverse()
+
+    return states
+
+
 class StatisticsSensor(Entity):
     """Representation of a Statistics sensor."""
 
@@ -81,18 +181,12 @@ class StatisticsSensor(Entity):
         self._sampling_size = sampling_size
         self._max_age = max_age
         self._unit_of_measurement = None
-        self.states = deque(maxlen=self._sampling_size)
-        if self._max_age is not None:
-            self.ages = deque(maxlen=self._sampling_size)
+        self.states = RollingWindow(sampling_size, max_age)
 
         self.median = self.mean = self.variance = self.stdev = 0
         self.min = self.max = self.total = self.count = 0
         self.average_change = self.change = 0
 
-        if 'recorder' in self._hass.config.components:
-            # only use the database if it's configured
-            hass.async_add_job(self._initzialize_from_database)
-
         @callback
         # pylint: disable=invalid-name
         def async_stats_sensor_state_listener(entity, old_state, new_state):
@@ -100,22 +194,46 @@ class StatisticsSensor(Entity):
             self._unit_of_measurement = new_state.attributes.get(
                 ATTR_UNIT_OF_MEASUREMENT)
 
-            self._add_state_to_queue(new_state)
+            self._add_state_to_queue(new_state.state, dt_util.utcnow())
 
             hass.async_add_job(self.async_update_ha_state, True)
 
         async_track_state_change(
             hass, entity_id, async_stats_sensor_state_listener)
 
-    def _add_state_to_queue(self, new_state):
+    @property
+    def source_entity_id(self):
+        """Return the entity id of the source of the statistics."""
+        return self._entity_id.lower()
+
+    @property
+    def sampling_size(self):
+        """Return the maximum number of samples."""
+        return self._sampling_size
+
+    @property
+    def max_age(self):
+        """Return the maximum age of the samples."""
+        return self._max_age
+
+    def _add_state_to_queue(self, state, timestamp):
+        self.count = self.count + 1
         try:
-            self.states.append(float(new_state.state))
-            if self._max_age is not None:
-                now = dt_util.utcnow()
-                self.ages.append(now)
-            self.count = self.count + 1
+            self.states.add(float(state), timestamp)
         except ValueError:
-            self.count = self.count + 1
+            pass
+
+    @callback
+    def async_initialize(self, states):
+        """Add the recorded states before the ones received since setup."""
+        received = self.states.items()
+        self.states.clear()
+
+        for state, last_updated in states:
+            self._add_state_to_queue(state, last_updated)
+
+        for value, timestamp in received:
+            self.states.add(value, timestamp)
 
     @property
     def name(self):
@@ -160,67 +278,33 @@ class StatisticsSensor(Entity):
         """Return the icon to use in the frontend, if any."""
         return ICON
 
-    def _purge_old(self):
-        """Remove states which are older than self._max_age."""
-        now = dt_util.utcnow()
-
-        while (len(self.ages) > 0) and (now - self.ages[0]) > self._max_age:
-            self.ages.popleft()
-            self.states.popleft()
-
     @asyncio.coroutine
     def async_update(self):
         """Get the latest data and updates the states."""
-        if self._max_age is not None:
-            self._purge_old()
+        self.states.purge(dt_util.utcnow())
 
         if not self.is_binary:
-            try:  # require only one data point
-                self.mean = round(statistics.mean(self.states), 2)
-                self.median = round(statistics.median(self.states), 2)
-            except statistics.StatisticsError as err:
-                _LOGGER.error(err)
-                self.mean = self.median = STATE_UNKNOWN
-
-            try:  # require at least two data points
-                self.stdev = round(statistics.stdev(self.states), 2)
-                self.variance = round(statistics.variance(self.states), 2)
-            except statistics.StatisticsError as err:
-                _LOGGER.error(err)
-                self.stdev = self.variance = STATE_UNKNOWN
-
-            if self.states:
-                self.total = round(sum(self.states), 2)
-                self.min = min(self.states)
-                self.max = max(self.states)
-                self.change = self.states[-1] - self.states[0]
+            states = self.states
+
+            if states:
+                self.mean = round(states.mean, 2)
+                self.median = round(states.median, 2)
+                self.total = round(states.total, 2)
+                self.min = states.min
+                self.max = states.max
+                self.change = states.last - states.first
                 self.average_change = self.change
-                if len(self.states) > 1:
-                    self.average_change /= len(self.states) - 1
+                if len(states) > 1:
+                    self.average_change /= len(states) - 1
             else:
+                _LOGGER.error("No numeric states of %s", self._entity_id)
+                self.mean = self.median = STATE_UNKNOWN
                 self.min = self.max = self.total = STATE_UNKNOWN
                 self.average_change = self.change = STATE_UNKNOWN
 
-    @asyncio.coroutine
-    def _initzialize_from_database(self):
-        """Initialize the list of states from the database.
-
-        The query will get the list of states in DESCENDING order so that we
-        can limit the result to self._sample_size. Afterwards reverse the
-        list so that we get it in the right order again.
-        """
-        from homeassistant.components.recorder.models import States
-        _LOGGER.debug("initializing values for %s from the database",
-                      self.entity_id)
-
-        with session_scope(hass=self._hass) as session:
-            query = session.query(States)\
-                .filter(States.entity_id == self._entity_id.lower())\
-                .order_by(States.last_updated.desc())\
-                .limit(self._sampling_size)
-            states = execute(query)
-
-        for state in reversed(states):
-            self._add_state_to_queue(state)
-
-        _LOGGER.debug("initializing from database completed")
+            # require at least two data points
+            if len(states) > 1:
+                self.stdev = round(states.stdev, 2)
+                self.variance = round(states.variance, 2)
+            else:
+                self.stdev = self.variance = STATE_UNKNOWN
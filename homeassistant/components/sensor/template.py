@@ -15,10 +15,10 @@ from homeassistant.const import (
     ATTR_FRIENDLY_NAME, ATTR_UNIT_OF_MEASUREMENT, CONF_VALUE_TEMPLATE,
     CONF_ICON_TEMPLATE, CONF_ENTITY_PICTURE_TEMPLATE, ATTR_ENTITY_ID,
     CONF_SENSORS, EVENT_HOMEASSISTANT_START)
-from homeassistant.exceptions import TemplateError
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import Entity, async_generate_entity_id
-from homeassistant.helpers.event import async_track_state_change
+from homeassistant.helpers.event import (
+    async_track_render_infos, async_track_state_change)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -52,8 +52,7 @@ def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
         icon_template = device_config.get(CONF_ICON_TEMPLATE)
         entity_picture_template = device_config.get(
             CONF_ENTITY_PICTURE_TEMPLATE)
-        entity_ids = (device_config.get(ATTR_ENTITY_ID) or
-                      state_template.extract_entities())
+        entity_ids = device_config.get(ATTR_ENTITY_ID)
         friendly_name = device_config.get(ATTR_FRIENDLY_NAME, device)
         unit_of_measurement = device_config.get(ATTR_UNIT_OF_MEASUREMENT)
 
@@ -103,6 +102,8 @@ class SensorTemplate(Entity):
         self._icon = None
         self._entity_picture = None
         self._entities = entity_ids
+        self._dependencies = None
+        self._async_unsub_dependencies = None
 
     @asyncio.coroutine
     def async_added_to_hass(self):
@@ -115,8 +116,9 @@ class SensorTemplate(Entity):
         @callback
         def template_sensor_startup(event):
             """Update template on startup."""
-            async_track_state_change(
-                self.hass, self._entities, template_sensor_state_listener)
+            if self._entities is not None:
+                async_track_state_change(
+                    self.hass, self._entities, template_sensor_state_listener)
 
             self.async_schedule_update_ha_state(True)
 
@@ -153,18 +155,56 @@ class SensorTemplate(Entity):
         """No polling needed."""
         return False
 
+    @callback
+    def _async_track_dependencies(self, render_infos):
+        """Track the states accessed by the templates in the last update.
+
+        Only used when no entity ids were configured.
+        """
+        if self._entities is not None:
+            return
+
+        dependencies = [info.dependencies for info in render_infos]
+        if dependencies == self._dependencies:
+            return
+
+        if self._async_unsub_dependencies is not None:
+            self._async_unsub_dependencies()
+
+        @callback
+        def template_sensor_state_listener(entity, old_state, new_state):
+            """Handle changes of the accessed states."""
+            self.async_schedule_update_ha_state(True)
+
+        self._dependencies = dependencies
+        self._async_unsub_dependencies = async_track_render_infos(
+            self.hass, render_infos, template_sensor_state_listener)
+
     @asyncio.coroutine
     def async_update(self):
         """Update the state from the template."""
+        render_infos = []
         try:
-            self._state = self._template.async_render()
-        except TemplateError as ex:
-            if ex.args and ex.args[0].startswith(
-                    "UndefinedError: 'None' has no attribute"):
-                # Common during HA startup - so just a warning
-                _LOGGER.warning('Could not render template %s,'
-                                ' the state is unknown.', self._name)
-                return
+            self._async_update(render_infos)
+        finally:
+            self._async_track_dependencies(render_infos)
+
+    @callback
+    def _async_update(self, render_infos):
+        """Render the templates and record the accessed states."""
+        info = self._template.async_render_to_info()
+        render_infos.append(info)
+        ex = info.exception
+
+        if ex is None:
+            self._state = info.result
+        elif ex.args and ex.args[0].startswith(
+                "UndefinedError: 'None' has no attribute"):
+            # Common during HA startup - so just a warning
+            _LOGGER.warning('Could not render template %s,'
+                            ' the state is unknown.', self._name)
+            return
+        else:
             self._state = None
             _LOGGER.error('Could not render template %s: %s', self._name, ex)
 
@@ -174,21 +214,26 @@ class SensorTemplate(Entity):
             if template is None:
                 continue
 
+            info = template.async_render_to_info()
+            render_infos.append(info)
+            ex = info.exception
+
+            if ex is None:
+                setattr(self, property_name, info.result)
+                continue
+
+            friendly_property_name = property_name[1:].replace('_', ' ')
+            if ex.args and ex.args[0].startswith(
+                    "UndefinedError: 'None' has no attribute"):
+                # Common during HA startup - so just a warning
+                _LOGGER.warning('Could not render %s template %s,'
+                                ' the state is unknown.',
+                                friendly_property_name, self._name)
+                return
+
             try:
-                setattr(self, property_name, template.async_render())
-            except TemplateError as ex:
-                friendly_property_name = property_name[1:].replace('_', ' ')
-                if ex.args and ex.args[0].startswith(
-                        "UndefinedError: 'None' has no attribute"):
-                    # Common during HA startup - so just a warning
-                    _LOGGER.warning('Could not render %s template %s,'
-                                    ' the state is unknown.',
-                                    friendly_property_name, self._name)
-                    return
-
-                try:
-                    setattr(self, property_name,
-                            getattr(super(), property_name))
-                except AttributeError:
-                    _LOGGER.error('Could not render %s template %s: %s',
-                                  friendly_property_name, self._name, ex)
+                setattr(self, property_name,
+                        getattr(super(), property_name))
+            except AttributeError:
+                _LOGGER.error('Could not render %s template %s: %s',
+                              friendly_property_name, self._name, ex)
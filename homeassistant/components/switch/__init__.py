@@ -105,21 +105,15 @@ def async_setup(hass, config):
         """Handle calls to the switch services."""
         target_switches = component.async_extract_from_service(service)
 
-        update_tasks = []
-        for switch in target_switches:
-            if service.service == SERVICE_TURN_ON:
-                yield from switch.async_turn_on()
-            elif service.service == SERVICE_TOGGLE:
-                yield from switch.async_toggle()
-            else:
-                yield from switch.async_turn_off()
-
-            if not switch.should_poll:
-                continue
-            update_tasks.append(switch.async_update_ha_state(True))
-
-        if update_tasks:
-            yield from asyncio.wait(update_tasks, loop=hass.loop)
+        if service.service == SERVICE_TURN_ON:
+            method = 'async_turn_on'
+        elif service.service == SERVICE_TOGGLE:
+            method = 'async_toggle'
+        else:
+            method = 'async_turn_off'
+
+        yield from component.async_call_entity_service(
+            target_switches, method)
 
     hass.services.async_register(
         DOMAIN, SERVICE_TURN_OFF, async_handle_switch_service,
@@ -5,6 +5,7 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/tts/
 """
 import asyncio
+from collections import OrderedDict
 import ctypes
 import functools as ft
 import hashlib
@@ -13,6 +14,7 @@ import logging
 import mimetypes
 import os
 import re
+import time
 
 from aiohttp import web
 import voluptuous as vol
@@ -22,12 +24,13 @@ from homeassistant.components.media_player import (
     ATTR_MEDIA_CONTENT_ID, ATTR_MEDIA_CONTENT_TYPE, MEDIA_TYPE_MUSIC,
     SERVICE_PLAY_MEDIA)
 from homeassistant.components.media_player import DOMAIN as DOMAIN_MP
-from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_per_platform
 import homeassistant.helpers.config_validation as cv
 from homeassistant.setup import async_prepare_setup_platform
+from homeassistant.util.json import load_json, save_json
 
 REQUIREMENTS = ['mutagen==1.39']
 
@@ -40,11 +43,15 @@ ATTR_OPTIONS = 'options'
 
 CONF_CACHE = 'cache'
 CONF_CACHE_DIR = 'cache_dir'
+CONF_CACHE_MAX_AGE = 'cache_max_age'
+CONF_CACHE_MAX_SIZE = 'cache_max_size'
 CONF_LANG = 'language'
+CONF_MEMORY_SIZE = 'memory_size'
 CONF_TIME_MEMORY = 'time_memory'
 
 DEFAULT_CACHE = True
 DEFAULT_CACHE_DIR = 'tts'
+DEFAULT_MEMORY_SIZE = 32
 DEFAULT_TIME_MEMORY = 300
 DEPENDENCIES = ['http']
 DOMAIN = 'tts'
@@ -52,6 +59,19 @@ DOMAIN = 'tts'
 MEM_CACHE_FILENAME = 'filename'
 MEM_CACHE_VOICE = 'voice'
 
+# The index of the files in the cache dir, so it is not listed at startup
+INDEX_FILENAME = 'tts_index.json'
+INDEX_VERSION = 1
+
+# Seconds to wait before writing the changes of the index
+INDEX_SAVE_DELAY = 10
+
+STAT_DISK_HITS = 'disk_hits'
+STAT_MEMORY_HITS = 'memory_hits'
+STAT_MISSES = 'misses'
+
+MEGABYTE = 1024 * 1024
+
 SERVICE_CLEAR_CACHE = 'clear_cache'
 SERVICE_SAY = 'say'
 
@@ -64,6 +84,12 @@ PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend({
     vol.Optional(CONF_CACHE_DIR, default=DEFAULT_CACHE_DIR): cv.string,
     vol.Optional(CONF_TIME_MEMORY, default=DEFAULT_TIME_MEMORY):
         vol.All(vol.Coerce(int), vol.Range(min=60, max=57600)),
+    vol.Optional(CONF_MEMORY_SIZE, default=DEFAULT_MEMORY_SIZE):
+        vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_CACHE_MAX_SIZE):
+        vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_CACHE_MAX_AGE):
+        vol.All(vol.Coerce(int), vol.Range(min=1)),
 })
 
 SCHEMA_SERVICE_SAY = vol.Schema({
@@ -87,13 +113,19 @@ def async_setup(hass, config):
         use_cache = conf.get(CONF_CACHE, DEFAULT_CACHE)
         cache_dir = conf.get(CONF_CACHE_DIR, DEFAULT_CACHE_DIR)
         time_memory = conf.get(CONF_TIME_MEMORY, DEFAULT_TIME_MEMORY)
+        memory_size = conf.get(CONF_MEMORY_SIZE, DEFAULT_MEMORY_SIZE)
+        max_size = conf.get(CONF_CACHE_MAX_SIZE)
+        max_age = conf.get(CONF_CACHE_MAX_AGE)
 
-        yield from tts.async_init_cache(use_cache, cache_dir, time_memory)
+        yield from tts.async_init_cache(
+            use_cache, cache_dir, time_memory, memory_size * MEGABYTE,
+            max_size and max_size * MEGABYTE, max_age and max_age * 86400)
     except (HomeAssistantError, KeyError) as err:
         _LOGGER.error("Error on cache init %s", err)
         return False
 
     hass.http.register_view(TextToSpeechView(tts))
+    hass.http.register_view(TextToSpeechCacheView(tts))
 
     @asyncio.coroutine
     def async_setup_platform(p_type, p_config, disc_info=None):
@@ -172,7 +204,12 @@ def async_setup(hass, config):
 
 
 class SpeechManager(object):
-    """Representation of a speech store."""
+    """Representation of a speech store.
+
+    Voices are kept in memory up to a size in bytes, least recently used
+    first out, and for at most time_memory seconds. The files in the cache
+    dir can be bounded by size and age and are listed in an index file.
+    """
 
     def __init__(self, hass):
         """Initialize a speech store."""
@@ -182,14 +219,34 @@ class SpeechManager(object):
         self.use_cache = DEFAULT_CACHE
         self.cache_dir = DEFAULT_CACHE_DIR
         self.time_memory = DEFAULT_TIME_MEMORY
-        self.file_cache = {}
-        self.mem_cache = {}
+        self.memory_size = DEFAULT_MEMORY_SIZE * MEGABYTE
+        self.cache_max_size = None
+        self.cache_max_age = None
+
+        # Least recently used first
+        self.mem_cache = OrderedDict()
+        self.mem_cache_size = 0
+        self.file_cache = OrderedDict()
+        self.file_cache_size = 0
+
+        # Size and last use of the files by key
+        self.file_info = {}
+        self.stats = {STAT_MEMORY_HITS: 0, STAT_DISK_HITS: 0, STAT_MISSES: 0}
+        self._index_save = None
 
     @asyncio.coroutine
-    def async_init_cache(self, use_cache, cache_dir, time_memory):
-        """Init config folder and load file cache."""
+    def async_init_cache(self, use_cache, cache_dir, time_memory,
+                         memory_size=DEFAULT_MEMORY_SIZE * MEGABYTE,
+                         max_size=None, max_age=None):
+        """Init config folder and load file cache.
+
+        Sizes are in bytes and max_age in seconds.
+        """
         self.use_cache = use_cache
         self.time_memory = time_memory
+        self.memory_size = memory_size
+        self.cache_max_size = max_size
+        self.cache_max_age = max_age
 
         def init_tts_cache_dir(cache_dir):
             """Init cache folder."""
@@ -207,36 +264,74 @@ class SpeechManager(object):
             raise HomeAssistantError("Can't init cache dir {}".format(err))
 
         def get_cache_files():
-            """Return a dict of given engine files."""
+            """Return the indexed files and if the dir was listed.
+
+            The dir is listed when files were added or removed after the
+            index was written, keeping the last use of the indexed files.
+            """
+            index_path = os.path.join(self.cache_dir, INDEX_FILENAME)
+            try:
+                index = load_json(index_path)
+            except HomeAssistantError:
+                index = {}
+
+            indexed = {}
+            if index.get('version') == INDEX_VERSION:
+                indexed = index['files']
+                if os.path.getmtime(self.cache_dir) <= \
+                        os.path.getmtime(index_path):
+                    return indexed, False
+
             cache = {}
 
-            folder_data = os.listdir(self.cache_dir)
-            for file_data in folder_data:
-                record = _RE_VOICE_FILE.match(file_data)
+            for filename in os.listdir(self.cache_dir):
+                record = _RE_VOICE_FILE.match(filename)
                 if record:
                     key = KEY_PATTERN.format(
                         record.group(1), record.group(2), record.group(3),
                         record.group(4)
-                    )
-                    cache[key.lower()] = file_data.lower()
-            return cache
+                    ).lower()
+                    stat = os.stat(os.path.join(self.cache_dir, filename))
+                    last_used = indexed[key][2] if key in indexed \
+                        else stat.st_mtime
+                    cache[key] = [filename.lower(), stat.st_size, last_used]
+            return cache, True
 
         try:
-            cache_files = yield from self.hass.async_add_job(get_cache_files)
+            cache_files, listed = yield from self.hass.async_add_job(
+                get_cache_files)
         except OSError as err:
             raise HomeAssistantError("Can't read cache dir {}".format(err))
 
-        if cache_files:
-            self.file_cache.update(cache_files)
+        for key, (filename, size, last_used) in sorted(
+                cache_files.items(), key=lambda item: item[1][2]):
+            self.file_cache[key] = filename
+            self.file_info[key] = (size, last_used)
+            self.file_cache_size += size
+
+        if self._async_purge_files() or listed:
+            self._async_schedule_index_save()
+
+        @asyncio.coroutine
+        def async_save_index_at_stop(event):
+            """Write the pending changes of the index."""
+            if self._index_save is not None:
+                self._index_save.cancel()
+                yield from self._async_save_index()
+
+        self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, async_save_index_at_stop)
 
     @asyncio.coroutine
     def async_clear_cache(self):
         """Read file cache and delete files."""
-        self.mem_cache = {}
+        self.mem_cache = OrderedDict()
+        self.mem_cache_size = 0
+        filenames = list(self.file_cache.values())
 
         def remove_files():
             """Remove files from filesystem."""
-            for _, filename in self.file_cache.items():
+            for filename in filenames:
                 try:
                     os.remove(os.path.join(self.cache_dir, filename))
                 except OSError as err:
@@ -244,7 +339,109 @@ class SpeechManager(object):
                         "Can't remove cache file '%s': %s", filename, err)
 
         yield from self.hass.async_add_job(remove_files)
-        self.file_cache = {}
+        self.file_cache = OrderedDict()
+        self.file_cache_size = 0
+        self.file_info = {}
+        self._async_schedule_index_save()
+
+    @callback
+    def _async_touch_file(self, key):
+        """Mark a file in the file cache as used."""
+        self.file_cache.move_to_end(key)
+        self.file_info[key] = (self.file_info[key][0], time.time())
+        self._async_schedule_index_save()
+
+    @callback
+    def _async_remove_file_from_cache(self, key):
+        """Remove a file from the file cache and return its filename."""
+        filename = self.file_cache.pop(key)
+        size, _ = self.file_info.pop(key)
+        self.file_cache_size -= size
+        self._async_schedule_index_save()
+        return filename
+
+    @callback
+    def _async_purge_files(self):
+        """Delete the least recently used files over the size or age limit.
+
+        Returns the number of deleted files.
+        """
+        filenames = []
+        now = time.time()
+
+        while self.file_cache:
+            key = next(iter(self.file_cache))
+            _, last_used = self.file_info[key]
+
+            if (self.cache_max_size is None or
+                    self.file_cache_size <= self.cache_max_size) and \
+                    (self.cache_max_age is None or
+                     now - last_used <= self.cache_max_age):
+                break
+
+            filenames.append(self._async_remove_file_from_cache(key))
+
+        if not filenames:
+            return 0
+
+        def remove_files():
+            """Remove files from filesystem."""
+            for filename in filenames:
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError as err:
+                    _LOGGER.warning(
+                        "Can't remove cache file '%s': %s", filename, err)
+
+        _LOGGER.debug("Removing %d files from the cache", len(filenames))
+        self.hass.async_add_job(remove_files)
+        return len(filenames)
+
+    @callback
+    def _async_schedule_index_save(self):
+        """Write the index of the file cache after a delay."""
+        if self._index_save is not None:
+            return
+
+        self._index_save = self.hass.loop.call_later(
+            INDEX_SAVE_DELAY,
+            lambda: self.hass.async_add_job(self._async_save_index()))
+
+    @asyncio.coroutine
+    def _async_save_index(self):
+        """Write the index of the file cache."""
+        self._index_save = None
+        index = {
+            'version': INDEX_VERSION,
+            'files': {key: [filename] + list(self.file_info[key])
+                      for key, filename in self.file_cache.items()},
+        }
+        path = os.path.join(self.cache_dir, INDEX_FILENAME)
+
+        def write_index():
+            """Write the index and replace the previous one."""
+            save_json(path + '.tmp', index)
+            os.replace(path + '.tmp', path)
+            # Replacing the index changes the mtime of the dir
+            os.utime(path)
+
+        try:
+            yield from self.hass.async_add_job(write_index)
+        except (HomeAssistantError, OSError) as err:
+            _LOGGER.error("Can't write the cache index: %s", err)
+
+    @callback
+    def async_cache_info(self):
+        """Return the size of the caches and the hit and miss counts."""
+        return dict(
+            self.stats,
+            memory_entries=len(self.mem_cache),
+            memory_size=self.mem_cache_size,
+            memory_max_size=self.memory_size,
+            disk_entries=len(self.file_cache),
+            disk_size=self.file_cache_size,
+            disk_max_size=self.cache_max_size,
+        )
 
     @callback
     def async_register_engine(self, engine, provider, config):
@@ -294,13 +491,17 @@ class SpeechManager(object):
 
         # Is speech already in memory
         if key in self.mem_cache:
+            self.mem_cache.move_to_end(key)
+            self.stats[STAT_MEMORY_HITS] += 1
             filename = self.mem_cache[key][MEM_CACHE_FILENAME]
-        # Is file store in file cache
+        # Is file store in file cache, it is served from the file
         elif use_cache and key in self.file_cache:
+            self._async_touch_file(key)
+            self.stats[STAT_DISK_HITS] += 1
             filename = self.file_cache[key]
-            self.hass.async_add_job(self.async_file_to_mem(key))
         # Load speech from provider into memory
         else:
+            self.stats[STAT_MISSES] += 1
             filename = yield from self.async_get_tts_audio(
                 engine, key, message, use_cache, language, options)
 
@@ -352,9 +553,18 @@ class SpeechManager(object):
 
         try:
             yield from self.hass.async_add_job(save_speech)
-            self.file_cache[key] = filename
         except OSError:
             _LOGGER.error("Can't write %s", filename)
+            return
+
+        if key in self.file_cache:
+            self._async_remove_file_from_cache(key)
+
+        self.file_cache[key] = filename
+        self.file_info[key] = (len(data), time.time())
+        self.file_cache_size += len(data)
+        self._async_schedule_index_save()
+        self._async_purge_files()
 
     @asyncio.coroutine
     def async_file_to_mem(self, key):
@@ -376,26 +586,62 @@ class SpeechManager(object):
         try:
             data = yield from self.hass.async_add_job(load_speech)
         except OSError:
-            del self.file_cache[key]
+            if key in self.file_cache:
+                self._async_remove_file_from_cache(key)
             raise HomeAssistantError("Can't read {}".format(voice_file))
 
         self._async_store_to_memcache(key, filename, data)
+        return data
 
     @callback
     def _async_store_to_memcache(self, key, filename, data):
-        """Store data to memcache and set timer to remove it."""
-        self.mem_cache[key] = {
+        """Store data to memcache and set timer to remove it.
+
+        The least recently used voices are removed to stay within the
+        memory size, but the new voice is always stored.
+        """
+        self._async_remove_from_memcache(key)
+
+        while self.mem_cache and \
+                self.mem_cache_size + len(data) > self.memory_size:
+            self._async_remove_from_memcache(next(iter(self.mem_cache)))
+
+        entry = self.mem_cache[key] = {
             MEM_CACHE_FILENAME: filename,
             MEM_CACHE_VOICE: data,
         }
+        self.mem_cache_size += len(data)
 
         @callback
         def async_remove_from_mem():
             """Cleanup memcache."""
-            self.mem_cache.pop(key)
+            if self.mem_cache.get(key) is entry:
+                self._async_remove_from_memcache(key)
 
         self.hass.loop.call_later(self.time_memory, async_remove_from_mem)
 
+    @callback
+    def _async_remove_from_memcache(self, key):
+        """Remove a voice from memcache."""
+        entry = self.mem_cache.pop(key, None)
+        if entry is not None:
+            self.mem_cache_size -= len(entry[MEM_CACHE_VOICE])
+
+    @callback
+    def async_get_cache_file(self, filename):
+        """Return the path of a voice in the file cache or None."""
+        record = _RE_VOICE_FILE.match(filename.lower())
+        if not record:
+            return None
+
+        key = KEY_PATTERN.format(
+            record.group(1), record.group(2), record.group(3), record.group(4))
+
+        if key not in self.file_cache:
+            return None
+
+        return os.path.join(self.cache_dir, self.file_cache[key])
+
     @asyncio.coroutine
     def async_read_tts(self, filename):
         """Read a voice file and return binary.
@@ -409,13 +655,16 @@ class SpeechManager(object):
         key = KEY_PATTERN.format(
             record.group(1), record.group(2), record.group(3), record.group(4))
 
-        if key not in self.mem_cache:
-            if key not in self.file_cache:
-                raise HomeAssistantError("%s not in cache!", key)
-            yield from self.async_file_to_mem(key)
+        if key in self.mem_cache:
+            self.mem_cache.move_to_end(key)
+            data = self.mem_cache[key][MEM_CACHE_VOICE]
+        elif key in self.file_cache:
+            data = yield from self.async_file_to_mem(key)
+        else:
+            raise HomeAssistantError("{} not in cache!".format(key))
 
         content, _ = mimetypes.guess_type(filename)
-        return (content, self.mem_cache[key][MEM_CACHE_VOICE])
+        return (content, data)
 
     @staticmethod
     def write_tags(filename, data, provider, message, language, options):
@@ -504,6 +753,12 @@ class TextToSpeechView(HomeAssistantView):
     @asyncio.coroutine
     def get(self, request, filename):
         """Start a get request."""
+        # Files in the cache are sent without reading them into memory
+        path = self.tts.async_get_cache_file(filename)
+        if path is not None and (yield from request.app['hass'].async_add_job(
+                os.path.isfile, path)):
+            return web.FileResponse(path)
+
         try:
             content, data = yield from self.tts.async_read_tts(filename)
         except HomeAssistantError as err:
@@ -511,3 +766,19 @@ class TextToSpeechView(HomeAssistantView):
             return web.Response(status=404)
 
         return web.Response(body=data, content_type=content)
+
+
+class TextToSpeechCacheView(HomeAssistantView):
+    """TTS view to get the cache statistics."""
+
+    url = '/api/tts_cache'
+    name = 'api:tts:cache'
+
+    def __init__(self, tts):
+        """Initialize a tts cache view."""
+        self.tts = tts
+
+    @asyncio.coroutine
+    def get(self, request):
+        """Return the sizes, hits and misses of the caches."""
+        return self.json(self.tts.async_cache_info())
@@ -33,6 +33,14 @@ URL = '/api/websocket'
 DEPENDENCIES = ('http',)
 
 MAX_PENDING_MSG = 512
+# Share of the pending messages events may use, the rest is kept free for
+# the replies to commands of clients not keeping up with the events
+MAX_PENDING_EVENTS_RATIO = 0.75
+
+DATA_SUBSCRIPTION_HUB = 'websocket_api_subscription_hub'
+
+# Event message with the event serialized once for all subscriptions
+EVENT_MESSAGE_TEMPLATE = '{{"id": {}, "type": "event", "event": {}}}'
 
 ERR_ID_REUSE = 1
 ERR_INVALID_FORMAT = 2
@@ -48,6 +56,7 @@ TYPE_GET_CONFIG = 'get_config'
 TYPE_GET_PANELS = 'get_panels'
 TYPE_GET_SERVICES = 'get_services'
 TYPE_GET_STATES = 'get_states'
+TYPE_GET_SUBSCRIPTION_STATS = 'get_subscription_stats'
 TYPE_PING = 'ping'
 TYPE_PONG = 'pong'
 TYPE_RESULT = 'result'
@@ -103,6 +112,11 @@ GET_PANELS_MESSAGE_SCHEMA = vol.Schema({
     vol.Required('type'): TYPE_GET_PANELS,
 })
 
+GET_SUBSCRIPTION_STATS_MESSAGE_SCHEMA = vol.Schema({
+    vol.Required('id'): cv.positive_int,
+    vol.Required('type'): TYPE_GET_SUBSCRIPTION_STATS,
+})
+
 PING_MESSAGE_SCHEMA = vol.Schema({
     vol.Required('id'): cv.positive_int,
     vol.Required('type'): TYPE_PING,
@@ -117,6 +131,7 @@ BASE_COMMAND_MESSAGE_SCHEMA = vol.Schema({
                                   TYPE_GET_SERVICES,
                                   TYPE_GET_CONFIG,
                                   TYPE_GET_PANELS,
+                                  TYPE_GET_SUBSCRIPTION_STATS,
                                   TYPE_PING)
 }, extra=vol.ALLOW_EXTRA)
 
@@ -154,6 +169,11 @@ def event_message(iden, event):
     }
 
 
+def serialized_event_message(iden, event_json):
+    """Return an event message for an already serialized event."""
+    return EVENT_MESSAGE_TEMPLATE.format(int(iden), event_json)
+
+
 def error_message(iden, code, message):
     """Return an error result message."""
     return {
@@ -192,6 +212,94 @@ def async_setup(hass, config):
     return True
 
 
+@callback
+def async_get_subscription_hub(hass):
+    """Return the subscription hub, creating it if needed."""
+    hub = hass.data.get(DATA_SUBSCRIPTION_HUB)
+
+    if hub is None:
+        hub = hass.data[DATA_SUBSCRIPTION_HUB] = SubscriptionHub(hass)
+
+    return hub
+
+
+class SubscriptionHub(object):
+    """Forward events to the subscribed websocket connections.
+
+    Listens once on the bus per event type and serializes each event only
+    once for all subscriptions.
+    """
+
+    def __init__(self, hass):
+        """Initialize the subscription hub."""
+        self.hass = hass
+        # event_type -> {(connection, iden): None}
+        self._subscriptions = {}
+        self._listeners = {}
+        self._last_event = None
+        self._last_event_json = None
+
+    @callback
+    def async_subscribe(self, event_type, connection, iden):
+        """Subscribe a connection to an event type.
+
+        Returns a function to unsubscribe.
+        """
+        subscriptions = self._subscriptions.get(event_type)
+
+        if subscriptions is None:
+            subscriptions = self._subscriptions[event_type] = {}
+
+            @callback
+            def forward_event(event):
+                """Forward an event to the subscriptions."""
+                self._async_forward_event(event, subscriptions)
+
+            self._listeners[event_type] = self.hass.bus.async_listen(
+                event_type, forward_event)
+
+        key = (connection, iden)
+        subscriptions[key] = None
+
+        @callback
+        def unsubscribe():
+            """Remove the subscription."""
+            subscriptions.pop(key, None)
+
+            if not subscriptions and \
+                    self._subscriptions.get(event_type) is subscriptions:
+                del self._subscriptions[event_type]
+                self._listeners.pop(event_type)()
+
+        return unsubscribe
+
+    @callback
+    def async_stats(self):
+        """Return the backpressure statistics of subscribed connections."""
+        connections = set(
+            connection for subscriptions in self._subscriptions.values()
+            for connection, _ in subscriptions)
+
+        return [connection.stats() for connection in connections]
+
+    @callback
+    def _async_forward_event(self, event, subscriptions):
+        """Forward an event to the subscriptions of an event type."""
+        if event.event_type == EVENT_TIME_CHANGED:
+            return
+
+        # Listeners of an event type and of MATCH_ALL get the same event
+        if event is not self._last_event:
+            self._last_event = event
+            self._last_event_json = JSON_DUMP(event.as_dict())
+
+        event_json = self._last_event_json
+
+        for connection, iden in list(subscriptions):
+            connection.send_event_outside(
+                serialized_event_message(iden, event_json))
+
+
 class WebsocketAPIView(HomeAssistantView):
     """View to serve a websockets endpoint."""
 
@@ -218,6 +326,11 @@ class ActiveConnection:
         self.to_write = asyncio.Queue(maxsize=MAX_PENDING_MSG, loop=hass.loop)
         self._handle_task = None
         self._writer_task = None
+        # Backpressure statistics
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.max_pending = 0
+        self._consecutive_dropped = 0
 
     def debug(self, message1, message2=''):
         """Print a debug message."""
@@ -237,7 +350,12 @@ class ActiveConnection:
                 if message is None:
                     break
                 self.debug("Sending", message)
-                yield from self.wsock.send_json(message, dumps=JSON_DUMP)
+                if isinstance(message, str):
+                    # Already serialized by the subscription hub
+                    yield from self.wsock.send_str(message)
+                else:
+                    yield from self.wsock.send_json(message, dumps=JSON_DUMP)
+                self.sent_count += 1
 
     @callback
     def send_message_outside(self, message):
@@ -254,6 +372,45 @@ class ActiveConnection:
                            MAX_PENDING_MSG)
             self.cancel()
 
+    @callback
+    def send_event_outside(self, message):
+        """Send an event message to the client outside of the main task.
+
+        Events are dropped while the client is not keeping up, leaving room
+        for the replies to its commands. Closes the connection if the client
+        did not read any message while another MAX_PENDING_MSG events were
+        dropped.
+
+        Async friendly.
+        """
+        if self.to_write.qsize() >= \
+                int(MAX_PENDING_MSG * MAX_PENDING_EVENTS_RATIO):
+            self.dropped_count += 1
+            self._consecutive_dropped += 1
+
+            if self._consecutive_dropped == 1:
+                _LOGGER.warning("WS %s: Client is not keeping up, dropping "
+                                "events", id(self.wsock))
+            elif self._consecutive_dropped > MAX_PENDING_MSG:
+                self.log_error("Client stopped reading messages:",
+                               self.stats())
+                self.cancel()
+            return
+
+        self.to_write.put_nowait(message)
+        self._consecutive_dropped = 0
+        self.max_pending = max(self.max_pending, self.to_write.qsize())
+
+    @callback
+    def stats(self):
+        """Return the backpressure statistics of the connection."""
+        return {
+            'pending': self.to_write.qsize(),
+            'max_pending': self.max_pending,
+            'sent': self.sent_count,
+            'dropped': self.dropped_count,
+        }
+
     @callback
     def cancel(self):
         """Cancel the connection."""
@@ -393,7 +550,7 @@ class ActiveConnection:
                 self._writer_task.cancel()
 
             yield from wsock.close()
-            self.debug("Closed connection")
+            self.debug("Closed connection", self.stats())
 
         return wsock
 
@@ -404,16 +561,8 @@ class ActiveConnection:
         """
         msg = SUBSCRIBE_EVENTS_MESSAGE_SCHEMA(msg)
 
-        @asyncio.coroutine
-        def forward_events(event):
-            """Forward events to websocket."""
-            if event.event_type == EVENT_TIME_CHANGED:
-                return
-
-            self.send_message_outside(event_message(msg['id'], event))
-
-        self.event_listeners[msg['id']] = self.hass.bus.async_listen(
-            msg['event_type'], forward_events)
+        self.event_listeners[msg['id']] = async_get_subscription_hub(
+            self.hass).async_subscribe(msg['event_type'], self, msg['id'])
 
         self.to_write.put_nowait(result_message(msg['id']))
 
@@ -500,6 +649,16 @@ class ActiveConnection:
         self.to_write.put_nowait(result_message(
             msg['id'], panels))
 
+    def handle_get_subscription_stats(self, msg):
+        """Handle get subscription stats command.
+
+        Async friendly.
+        """
+        msg = GET_SUBSCRIPTION_STATS_MESSAGE_SCHEMA(msg)
+
+        self.to_write.put_nowait(result_message(
+            msg['id'], async_get_subscription_hub(self.hass).async_stats()))
+
     def handle_ping(self, msg):
         """Handle ping command.
 
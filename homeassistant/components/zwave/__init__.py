@@ -31,7 +31,9 @@ from .const import DOMAIN, DATA_DEVICES, DATA_NETWORK, DATA_ENTITY_VALUES
 from .node_entity import ZWaveBaseEntity, ZWaveNodeEntity
 from . import workaround
 from .discovery_schemas import DISCOVERY_SCHEMAS
-from .util import check_node_schema, check_value_schema, node_name
+from .util import (
+    check_node_schema, check_value_schema, node_name,
+    value_schema_command_classes)
 
 REQUIREMENTS = ['pydispatcher==2.0.5', 'python_openzwave==0.4.0.35']
 
@@ -302,13 +304,24 @@ def setup(hass, config):
 
         dispatcher.connect(log_all, weak=False)
 
+    # Entity values with missing values by node id and command class, the
+    # command class is None for values of any command class
+    pending_values = {}
+
+    # Number of values added and time spent discovering them by node id
+    discovery_times = {}
+
     def value_added(node, value):
         """Handle new added value to a node on the network."""
+        start = time.monotonic()
+
         # Check if this value should be tracked by an existing entity
-        for values in hass.data[DATA_ENTITY_VALUES]:
-            values.check_value(value)
+        for command_class in (value.command_class, None):
+            for values in pending_values.get(
+                    (node.node_id, command_class), ()):
+                values.check_value(value)
 
-        for schema in DISCOVERY_SCHEMAS:
+        for schema in _command_class_schemas(value.command_class):
             if not check_node_schema(node, schema):
                 continue
             if not check_value_schema(
@@ -319,10 +332,16 @@ def setup(hass, config):
             values = ZWaveDeviceEntityValues(
                 hass, schema, value, config, device_config)
 
-            # We create a new list and update the reference here so that
-            # the list can be safely iterated over in the main thread
-            new_values = hass.data[DATA_ENTITY_VALUES] + [values]
-            hass.data[DATA_ENTITY_VALUES] = new_values
+            # Appending keeps the list safe to iterate in the main thread
+            hass.data[DATA_ENTITY_VALUES].append(values)
+
+            for command_class in values.missing_command_classes():
+                pending_values.setdefault(
+                    (node.node_id, command_class), []).append(values)
+
+        times = discovery_times.setdefault(node.node_id, [0, 0])
+        times[0] += 1
+        times[1] += time.monotonic() - start
 
     component = EntityComponent(_LOGGER, DOMAIN, hass)
 
@@ -353,6 +372,9 @@ def setup(hass, config):
         """Handle the querying of all nodes on network."""
         _LOGGER.info("Z-Wave network is complete. All nodes on the network "
                      "have been queried")
+        for node_id, (count, elapsed) in sorted(discovery_times.items()):
+            _LOGGER.info("Discovered %d values of node %d in %.3f seconds",
+                         count, node_id, elapsed)
         hass.bus.fire(const.EVENT_NETWORK_COMPLETE)
 
     dispatcher.connect(
@@ -693,6 +715,28 @@ def setup(hass, config):
     return True
 
 
+# Discovery schemas by the command class of their primary value
+_SCHEMAS_BY_COMMAND_CLASS = {}
+
+
+def _command_class_schemas(command_class):
+    """Return the discovery schemas for primary values of a command class.
+
+    The schemas keep the order of DISCOVERY_SCHEMAS.
+    """
+    schemas = _SCHEMAS_BY_COMMAND_CLASS.get(command_class)
+
+    if schemas is None:
+        schemas = _SCHEMAS_BY_COMMAND_CLASS[command_class] = []
+        for schema in DISCOVERY_SCHEMAS:
+            command_classes = value_schema_command_classes(
+                schema[const.DISC_VALUES][const.DISC_PRIMARY])
+            if command_classes is None or command_class in command_classes:
+                schemas.append(schema)
+
+    return schemas
+
+
 class ZWaveDeviceEntityValues():
     """Manages entity access to the underlying zwave value objects."""
 
@@ -722,6 +766,23 @@ class ZWaveDeviceEntityValues():
 
         self._check_entity_ready()
 
+    def missing_command_classes(self):
+        """Return the command classes of the values still missing.
+
+        None is included if a missing value can have any command class.
+        """
+        command_classes = set()
+        for name, value in self._values.items():
+            if value is not None:
+                continue
+            value_classes = value_schema_command_classes(
+                self._schema[const.DISC_VALUES][name])
+            if value_classes is None:
+                command_classes.add(None)
+            else:
+                command_classes |= value_classes
+        return command_classes
+
     def __getattr__(self, name):
         """Get the specified value for this entity."""
         return self._values[name]
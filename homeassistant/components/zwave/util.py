@@ -63,6 +63,24 @@ def check_value_schema(value, schema):
     return True
 
 
+def value_schema_command_classes(schema):
+    """Return the command classes a value schema can match.
+
+    Returns None if the schema matches values of any command class.
+    """
+    if const.DISC_COMMAND_CLASS in schema:
+        return set(schema[const.DISC_COMMAND_CLASS])
+    if const.DISC_SCHEMAS in schema:
+        command_classes = set()
+        for schema_item in schema[const.DISC_SCHEMAS]:
+            item_classes = value_schema_command_classes(schema_item)
+            if item_classes is None:
+                return None
+            command_classes |= item_classes
+        return command_classes
+    return None
+
+
 def node_name(node):
     """Return the name of the node."""
     return node.name or '{} {}'.format(
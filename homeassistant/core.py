@@ -511,6 +511,10 @@ class EventBus(object):
             _LOGGER.warning("Unable to remove unknown listener %s", listener)
 
 
+# Shared by all states without attributes
+_EMPTY_ATTRIBUTES = MappingProxyType({})
+
+
 class State(object):
     """Object to represent a state within the state machine.
 
@@ -539,9 +543,17 @@ class State(object):
                 "Invalid state encountered for entity id: {}. "
                 "State max length is 255 characters.").format(entity_id))
 
-        self.entity_id = entity_id.lower()
+        # All states of an entity share the same entity_id string
+        self.entity_id = sys.intern(entity_id.lower())
         self.state = state
-        self.attributes = MappingProxyType(attributes or {})
+
+        if isinstance(attributes, MappingProxyType):
+            # Attributes are read-only, so they can be shared between states
+            self.attributes = attributes
+        elif attributes:
+            self.attributes = MappingProxyType(attributes)
+        else:
+            self.attributes = _EMPTY_ATTRIBUTES
         self.last_updated = last_updated or dt_util.utcnow()
         self.last_changed = last_changed or self.last_updated
 
@@ -601,6 +613,23 @@ class State(object):
         return cls(json_dict['entity_id'], json_dict['state'],
                    json_dict.get('attributes'), last_changed, last_updated)
 
+    def attributes_diff(self, old_state):
+        """Return the attributes changed since old_state and removed keys.
+
+        Async friendly.
+        """
+        if old_state is None:
+            return dict(self.attributes), []
+
+        old = old_state.attributes
+        if old is self.attributes:
+            return {}, []
+
+        changed = {key: value for key, value in self.attributes.items()
+                   if key not in old or old[key] != value}
+        removed = [key for key in old if key not in self.attributes]
+        return changed, removed
+
     def __eq__(self, other):
         """Return the comparison of the state."""
         return (self.__class__ == other.__class__ and
@@ -624,6 +653,10 @@ class StateMachine(object):
     def __init__(self, bus, loop):
         """Initialize state machine."""
         self._states = {}
+        # Entity ids per domain, kept up to date by async_set/async_remove
+        self._domains = {}
+        # Sorted entity ids per domain filter, dropped when entities change
+        self._sorted_entity_ids = {}
         self._bus = bus
         self._loop = loop
 
@@ -643,22 +676,44 @@ class StateMachine(object):
         if domain_filter is None:
             return list(self._states.keys())
 
-        domain_filter = domain_filter.lower()
+        return list(self._domains.get(domain_filter.lower(), ()))
 
-        return [state.entity_id for state in self._states.values()
-                if state.domain == domain_filter]
+    @callback
+    def async_sorted_entity_ids(self, domain_filter=None):
+        """Return the sorted entity ids that are being tracked.
+
+        The returned list is shared and should not be modified.
+
+        This method must be run in the event loop.
+        """
+        if domain_filter is not None:
+            domain_filter = domain_filter.lower()
+
+        entity_ids = self._sorted_entity_ids.get(domain_filter)
+
+        if entity_ids is None:
+            if domain_filter is None:
+                entity_ids = sorted(self._states)
+            else:
+                entity_ids = sorted(self._domains.get(domain_filter, ()))
+            self._sorted_entity_ids[domain_filter] = entity_ids
+
+        return entity_ids
 
     def all(self):
         """Create a list of all states."""
         return run_callback_threadsafe(self._loop, self.async_all).result()
 
     @callback
-    def async_all(self):
-        """Create a list of all states.
+    def async_all(self, domain_filter=None):
+        """Create a list of all states, optionally of a single domain.
 
         This method must be run in the event loop.
         """
-        return list(self._states.values())
+        if domain_filter is None:
+            return list(self._states.values())
+
+        return list(self._domains.get(domain_filter.lower(), {}).values())
 
     def get(self, entity_id):
         """Retrieve state of entity_id or None if not found.
@@ -697,6 +752,14 @@ class StateMachine(object):
         if old_state is None:
             return False
 
+        domain = old_state.domain
+        entities = self._domains[domain]
+        del entities[entity_id]
+        if not entities:
+            del self._domains[domain]
+        self._sorted_entity_ids.pop(domain, None)
+        self._sorted_entity_ids.pop(None, None)
+
         self._bus.async_fire(EVENT_STATE_CHANGED, {
             'entity_id': entity_id,
             'old_state': old_state,
@@ -736,14 +799,33 @@ class StateMachine(object):
         is_existing = old_state is not None
         same_state = (is_existing and old_state.state == new_state and
                       not force_update)
-        same_attr = is_existing and old_state.attributes == attributes
+        same_attr = is_existing and (old_state.attributes is attributes or
+                                     old_state.attributes == attributes)
 
         if same_state and same_attr:
             return
 
-        last_changed = old_state.last_changed if same_state else None
+        if same_state:
+            new_state = old_state.state
+            last_changed = old_state.last_changed
+        else:
+            last_changed = None
+
+        if same_attr:
+            # Reuse the unchanged attributes instead of another copy
+            attributes = old_state.attributes
+
         state = State(entity_id, new_state, attributes, last_changed)
         self._states[entity_id] = state
+
+        domain = state.domain
+        entities = self._domains.get(domain)
+        if entities is None:
+            entities = self._domains[domain] = {}
+        if not is_existing:
+            self._sorted_entity_ids.pop(domain, None)
+            self._sorted_entity_ids.pop(None, None)
+        entities[state.entity_id] = state
         self._bus.async_fire(EVENT_STATE_CHANGED, {
             'entity_id': entity_id,
             'old_state': old_state,
@@ -785,6 +867,32 @@ class ServiceCall(object):
         return "<ServiceCall {}.{}>".format(self.domain, self.service)
 
 
+class ServiceCallResult(object):
+    """Representation of the result of a blocking service call."""
+
+    __slots__ = ['call_id', 'exception', 'duration']
+
+    def __init__(self, call_id, exception=None, duration=None):
+        """Initialize a service call result.
+
+        The duration is the time in seconds the handler ran and is None for
+        calls executed by a remote instance.
+        """
+        self.call_id = call_id
+        self.exception = exception
+        self.duration = duration
+
+    @property
+    def success(self):
+        """Return if the service was executed without an error."""
+        return self.exception is None
+
+    def __repr__(self):
+        """Return the representation of the result."""
+        return "<ServiceCallResult {}: {}>".format(
+            self.call_id, 'ok' if self.success else repr(self.exception))
+
+
 class ServiceRegistry(object):
     """Offer the services over the eventbus."""
 
@@ -793,6 +901,8 @@ class ServiceRegistry(object):
         self._services = {}
         self._hass = hass
         self._async_unsub_call_event = None
+        self._async_unsub_executed_event = None
+        self._pending_calls = {}
 
         def _gen_unique_id():
             cur_id = 1
@@ -898,7 +1008,8 @@ class ServiceRegistry(object):
         Waits a maximum of SERVICE_CALL_LIMIT.
 
         If blocking = True, will return boolean if service executed
-        successfully within SERVICE_CALL_LIMIT.
+        successfully within SERVICE_CALL_LIMIT. Like the service executed
+        event, calls with invalid service data count as executed.
 
         This method will fire an event to call the service.
         This event will be picked up by this ServiceRegistry and any
@@ -921,7 +1032,8 @@ class ServiceRegistry(object):
         Waits a maximum of SERVICE_CALL_LIMIT.
 
         If blocking = True, will return boolean if service executed
-        successfully within SERVICE_CALL_LIMIT.
+        successfully within SERVICE_CALL_LIMIT. Like the service executed
+        event, calls with invalid service data count as executed.
 
         This method will fire an event to call the service.
         This event will be picked up by this ServiceRegistry and any
@@ -932,35 +1044,80 @@ class ServiceRegistry(object):
 
         This method is a coroutine.
         """
+        if not blocking:
+            self._async_fire_call_event(domain, service, service_data)
+            return
+
+        result = yield from self.async_call_with_result(
+            domain, service, service_data)
+        return result is not None and (
+            result.success or isinstance(result.exception, vol.Invalid))
+
+    @asyncio.coroutine
+    def async_call_with_result(self, domain, service, service_data=None,
+                               limit=None):
+        """Call a service and wait for its result.
+
+        Returns a ServiceCallResult with the exception raised by the schema
+        or the handler and the time it ran, or None if the service was not
+        executed within limit seconds (default SERVICE_CALL_LIMIT).
+
+        This method is a coroutine.
+        """
+        call_id = self._async_fire_call_event(
+            domain, service, service_data, blocking=True)
+        fut = self._pending_calls[call_id]
+
+        try:
+            done, _ = yield from asyncio.wait(
+                [fut], loop=self._hass.loop,
+                timeout=SERVICE_CALL_LIMIT if limit is None else limit)
+        finally:
+            self._pending_calls.pop(call_id, None)
+
+        return fut.result() if done else None
+
+    @callback
+    def _async_fire_call_event(self, domain, service, service_data,
+                               blocking=False):
+        """Fire the event to call a service and return the call id.
+
+        The future of a blocking call is resolved directly by the registry
+        executing the service, or by a service executed event from a remote
+        instance.
+        """
         call_id = self._generate_unique_id()
 
-        event_data = {
+        if blocking:
+            self._pending_calls[call_id] = \
+                asyncio.Future(loop=self._hass.loop)
+
+            if self._async_unsub_executed_event is None:
+                self._async_unsub_executed_event = self._hass.bus.async_listen(
+                    EVENT_SERVICE_EXECUTED, self._async_service_executed)
+
+        self._hass.bus.async_fire(EVENT_CALL_SERVICE, {
             ATTR_DOMAIN: domain.lower(),
             ATTR_SERVICE: service.lower(),
             ATTR_SERVICE_DATA: service_data,
             ATTR_SERVICE_CALL_ID: call_id,
-        }
-
-        if blocking:
-            fut = asyncio.Future(loop=self._hass.loop)
+        })
 
-            @callback
-            def service_executed(event):
-                """Handle an executed service."""
-                if event.data[ATTR_SERVICE_CALL_ID] == call_id:
-                    fut.set_result(True)
+        return call_id
 
-            unsub = self._hass.bus.async_listen(
-                EVENT_SERVICE_EXECUTED, service_executed)
+    @callback
+    def _async_service_executed(self, event):
+        """Resolve the call of a service executed somewhere else."""
+        call_id = event.data.get(ATTR_SERVICE_CALL_ID)
+        self._async_resolve_call(ServiceCallResult(call_id))
 
-        self._hass.bus.async_fire(EVENT_CALL_SERVICE, event_data)
+    @callback
+    def _async_resolve_call(self, result):
+        """Pass the result of a service call to a waiting caller."""
+        fut = self._pending_calls.get(result.call_id)
 
-        if blocking:
-            done, _ = yield from asyncio.wait(
-                [fut], loop=self._hass.loop, timeout=SERVICE_CALL_LIMIT)
-            success = bool(done)
-            unsub()
-            return success
+        if fut is not None and not fut.done():
+            fut.set_result(result)
 
     @asyncio.coroutine
     def _event_to_service_call(self, event):
@@ -978,46 +1135,49 @@ class ServiceRegistry(object):
 
         service_handler = self._services[domain][service]
 
-        def fire_service_executed():
-            """Fire service executed event."""
-            if not call_id:
-                return
-
-            data = {ATTR_SERVICE_CALL_ID: call_id}
-
-            if (service_handler.is_coroutinefunction or
-                    service_handler.is_callback):
-                self._hass.bus.async_fire(EVENT_SERVICE_EXECUTED, data)
-            else:
-                self._hass.bus.fire(EVENT_SERVICE_EXECUTED, data)
-
         try:
             if service_handler.schema:
                 service_data = service_handler.schema(service_data)
         except vol.Invalid as ex:
             _LOGGER.error("Invalid service data for %s.%s: %s",
                           domain, service, humanize_error(service_data, ex))
-            fire_service_executed()
+            self._async_service_call_done(call_id, ex, 0)
             return
 
         service_call = ServiceCall(domain, service, service_data, call_id)
+        start = self._hass.loop.time()
 
         try:
             if service_handler.is_callback:
                 service_handler.func(service_call)
-                fire_service_executed()
             elif service_handler.is_coroutinefunction:
                 yield from service_handler.func(service_call)
-                fire_service_executed()
             else:
-                def execute_service():
-                    """Execute a service and fires a SERVICE_EXECUTED event."""
-                    service_handler.func(service_call)
-                    fire_service_executed()
-
-                yield from self._hass.async_add_job(execute_service)
-        except Exception:  # pylint: disable=broad-except
+                yield from self._hass.async_add_job(
+                    service_handler.func, service_call)
+        except Exception as err:  # pylint: disable=broad-except
             _LOGGER.exception('Error executing service %s', service_call)
+            self._async_service_call_done(
+                call_id, err, self._hass.loop.time() - start)
+        else:
+            self._async_service_call_done(
+                call_id, None, self._hass.loop.time() - start)
+
+    @callback
+    def _async_service_call_done(self, call_id, exception, duration):
+        """Resolve a blocking call and fire the service executed event.
+
+        Like before, the event is not fired when the handler raised.
+        """
+        if not call_id:
+            return
+
+        self._async_resolve_call(
+            ServiceCallResult(call_id, exception, duration))
+
+        if exception is None or isinstance(exception, vol.Invalid):
+            self._hass.bus.async_fire(
+                EVENT_SERVICE_EXECUTED, {ATTR_SERVICE_CALL_ID: call_id})
 
 
 class Config(object):
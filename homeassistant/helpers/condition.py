@@ -290,12 +290,17 @@ def template(hass, value_template, variables=None):
     ).result()
 
 
+def log_template_error(ex):
+    """Log an error raised while rendering a template condition."""
+    _LOGGER.error("Error during template condition: %s", ex)
+
+
 def async_template(hass, value_template, variables=None):
     """Test if template condition matches."""
     try:
         value = value_template.async_render(variables)
     except TemplateError as ex:
-        _LOGGER.error("Error during template condition: %s", ex)
+        log_template_error(ex)
         return False
 
     return value.lower() == 'true'
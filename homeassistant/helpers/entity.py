@@ -21,6 +21,18 @@ from homeassistant.util.async import (
 _LOGGER = logging.getLogger(__name__)
 SLOW_UPDATE_WARNING = 10
 
+# Properties added to the state attributes unless already present
+_PROPERTY_ATTRIBUTES = (
+    ('unit_of_measurement', str, ATTR_UNIT_OF_MEASUREMENT),
+    ('name', str, ATTR_FRIENDLY_NAME),
+    ('icon', str, ATTR_ICON),
+    ('entity_picture', str, ATTR_ENTITY_PICTURE),
+    ('hidden', bool, ATTR_HIDDEN),
+    ('assumed_state', bool, ATTR_ASSUMED_STATE),
+    ('supported_features', int, ATTR_SUPPORTED_FEATURES),
+    ('device_class', str, ATTR_DEVICE_CLASS),
+)
+
 
 def generate_entity_id(entity_id_format: str, name: Optional[str],
                        current_ids: Optional[List[str]]=None,
@@ -41,6 +53,11 @@ def generate_entity_id(entity_id_format: str, name: Optional[str],
         entity_id_format.format(name), current_ids)
 
 
+def _copy_attributes(attributes):
+    """Return a shallow copy of attributes, entities may reuse the dict."""
+    return None if attributes is None else dict(attributes)
+
+
 @callback
 def async_generate_entity_id(entity_id_format: str, name: Optional[str],
                              current_ids: Optional[List[str]]=None,
@@ -75,6 +92,13 @@ class Entity(object):
     # Protect for multiple updates
     _update_staged = False
 
+    # A forced refresh is scheduled but did not start yet
+    _refresh_scheduled = False
+
+    # What the last written state was built from and the state itself
+    _last_fingerprint = None
+    _last_state = None
+
     # Process updates pararell
     parallel_updates = None
 
@@ -161,6 +185,17 @@ class Entity(object):
         """
         return False
 
+    @property
+    def state_version(self):
+        """Return a value that changes whenever the state may have changed.
+
+        Entities returning a version other than None are not written again
+        while the version stays the same, without reading the state and the
+        attributes. The version needs to change with the availability, the
+        state and all attributes of the entity.
+        """
+        return None
+
     @property
     def supported_features(self) -> int:
         """Flag supported features."""
@@ -203,33 +238,50 @@ class Entity(object):
 
         start = timer()
 
-        if not self.available:
-            state = STATE_UNAVAILABLE
-            attr = {}
+        # Customize and unit system are replaced when the core config is
+        # reloaded, so comparing them by identity is enough.
+        config = (self.hass.data.get(DATA_CUSTOMIZE), self.hass.config.units)
+        version = self.state_version
+
+        if version is not None:
+            fingerprint = (version,) + config
+            if self._state_unchanged(fingerprint):
+                return
+
+        available = self.available
+        if available:
+            raw_state = self.state
+            state_attr = _copy_attributes(self.state_attributes)
+            device_attr = _copy_attributes(self.device_state_attributes)
         else:
-            state = self.state
+            raw_state = state_attr = device_attr = None
 
-            if state is None:
-                state = STATE_UNKNOWN
-            else:
-                state = str(state)
+        properties = tuple(getattr(self, name) for name, _, _
+                           in _PROPERTY_ATTRIBUTES)
+
+        if version is None:
+            fingerprint = (available, raw_state, state_attr, device_attr,
+                           properties) + config
+            if self._state_unchanged(fingerprint):
+                return
 
-            attr = self.state_attributes or {}
-            device_attr = self.device_state_attributes
+        if not available:
+            state = STATE_UNAVAILABLE
+            attr = {}
+        else:
+            state = STATE_UNKNOWN if raw_state is None else str(raw_state)
+            attr = dict(state_attr) if state_attr else {}
             if device_attr is not None:
                 attr.update(device_attr)
 
-        self._attr_setter('unit_of_measurement', str, ATTR_UNIT_OF_MEASUREMENT,
-                          attr)
+        for (_, typ, key), value in zip(_PROPERTY_ATTRIBUTES, properties):
+            if value is None or key in attr:
+                continue
 
-        self._attr_setter('name', str, ATTR_FRIENDLY_NAME, attr)
-        self._attr_setter('icon', str, ATTR_ICON, attr)
-        self._attr_setter('entity_picture', str, ATTR_ENTITY_PICTURE, attr)
-        self._attr_setter('hidden', bool, ATTR_HIDDEN, attr)
-        self._attr_setter('assumed_state', bool, ATTR_ASSUMED_STATE, attr)
-        self._attr_setter('supported_features', int, ATTR_SUPPORTED_FEATURES,
-                          attr)
-        self._attr_setter('device_class', str, ATTR_DEVICE_CLASS, attr)
+            try:
+                attr[key] = typ(value)
+            except (TypeError, ValueError):
+                pass
 
         end = timer()
 
@@ -265,17 +317,43 @@ class Entity(object):
         self.hass.states.async_set(
             self.entity_id, state, attr, self.force_update)
 
+        self._last_fingerprint = fingerprint
+        self._last_state = self.hass.states.get(self.entity_id)
+
+    def _state_unchanged(self, fingerprint):
+        """Return if nothing changed since the state was last written."""
+        return (not self.force_update and
+                fingerprint == self._last_fingerprint and
+                self.hass.states.get(self.entity_id) is self._last_state)
+
     def schedule_update_ha_state(self, force_refresh=False):
         """Schedule a update ha state change task.
 
         That avoid executor dead looks.
         """
-        self.hass.add_job(self.async_update_ha_state(force_refresh))
+        if not force_refresh:
+            self.hass.add_job(self.async_update_ha_state())
+        elif not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.hass.add_job(self._async_scheduled_refresh())
 
     @callback
     def async_schedule_update_ha_state(self, force_refresh=False):
-        """Schedule a update ha state change task."""
-        self.hass.async_add_job(self.async_update_ha_state(force_refresh))
+        """Schedule a update ha state change task.
+
+        Forced refreshes are coalesced until the scheduled one starts.
+        """
+        if not force_refresh:
+            self.hass.async_add_job(self.async_update_ha_state())
+        elif not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.hass.async_add_job(self._async_scheduled_refresh())
+
+    @asyncio.coroutine
+    def _async_scheduled_refresh(self):
+        """Run a scheduled forced refresh."""
+        self._refresh_scheduled = False
+        yield from self.async_update_ha_state(True)
 
     @asyncio.coroutine
     def async_device_update(self, warning=True):
@@ -325,21 +403,6 @@ class Entity(object):
         """
         self.hass.states.async_remove(self.entity_id)
 
-    def _attr_setter(self, name, typ, attr, attrs):
-        """Populate attributes based on properties."""
-        if attr in attrs:
-            return
-
-        value = getattr(self, name)
-
-        if value is None:
-            return
-
-        try:
-            attrs[attr] = typ(value)
-        except (TypeError, ValueError):
-            pass
-
     def __eq__(self, other):
         """Return the comparison."""
         return (isinstance(other, Entity) and
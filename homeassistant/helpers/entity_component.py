@@ -1,6 +1,9 @@
 """Helpers for components that manage entities."""
 import asyncio
+from collections import OrderedDict
 from datetime import timedelta
+import random
+from timeit import default_timer as timer
 
 from homeassistant import config as conf_util
 from homeassistant.setup import async_prepare_setup_platform
@@ -25,6 +28,28 @@ SLOW_SETUP_WARNING = 10
 SLOW_SETUP_MAX_WAIT = 60
 PLATFORM_NOT_READY_RETRIES = 10
 
+# Share of its slot in the scan interval by which a poll is delayed at random
+POLL_JITTER = 0.5
+
+# Maximum number of cycles an entity is skipped after failed or slow polls
+MAX_POLL_BACKOFF = 16
+
+# Entities of a platform called at the same time by a service call, unless
+# the platform limits its parallel updates
+PARALLEL_SERVICE_CALLS = 10
+
+DATA_ENTITY_COMPONENTS = 'entity_components'
+
+
+@callback
+def async_poll_stats(hass):
+    """Return the polling statistics of the entity components by domain.
+
+    This method must be run in the event loop.
+    """
+    return {domain: component.async_poll_stats() for domain, component
+            in hass.data.get(DATA_ENTITY_COMPONENTS, {}).items()}
+
 
 class EntityComponent(object):
     """Helper class that will help a component manage its entities."""
@@ -42,6 +67,7 @@ class EntityComponent(object):
 
         self.entities = {}
         self.config = None
+        self._entity_platforms = {}
 
         self._platforms = {
             'core': EntityPlatform(self, domain, self.scan_interval, 0, None),
@@ -49,6 +75,8 @@ class EntityComponent(object):
         self.async_add_entities = self._platforms['core'].async_add_entities
         self.add_entities = self._platforms['core'].add_entities
 
+        hass.data.setdefault(DATA_ENTITY_COMPONENTS, {})[domain] = self
+
     def setup(self, config):
         """Set up a full entity component.
 
@@ -115,6 +143,52 @@ class EntityComponent(object):
                 if entity_id in self.entities and
                 self.entities[entity_id].available]
 
+    @asyncio.coroutine
+    def async_call_entity_service(self, entities, method, params=None):
+        """Call a method of the entities targeted by a service call.
+
+        The entities of a platform are called concurrently, as many at a
+        time as the platform allows. A platform can handle all its entities
+        at once by implementing async_<method>_many(hass, entities, **params),
+        for example to send one command to a bridge. Entities that poll are
+        updated afterwards.
+
+        The first exception raised by a call is raised again once all
+        entities are called.
+
+        This method must be run in the event loop.
+        """
+        params = params or {}
+        core_platform = self._platforms['core']
+        targets = OrderedDict()
+
+        for entity in entities:
+            platform = self._entity_platforms.get(
+                entity.entity_id, core_platform)
+            targets.setdefault(platform, []).append(entity)
+
+        if not targets:
+            return
+
+        tasks = [
+            platform.async_call_entities(platform_entities, method, params)
+            for platform, platform_entities in targets.items()]
+        results = yield from asyncio.gather(*tasks, loop=self.hass.loop)
+        errors = [error for platform_errors in results
+                  for error in platform_errors]
+
+        update_tasks = [entity.async_update_ha_state(True)
+                        for entity in entities if entity.should_poll]
+
+        if update_tasks:
+            yield from asyncio.wait(update_tasks, loop=self.hass.loop)
+
+        for error in errors[1:]:
+            self.logger.error("Error calling %s: %s", method, error)
+
+        if errors:
+            raise errors[0]
+
     @asyncio.coroutine
     def _async_setup_platform(self, platform_type, platform_config,
                               discovery_info=None, tries=0):
@@ -143,7 +217,7 @@ class EntityComponent(object):
         if key not in self._platforms:
             entity_platform = self._platforms[key] = EntityPlatform(
                 self, platform_type, scan_interval, parallel_updates,
-                entity_namespace)
+                entity_namespace, platform)
         else:
             entity_platform = self._platforms[key]
 
@@ -240,6 +314,8 @@ class EntityComponent(object):
                 'Invalid entity id: {}'.format(entity.entity_id))
 
         self.entities[entity.entity_id] = entity
+        if platform is not None:
+            self._entity_platforms[entity.entity_id] = platform
 
         if hasattr(entity, 'async_added_to_hass'):
             yield from entity.async_added_to_hass()
@@ -268,6 +344,18 @@ class EntityComponent(object):
                 visible=False, entity_ids=ids
             )
 
+    @callback
+    def async_poll_stats(self):
+        """Return the polling statistics of the platforms.
+
+        This method must be run in the event loop.
+        """
+        return [dict(platform.poll_stats.as_dict(),
+                     platform=platform.platform,
+                     scan_interval=platform.scan_interval.total_seconds())
+                for platform in self._platforms.values()
+                if platform.poll_stats.cycles]
+
     def reset(self):
         """Remove entities and reset the entity component to initial values."""
         run_coroutine_threadsafe(self.async_reset(), self.hass.loop).result()
@@ -288,6 +376,7 @@ class EntityComponent(object):
             'core': self._platforms['core']
         }
         self.entities = {}
+        self._entity_platforms = {}
         self.config = None
 
         if self.group_name is not None:
@@ -326,17 +415,22 @@ class EntityPlatform(object):
     """Keep track of entities for a single platform and stay in loop."""
 
     def __init__(self, component, platform, scan_interval, parallel_updates,
-                 entity_namespace):
+                 entity_namespace, module=None):
         """Initialize the entity platform."""
         self.component = component
         self.platform = platform
+        self.module = module
         self.scan_interval = scan_interval
         self.parallel_updates = None
+        self.parallel_service_calls = asyncio.Semaphore(
+            parallel_updates or PARALLEL_SERVICE_CALLS,
+            loop=component.hass.loop)
         self.entity_namespace = entity_namespace
         self.platform_entities = []
+        self.poll_stats = PollStats()
         self._tasks = []
         self._async_unsub_polling = None
-        self._process_updates = asyncio.Lock(loop=component.hass.loop)
+        self._poll_states = {}
 
         if parallel_updates:
             self.parallel_updates = asyncio.Semaphore(
@@ -415,6 +509,37 @@ class EntityPlatform(object):
             self.component.hass, self._update_entity_states, self.scan_interval
         )
 
+    @asyncio.coroutine
+    def async_call_entities(self, entities, method, params):
+        """Call a method of entities of this platform.
+
+        Returns the exceptions raised by the calls.
+
+        This method must be run in the event loop.
+        """
+        hass = self.component.hass
+        call_many = getattr(self.module, '{}_many'.format(method), None)
+
+        if call_many is not None:
+            try:
+                yield from call_many(hass, entities, **params)
+            except Exception as err:  # pylint: disable=broad-except
+                return [err]
+            return []
+
+        @asyncio.coroutine
+        def async_call_entity(entity):
+            """Call the method of an entity."""
+            with (yield from self.parallel_service_calls):
+                yield from getattr(entity, method)(**params)
+
+        results = yield from asyncio.gather(
+            *(async_call_entity(entity) for entity in entities),
+            loop=hass.loop, return_exceptions=True)
+
+        return [result for result in results
+                if isinstance(result, Exception)]
+
     @asyncio.coroutine
     def async_reset(self):
         """Remove all entities and reset data.
@@ -432,28 +557,161 @@ class EntityPlatform(object):
             self._async_unsub_polling()
             self._async_unsub_polling = None
 
-    @asyncio.coroutine
+        for poll_state in self._poll_states.values():
+            if poll_state.unsub is not None:
+                poll_state.unsub()
+        self._poll_states.clear()
+
+    @callback
     def _update_entity_states(self, now):
-        """Update the states of all the polling entities.
+        """Schedule the polls of the entities for this scan interval.
 
-        To protect from flooding the executor, we will update async entities
-        in parallel and other entities sequential.
+        The first entity is polled right away, the polls of the others are
+        spread over the interval with some jitter. Entities
+        whose previous poll is still running are skipped, as are entities
+        that back off after failed or slow polls and entities with a
+        forced refresh already scheduled.
 
         This method must be run in the event loop.
         """
-        if self._process_updates.locked():
-            self.component.logger.warning(
-                "Updating %s %s took longer than the scheduled update "
-                "interval %s", self.platform, self.component.domain,
-                self.scan_interval)
+        polled = [entity for entity in self.platform_entities
+                  if entity.should_poll]
+
+        if not polled:
             return
 
-        with (yield from self._process_updates):
-            tasks = []
-            for entity in self.platform_entities:
-                if not entity.should_poll:
-                    continue
-                tasks.append(entity.async_update_ha_state(True))
+        # Forget the poll states of entities no longer polled
+        polled_ids = set(entity.entity_id for entity in polled)
+        for entity_id in list(self._poll_states):
+            if entity_id not in polled_ids:
+                poll_state = self._poll_states.pop(entity_id)
+                if poll_state.unsub is not None:
+                    poll_state.unsub()
+
+        slot = self.scan_interval.total_seconds() / len(polled)
+        self.poll_stats.cycles += 1
+
+        for idx, entity in enumerate(polled):
+            poll_state = self._poll_states.get(entity.entity_id)
+            if poll_state is None:
+                poll_state = self._poll_states[entity.entity_id] = PollState()
+
+            if poll_state.unsub is not None:
+                # The poll of the previous cycle did not start yet
+                poll_state.unsub()
+                poll_state.unsub = None
+                self.poll_stats.coalesced += 1
+
+            if poll_state.running:
+                self.poll_stats.overruns += 1
+                self.component.logger.warning(
+                    "Updating %s took longer than the scheduled update "
+                    "interval %s", entity.entity_id, self.scan_interval)
+                continue
+
+            if poll_state.backoff:
+                poll_state.backoff -= 1
+                self.poll_stats.backed_off += 1
+                continue
+
+            # pylint: disable=protected-access
+            if entity._refresh_scheduled:
+                self.poll_stats.coalesced += 1
+                continue
+
+            if not idx:
+                self._async_poll(entity, poll_state)
+                continue
+
+            offset = (idx + random.random() * POLL_JITTER) * slot
+            poll_state.unsub = self.component.hass.loop.call_later(
+                offset, self._async_poll, entity, poll_state).cancel
 
-            if tasks:
-                yield from asyncio.wait(tasks, loop=self.component.hass.loop)
+    @callback
+    def _async_poll(self, entity, poll_state):
+        """Start the poll of an entity."""
+        poll_state.unsub = None
+        poll_state.running = True
+        self.component.hass.async_add_job(
+            self._async_update_entity(entity, poll_state))
+
+    @asyncio.coroutine
+    def _async_update_entity(self, entity, poll_state):
+        """Poll an entity and back off when it fails or is too slow."""
+        start = timer()
+        failed = False
+
+        try:
+            yield from entity.async_device_update()
+        except Exception:  # pylint: disable=broad-except
+            self.component.logger.exception(
+                "Update for %s fails", entity.entity_id)
+            failed = True
+        finally:
+            poll_state.running = False
+
+        duration = timer() - start
+        self.poll_stats.add(duration, failed)
+
+        if failed or duration > self.scan_interval.total_seconds():
+            poll_state.failures += 1
+            poll_state.backoff = min(
+                2 ** (poll_state.failures - 1), MAX_POLL_BACKOFF)
+            self.component.logger.debug(
+                "Skipping %d polls of %s", poll_state.backoff,
+                entity.entity_id)
+        else:
+            poll_state.failures = 0
+
+        if not failed and entity.hass is not None:
+            yield from entity.async_update_ha_state()
+
+
+class PollState(object):
+    """State of the polling of an entity."""
+
+    __slots__ = ['unsub', 'running', 'failures', 'backoff']
+
+    def __init__(self):
+        """Initialize the poll state."""
+        self.unsub = None
+        self.running = False
+        self.failures = 0
+        self.backoff = 0
+
+
+class PollStats(object):
+    """Statistics of the polling of the entities of a platform."""
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self.cycles = 0
+        self.polls = 0
+        self.failures = 0
+        self.overruns = 0
+        self.coalesced = 0
+        self.backed_off = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def add(self, latency, failed):
+        """Add a finished poll."""
+        self.polls += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if failed:
+            self.failures += 1
+
+    def as_dict(self):
+        """Return the statistics as a dictionary."""
+        return {
+            'cycles': self.cycles,
+            'polls': self.polls,
+            'failures': self.failures,
+            'overruns': self.overruns,
+            'coalesced': self.coalesced,
+            'backed_off': self.backed_off,
+            'mean_latency':
+                self.total_latency / self.polls if self.polls else None,
+            'max_latency': self.max_latency,
+        }
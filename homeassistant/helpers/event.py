@@ -1,5 +1,7 @@
 """Helpers for listening to events."""
 import functools as ft
+import heapq
+import itertools
 
 from homeassistant.loader import bind_hass
 from homeassistant.helpers.sun import get_astral_event_next
@@ -9,6 +11,12 @@ from ..const import (
 from ..util import dt as dt_util
 from ..util.async import run_callback_threadsafe
 
+TRACK_STATE_CHANGE_CALLBACKS = 'track_state_change_callbacks'
+TRACK_STATE_CHANGE_LISTENER = 'track_state_change_listener'
+TRACK_STATE_CHANGE_DOMAIN_CALLBACKS = 'track_state_change_domain_callbacks'
+TRACK_STATE_CHANGE_DOMAIN_LISTENER = 'track_state_change_domain_listener'
+TRACK_POINT_IN_TIME_SCHEDULER = 'track_point_in_time_scheduler'
+
 # PyLint does not like the use of threaded_listener_factory
 # pylint: disable=invalid-name
 
@@ -62,10 +70,6 @@ def async_track_state_change(hass, entity_ids, action, from_state=None,
     @callback
     def state_change_listener(event):
         """Handle specific state changes."""
-        if entity_ids != MATCH_ALL and \
-           event.data.get('entity_id') not in entity_ids:
-            return
-
         old_state = event.data.get('old_state')
         if old_state is not None:
             old_state = old_state.state
@@ -79,26 +83,207 @@ def async_track_state_change(hass, entity_ids, action, from_state=None,
                                event.data.get('old_state'),
                                event.data.get('new_state'))
 
-    return hass.bus.async_listen(EVENT_STATE_CHANGED, state_change_listener)
+    if entity_ids == MATCH_ALL:
+        return hass.bus.async_listen(
+            EVENT_STATE_CHANGED, state_change_listener)
+
+    return _async_track_state_change_entities(
+        hass, entity_ids, state_change_listener)
 
 
 track_state_change = threaded_listener_factory(async_track_state_change)
 
 
+@callback
+def _async_track_state_change_entities(hass, entity_ids, listener):
+    """Register a state change listener in the per entity_id index.
+
+    All entity specific trackers share a single EVENT_STATE_CHANGED listener
+    on the bus that only dispatches to the listeners tracking the entity_id
+    of the event.
+
+    Must be run within the event loop.
+    """
+    return _async_track_state_change_index(
+        hass, TRACK_STATE_CHANGE_CALLBACKS, TRACK_STATE_CHANGE_LISTENER,
+        lambda entity_id: entity_id, entity_ids, listener)
+
+
+@callback
+@bind_hass
+def async_track_state_change_domains(hass, domains, action):
+    """Track the state changes of the entities of domains.
+
+    The action is called with the state_changed event. Like the entity
+    specific trackers, all domain trackers share one EVENT_STATE_CHANGED
+    listener on the bus.
+
+    Returns a function that can be called to remove the listener.
+
+    Must be run within the event loop.
+    """
+    if isinstance(domains, str):
+        domains = (domains.lower(),)
+    else:
+        domains = tuple(domain.lower() for domain in domains)
+
+    return _async_track_state_change_index(
+        hass, TRACK_STATE_CHANGE_DOMAIN_CALLBACKS,
+        TRACK_STATE_CHANGE_DOMAIN_LISTENER,
+        lambda entity_id: entity_id.split('.', 1)[0], domains, action)
+
+
+track_state_change_domains = threaded_listener_factory(
+    async_track_state_change_domains)
+
+
+@callback
+def _async_track_state_change_index(hass, data_callbacks, data_listener,
+                                    key_func, keys, listener):
+    """Register a state change listener for keys derived from entity_id.
+
+    Must be run within the event loop.
+    """
+    index_callbacks = hass.data.setdefault(data_callbacks, {})
+
+    if data_listener not in hass.data:
+        @callback
+        def state_change_dispatcher(event):
+            """Dispatch state changes to the listeners of the key."""
+            entity_id = event.data.get('entity_id')
+            if entity_id is None:
+                return
+
+            listeners = index_callbacks.get(key_func(entity_id))
+
+            if not listeners:
+                return
+
+            # Copy so listeners can unsubscribe while being dispatched
+            for func in listeners[:]:
+                hass.async_run_job(func, event)
+
+        hass.data[data_listener] = hass.bus.async_listen(
+            EVENT_STATE_CHANGED, state_change_dispatcher)
+
+    for key in keys:
+        index_callbacks.setdefault(key, []).append(listener)
+
+    @callback
+    def remove_listener():
+        """Remove the listener from the index."""
+        for key in keys:
+            listeners = index_callbacks.get(key)
+
+            if listeners is None or listener not in listeners:
+                continue
+
+            listeners.remove(listener)
+
+            if not listeners:
+                index_callbacks.pop(key)
+
+        if not index_callbacks and data_listener in hass.data:
+            hass.data.pop(data_listener)()
+
+    return remove_listener
+
+
+@callback
+@bind_hass
+def async_track_render_infos(hass, render_infos, action):
+    """Track state changes of the states accessed while rendering templates.
+
+    Templates that did not access any state are tracked on all state
+    changes, as they may depend on anything.
+
+    Returns a function that can be called to remove the listener.
+
+    Must be run within the event loop.
+    """
+    entity_ids = set()
+    domains = set()
+    all_states = False
+
+    for info in render_infos:
+        entity_ids.update(info.entities)
+        domains.update(info.domains)
+        all_states = all_states or info.all_states
+
+    @callback
+    def state_change_listener(event):
+        """Handle state changes of the accessed states."""
+        hass.async_run_job(action, event.data.get('entity_id'),
+                           event.data.get('old_state'),
+                           event.data.get('new_state'))
+
+    if all_states or not (entity_ids or domains):
+        return hass.bus.async_listen(
+            EVENT_STATE_CHANGED, state_change_listener)
+
+    # Entities of a tracked domain are already dispatched for their domain
+    entity_ids = [entity_id for entity_id in entity_ids
+                  if entity_id.split('.', 1)[0] not in domains]
+
+    removes = []
+    if entity_ids:
+        removes.append(_async_track_state_change_entities(
+            hass, entity_ids, state_change_listener))
+    if domains:
+        removes.append(async_track_state_change_domains(
+            hass, domains, state_change_listener))
+
+    @callback
+    def remove_listener():
+        """Remove the listeners of the accessed states."""
+        for remove in removes:
+            remove()
+
+    return remove_listener
+
+
 @callback
 @bind_hass
 def async_track_template(hass, template, action, variables=None):
-    """Add a listener that track state changes with template condition."""
+    """Add a listener that track state changes with template condition.
+
+    The template is rendered again only when one of the states it accessed
+    during its last render changes.
+    """
     from . import condition
 
     # Local variable to keep track of if the action has already been triggered
     already_triggered = False
+    dependencies = None
+    async_remove = None
+
+    @callback
+    def async_track_info(info):
+        """Track the states accessed by the last render."""
+        nonlocal dependencies, async_remove
+
+        if info.dependencies == dependencies:
+            return
+
+        if async_remove is not None:
+            async_remove()
+
+        dependencies = info.dependencies
+        async_remove = async_track_render_infos(
+            hass, [info], template_condition_listener)
 
     @callback
     def template_condition_listener(entity_id, from_s, to_s):
         """Check if condition is correct and run action."""
         nonlocal already_triggered
-        template_result = condition.async_template(hass, template, variables)
+        info = template.async_render_to_info(variables)
+        async_track_info(info)
+
+        if info.exception is not None:
+            condition.log_template_error(info.exception)
+            template_result = False
+        else:
+            template_result = info.result.lower() == 'true'
 
         # Check to see if template returns true
         if template_result and not already_triggered:
@@ -107,9 +292,14 @@ def async_track_template(hass, template, action, variables=None):
         elif not template_result:
             already_triggered = False
 
-    return async_track_state_change(
-        hass, template.extract_entities(variables),
-        template_condition_listener)
+    async_track_info(template.async_render_to_info(variables))
+
+    @callback
+    def remove_listener():
+        """Remove the template listener."""
+        async_remove()
+
+    return remove_listener
 
 
 track_template = threaded_listener_factory(async_track_template)
@@ -191,32 +381,105 @@ def async_track_point_in_utc_time(hass, action, point_in_time):
     # Ensure point_in_time is UTC
     point_in_time = dt_util.as_utc(point_in_time)
 
+    scheduler = hass.data.get(TRACK_POINT_IN_TIME_SCHEDULER)
+
+    if scheduler is None:
+        scheduler = hass.data[TRACK_POINT_IN_TIME_SCHEDULER] = \
+            PointInTimeScheduler(hass)
+
+    return scheduler.async_schedule(action, point_in_time)
+
+
+track_point_in_utc_time = threaded_listener_factory(
+    async_track_point_in_utc_time)
+
+
+class PointInTimeScheduler(object):
+    """Keep a heap of point in time actions ordered by their deadline.
+
+    Instead of every tracked point in time listening to EVENT_TIME_CHANGED
+    on its own, a single listener pops the actions that are due. Because the
+    scheduler is driven by the timer of the core, clock jumps are handled the
+    same way as for all other time listeners.
+    """
+
+    def __init__(self, hass):
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._heap = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._unsub_time = None
+
     @callback
-    def point_in_time_listener(event):
-        """Listen for matching time_changed events."""
-        now = event.data[ATTR_NOW]
+    def async_schedule(self, action, point_in_time):
+        """Schedule action to run at point_in_time (UTC).
+
+        Returns a function that can be called to cancel the action.
+
+        Must be run within the event loop.
+        """
+        # The counter keeps the registration order for equal deadlines and
+        # ensures the actions themselves never get compared.
+        entry = [point_in_time, next(self._counter), action]
+        heapq.heappush(self._heap, entry)
 
-        if now < point_in_time or hasattr(point_in_time_listener, 'run'):
+        if self._unsub_time is None:
+            self._unsub_time = self._hass.bus.async_listen(
+                EVENT_TIME_CHANGED, self._async_time_changed)
+
+        @callback
+        def async_cancel():
+            """Cancel the scheduled action."""
+            if entry[2] is None:
+                return
+
+            entry[2] = None
+            self._cancelled += 1
+            self._async_compact()
+
+        return async_cancel
+
+    @callback
+    def _async_compact(self):
+        """Drop cancelled entries once they make up half of the heap."""
+        if self._cancelled * 2 < len(self._heap):
             return
 
-        # Set variable so that we will never run twice.
-        # Because the event bus might have to wait till a thread comes
-        # available to execute this listener it might occur that the
-        # listener gets lined up twice to be executed. This will make
-        # sure the second time it does nothing.
-        point_in_time_listener.run = True
-        async_unsub()
+        self._heap = [entry for entry in self._heap if entry[2] is not None]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
 
-        hass.async_run_job(action, now)
+        if not self._heap and self._unsub_time is not None:
+            self._unsub_time()
+            self._unsub_time = None
 
-    async_unsub = hass.bus.async_listen(EVENT_TIME_CHANGED,
-                                        point_in_time_listener)
+    @callback
+    def _async_time_changed(self, event):
+        """Run the actions that are due."""
+        now = event.data[ATTR_NOW]
+        heap = self._heap
+        due = []
 
-    return async_unsub
+        # Collect first so actions that reschedule themselves in the past
+        # will only run on the next time changed event.
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
 
+            if entry[2] is None:
+                self._cancelled -= 1
+                continue
 
-track_point_in_utc_time = threaded_listener_factory(
-    async_track_point_in_utc_time)
+            due.append(entry[2])
+            # Mark as done so cancelling after the run is a no-op
+            entry[2] = None
+
+        if not heap and self._unsub_time is not None:
+            self._unsub_time()
+            self._unsub_time = None
+
+        for action in due:
+            self._hass.async_run_job(action, now)
 
 
 @callback
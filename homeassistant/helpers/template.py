@@ -1,10 +1,13 @@
 """Template helper methods for rendering strings with Home Assistant data."""
 from datetime import datetime
+from functools import lru_cache
 import json
 import logging
 import random
 import re
 import math
+import threading
+from timeit import default_timer as timer
 
 import jinja2
 from jinja2 import contextfilter
@@ -13,7 +16,7 @@ from jinja2.sandbox import ImmutableSandboxedEnvironment
 from homeassistant.const import (
     STATE_UNKNOWN, ATTR_LATITUDE, ATTR_LONGITUDE, MATCH_ALL,
     ATTR_UNIT_OF_MEASUREMENT)
-from homeassistant.core import State
+from homeassistant.core import State, callback
 from homeassistant.exceptions import TemplateError
 from homeassistant.helpers import location as loc_helper
 from homeassistant.loader import get_component, bind_hass
@@ -24,6 +27,16 @@ _LOGGER = logging.getLogger(__name__)
 _SENTINEL = object()
 DATE_STR_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+DATA_TEMPLATES = 'template_compiled'
+DATA_TEMPLATE_GLOBALS = 'template_globals'
+DATA_TEMPLATE_STATS = 'template_stats'
+
+# Number of template sources whose compiled code is kept
+COMPILE_CACHE_SIZE = 512
+
+# The render info collecting the states accessed by the current render
+_RENDER_INFO = threading.local()
+
 _RE_NONE_ENTITIES = re.compile(r"distance\(|closest\(", re.I | re.M)
 _RE_GET_ENTITIES = re.compile(
     r"(?:(?:states\.|(?:is_state|is_state_attr|states)"
@@ -68,6 +81,95 @@ def extract_entities(template, variables=None):
     return MATCH_ALL
 
 
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile(source):
+    """Compile a template source, shared by all identical templates."""
+    try:
+        return ENV.compile(source)
+    except jinja2.exceptions.TemplateSyntaxError as err:
+        raise TemplateError(err)
+
+
+def _collect_entity(entity_id):
+    """Record that the current render accessed the state of an entity."""
+    info = getattr(_RENDER_INFO, 'info', None)
+    if info is not None and isinstance(entity_id, str):
+        info.entities.add(entity_id.lower())
+
+
+def _collect_domain(domain):
+    """Record that the current render accessed all states of a domain."""
+    info = getattr(_RENDER_INFO, 'info', None)
+    if info is not None:
+        info.domains.add(domain)
+
+
+def _collect_all():
+    """Record that the current render accessed all states."""
+    info = getattr(_RENDER_INFO, 'info', None)
+    if info is not None:
+        info.all_states = True
+
+
+class RenderInfo(object):
+    """Result of a render and the states accessed while rendering."""
+
+    def __init__(self, template):
+        """Initialize the render info."""
+        self.template = template
+        self.result = None
+        self.exception = None
+        self.entities = set()
+        self.domains = set()
+        self.all_states = False
+
+    @property
+    def dependencies(self):
+        """Return the accessed entities, domains and if all states were."""
+        return (frozenset(self.entities), frozenset(self.domains),
+                self.all_states)
+
+    def __repr__(self):
+        """Return the representation of the render info."""
+        return '<RenderInfo {} all_states={} domains={} entities={}>'.format(
+            self.template, self.all_states, sorted(self.domains),
+            sorted(self.entities))
+
+
+class RenderStats(object):
+    """Statistics of the renders of a template source."""
+
+    __slots__ = ['count', 'total', 'max']
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        """Add a render."""
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+
+@callback
+def async_render_stats(hass):
+    """Return the render statistics of the templates, slowest first.
+
+    This method must be run in the event loop.
+    """
+    stats = hass.data.get(DATA_TEMPLATE_STATS, {})
+    return [{
+        'template': source,
+        'count': stat.count,
+        'total': stat.total,
+        'max': stat.max,
+    } for source, stat in sorted(stats.items(), key=lambda item: item[1].total,
+                                 reverse=True)]
+
+
 class Template(object):
     """Class to hold a template and manage caching and rendering."""
 
@@ -79,6 +181,7 @@ class Template(object):
         self.template = template
         self._compiled_code = None
         self._compiled = None
+        self._stats = None
         self.hass = hass
 
     def ensure_valid(self):
@@ -86,10 +189,7 @@ class Template(object):
         if self._compiled_code is not None:
             return
 
-        try:
-            self._compiled_code = ENV.compile(self.template)
-        except jinja2.exceptions.TemplateSyntaxError as err:
-            raise TemplateError(err)
+        self._compiled_code = _compile(self.template)
 
     def extract_entities(self, variables=None):
         """Extract all entities for state_changed listener."""
@@ -114,10 +214,33 @@ class Template(object):
         if variables is not None:
             kwargs.update(variables)
 
+        start = timer()
         try:
             return self._compiled.render(kwargs).strip()
         except jinja2.TemplateError as err:
             raise TemplateError(err)
+        finally:
+            self._stats.add(timer() - start)
+
+    def async_render_to_info(self, variables=None, **kwargs):
+        """Render the template and record the states it accessed.
+
+        Errors are stored in the returned RenderInfo instead of raised.
+
+        This method must be run in the event loop.
+        """
+        info = RenderInfo(self)
+        previous = getattr(_RENDER_INFO, 'info', None)
+        _RENDER_INFO.info = info
+
+        try:
+            info.result = self.async_render(variables, **kwargs)
+        except TemplateError as ex:
+            info.exception = ex
+        finally:
+            _RENDER_INFO.info = previous
+
+        return info
 
     def render_with_possible_json_value(self, value, error_value=_SENTINEL):
         """Render template with value exposed.
@@ -148,31 +271,40 @@ class Template(object):
         except ValueError:
             pass
 
+        start = timer()
         try:
             return self._compiled.render(variables).strip()
         except jinja2.TemplateError as ex:
             _LOGGER.error("Error parsing value: %s (value: %s, template: %s)",
                           ex, value, self.template)
             return value if error_value is _SENTINEL else error_value
+        finally:
+            self._stats.add(timer() - start)
 
     def _ensure_compiled(self):
-        """Bind a template to a specific hass instance."""
+        """Bind a template to a specific hass instance.
+
+        Templates with the same source share the compiled template and the
+        render statistics of a hass instance.
+        """
         self.ensure_valid()
 
         assert self.hass is not None, 'hass variable not set on template'
 
-        template_methods = TemplateMethods(self.hass)
+        compiled = self.hass.data.setdefault(DATA_TEMPLATES, {})
+        stats = self.hass.data.setdefault(DATA_TEMPLATE_STATS, {})
+        self._compiled = compiled.get(self.template)
+        self._stats = stats.get(self.template)
 
-        global_vars = ENV.make_globals({
-            'closest': template_methods.closest,
-            'distance': template_methods.distance,
-            'is_state': self.hass.states.is_state,
-            'is_state_attr': template_methods.is_state_attr,
-            'states': AllStates(self.hass),
-        })
+        if self._compiled is None:
+            self._compiled = jinja2.Template.from_code(
+                ENV, self._compiled_code, _hass_globals(self.hass), None)
+            self._stats = RenderStats()
 
-        self._compiled = jinja2.Template.from_code(
-            ENV, self._compiled_code, global_vars, None)
+            # Do not keep every template rendered through the API
+            if len(compiled) < COMPILE_CACHE_SIZE:
+                compiled[self.template] = self._compiled
+                stats[self.template] = self._stats
 
         return self._compiled
 
@@ -183,6 +315,23 @@ class Template(object):
                 self.hass == other.hass)
 
 
+def _hass_globals(hass):
+    """Return the template globals of a hass instance."""
+    global_vars = hass.data.get(DATA_TEMPLATE_GLOBALS)
+
+    if global_vars is None:
+        template_methods = TemplateMethods(hass)
+        global_vars = hass.data[DATA_TEMPLATE_GLOBALS] = ENV.make_globals({
+            'closest': template_methods.closest,
+            'distance': template_methods.distance,
+            'is_state': template_methods.is_state,
+            'is_state_attr': template_methods.is_state_attr,
+            'states': AllStates(hass),
+        })
+
+    return global_vars
+
+
 class AllStates(object):
     """Class to expose all HA states as attributes."""
 
@@ -196,17 +345,20 @@ class AllStates(object):
 
     def __iter__(self):
         """Return all states."""
-        return iter(
-            _wrap_state(state) for state in
-            sorted(self._hass.states.async_all(),
-                   key=lambda state: state.entity_id))
+        _collect_all()
+        get_state = self._hass.states.get
+        return iter([
+            _wrap_state(get_state(entity_id)) for entity_id
+            in self._hass.states.async_sorted_entity_ids()])
 
     def __len__(self):
         """Return number of states."""
+        _collect_all()
         return len(self._hass.states.async_entity_ids())
 
     def __call__(self, entity_id):
         """Return the states."""
+        _collect_entity(entity_id)
         state = self._hass.states.get(entity_id)
         return STATE_UNKNOWN if state is None else state.state
 
@@ -221,18 +373,21 @@ class DomainStates(object):
 
     def __getattr__(self, name):
         """Return the states."""
-        return _wrap_state(
-            self._hass.states.get('{}.{}'.format(self._domain, name)))
+        entity_id = '{}.{}'.format(self._domain, name)
+        _collect_entity(entity_id)
+        return _wrap_state(self._hass.states.get(entity_id))
 
     def __iter__(self):
         """Return the iteration over all the states."""
-        return iter(sorted(
-            (_wrap_state(state) for state in self._hass.states.async_all()
-             if state.domain == self._domain),
-            key=lambda state: state.entity_id))
+        _collect_domain(self._domain)
+        get_state = self._hass.states.get
+        return iter([
+            _wrap_state(get_state(entity_id)) for entity_id
+            in self._hass.states.async_sorted_entity_ids(self._domain)])
 
     def __len__(self):
         """Return number of states."""
+        _collect_domain(self._domain)
         return len(self._hass.states.async_entity_ids(self._domain))
 
 
@@ -337,8 +492,12 @@ class TemplateMethods(object):
 
             group = get_component('group')
 
-            states = [self._hass.states.get(entity_id) for entity_id
-                      in group.expand_entity_ids(self._hass, [gr_entity_id])]
+            _collect_entity(gr_entity_id)
+            states = []
+            for entity_id in group.expand_entity_ids(
+                    self._hass, [gr_entity_id]):
+                _collect_entity(entity_id)
+                states.append(self._hass.states.get(entity_id))
 
         return _wrap_state(loc_helper.closest(latitude, longitude, states))
 
@@ -390,8 +549,14 @@ class TemplateMethods(object):
         return self._hass.config.units.length(
             loc_util.distance(*locations[0] + locations[1]), 'm')
 
+    def is_state(self, entity_id, state):
+        """Test if an entity is in a specific state."""
+        _collect_entity(entity_id)
+        return self._hass.states.is_state(entity_id, state)
+
     def is_state_attr(self, entity_id, name, value):
         """Test if a state is a specific attribute."""
+        _collect_entity(entity_id)
         state_obj = self._hass.states.get(entity_id)
         return state_obj is not None and \
             state_obj.attributes.get(name) == value
@@ -401,6 +566,7 @@ class TemplateMethods(object):
         if isinstance(entity_id_or_state, State):
             return entity_id_or_state
         elif isinstance(entity_id_or_state, str):
+            _collect_entity(entity_id_or_state)
             return self._hass.states.get(entity_id_or_state)
         return None
 
@@ -115,6 +115,26 @@ def get_component(comp_name) -> Optional[ModuleType]:
     if comp_name in _COMPONENT_CACHE:
         return _COMPONENT_CACHE[comp_name]
 
+    return _load_component(comp_name, True)
+
+
+def preload_component(comp_name: str) -> Optional[ModuleType]:
+    """Import a component ahead of its setup.
+
+    Import errors are not logged, they will be logged when get_component
+    tries to load the component again.
+
+    This method needs to run in an executor.
+    """
+    if comp_name in _COMPONENT_CACHE:
+        return _COMPONENT_CACHE[comp_name]
+
+    return _load_component(comp_name, False)
+
+
+def _load_component(comp_name: str, log_errors: bool) \
+        -> Optional[ModuleType]:
+    """Import a component and add it to the cache."""
     _check_prepared()
 
     # If we ie. try to load custom_components.switch.wemo but the parent
@@ -161,12 +181,14 @@ def get_component(comp_name) -> Optional[ModuleType]:
         except ImportError as err:
             # This error happens if for example custom_components/switch
             # exists and we try to load switch.demo.
-            if str(err) != "No module named '{}'".format(path):
+            if log_errors and \
+                    str(err) != "No module named '{}'".format(path):
                 _LOGGER.exception(
                     ("Error loading %s. Make sure all "
                      "dependencies are installed"), path)
 
-    _LOGGER.error("Unable to find component %s", comp_name)
+    if log_errors:
+        _LOGGER.error("Unable to find component %s", comp_name)
 
     return None
 
@@ -5,6 +5,7 @@ from contextlib import suppress
 from datetime import datetime
 import logging
 from timeit import default_timer as timer
+import tracemalloc
 
 from homeassistant.const import (
     EVENT_TIME_CHANGED, ATTR_NOW, EVENT_STATE_CHANGED)
@@ -144,3 +145,135 @@ def async_million_state_changed_helper(hass):
     yield from event.wait()
 
     return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_1000_trackers_million_state_changes(hass):
+    """Run a million state changes through 1000 state change trackers."""
+    count = 0
+    entity_ids = ['light.kitchen_{}'.format(idx) for idx in range(1000)]
+    event = asyncio.Event(loop=hass.loop)
+
+    @core.callback
+    def listener(*args):
+        """Handle event."""
+        nonlocal count
+        count += 1
+
+        if count == 10**6:
+            event.set()
+
+    for entity_id in entity_ids:
+        hass.helpers.event.async_track_state_change(entity_id, listener)
+
+    events_data = [{
+        'entity_id': entity_id,
+        'old_state': core.State(entity_id, 'off'),
+        'new_state': core.State(entity_id, 'on'),
+    } for entity_id in entity_ids]
+
+    for idx in range(10**6):
+        hass.bus.async_fire(EVENT_STATE_CHANGED, events_data[idx % 1000])
+
+    start = timer()
+
+    yield from event.wait()
+
+    return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_10k_states_memory_and_set(hass):
+    """Measure the memory of 10k states and a million async_set calls."""
+    entity_ids = ['sensor.temperature_{}'.format(idx) for idx in range(10**4)]
+
+    def attributes():
+        """Return the attributes a sensor writes on every update."""
+        return {
+            'unit_of_measurement': '°C',
+            'friendly_name': 'Temperature',
+            'icon': 'mdi:thermometer',
+        }
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    for entity_id in entity_ids:
+        hass.states.async_set(entity_id, 20, attributes())
+
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print('Memory used by 10k states: {} KiB'.format(used // 1024))
+
+    start = timer()
+
+    for idx in range(10**6):
+        hass.states.async_set(
+            entity_ids[idx % 10**4], idx // 10**4 % 2, attributes())
+
+    return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_million_mqtt_messages_800_subscriptions(hass):
+    """Route a million MQTT messages to 800 subscriptions."""
+    from homeassistant.components import mqtt
+
+    count = 0
+    topics = ['zigbee2mqtt/device_{}'.format(idx) for idx in range(800)]
+    event = asyncio.Event(loop=hass.loop)
+
+    @core.callback
+    def listener(*args):
+        """Handle message."""
+        nonlocal count
+        count += 1
+
+        if count == 10**6:
+            event.set()
+
+    router = mqtt.async_get_router(hass)
+    for topic in topics:
+        router.async_subscribe(topic, listener)
+    router.async_subscribe('zigbee2mqtt/bridge/#', listener)
+    router.async_subscribe('tasmota/+/state', listener)
+
+    payload = b'{"state": "ON", "brightness": 255, "linkquality": 42}'
+
+    start = timer()
+
+    for idx in range(10**6):
+        hass.helpers.dispatcher.async_dispatcher_send(
+            mqtt.SIGNAL_MQTT_MESSAGE_RECEIVED, topics[idx % 800], payload, 0)
+
+    yield from event.wait()
+
+    return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+# pylint: disable=invalid-name
+def async_100k_blocking_service_calls(hass):
+    """Run 100k blocking service calls with 200 calls in flight."""
+    @core.callback
+    def service_handler(call):
+        """Handle service call."""
+        pass
+
+    hass.services.async_register('light', 'turn_on', service_handler)
+
+    start = timer()
+
+    for _ in range(500):
+        yield from asyncio.gather(*(
+            hass.services.async_call('light', 'turn_on', blocking=True)
+            for _ in range(200)), loop=hass.loop)
+
+    return timer() - start
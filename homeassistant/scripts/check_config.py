@@ -200,13 +200,13 @@ def check(config_path):
         return module
 
     # pylint: disable=unused-variable
-    def mock_secrets(ldr, node):
+    def mock_secrets(deferred):
         """Mock _get_secrets."""
         try:
-            val = MOCKS['secrets'][1](ldr, node)
+            val = MOCKS['secrets'][1](deferred)
         except HomeAssistantError:
             val = None
-        res['secrets'][node.value] = val
+        res['secrets'][deferred.value] = val
         return val
 
     def mock_except(ex, domain, config,  # pylint: disable=unused-variable
@@ -243,8 +243,6 @@ def check(config_path):
     # Start all patches
     for pat in PATCHES.values():
         pat.start()
-    # Ensure !secrets point to the patched function
-    yaml.yaml.SafeLoader.add_constructor('!secret', yaml._secret_yaml)
 
     try:
         with patch('homeassistant.util.logging.AsyncHandler._process'):
@@ -257,8 +255,6 @@ def check(config_path):
         # Stop all patches
         for pat in PATCHES.values():
             pat.stop()
-        # Ensure !secrets point to the original function
-        yaml.yaml.SafeLoader.add_constructor('!secret', yaml._secret_yaml)
         bootstrap.clear_secret_cache()
 
     return res
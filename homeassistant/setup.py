@@ -21,7 +21,9 @@ _LOGGER = logging.getLogger(__name__)
 ATTR_COMPONENT = 'component'
 
 DATA_SETUP = 'setup_tasks'
+DATA_SETUP_TIME = 'setup_time'
 DATA_PIP_LOCK = 'pip_lock'
+DATA_REQUIREMENTS = 'requirements_met'
 
 SLOW_SETUP_WARNING = 10
 
@@ -85,8 +87,14 @@ def _async_process_requirements(hass: core.HomeAssistant, name: str,
             constraints=os.path.join(
                 os.path.dirname(__file__), CONSTRAINT_FILE))
 
+    # Requirements known to be met, loaded by bootstrap from the cache
+    requirements_met = hass.data.get(DATA_REQUIREMENTS)
+
     with (yield from pip_lock):
         for req in requirements:
+            if requirements_met is not None and req in requirements_met:
+                continue
+
             ret = yield from hass.async_add_job(pip_install, req)
             if not ret:
                 _LOGGER.error("Not initializing %s because could not install "
@@ -94,6 +102,9 @@ def _async_process_requirements(hass: core.HomeAssistant, name: str,
                 async_notify_setup_error(hass, name)
                 return False
 
+            if requirements_met is not None:
+                requirements_met.add(req)
+
     return True
 
 
@@ -206,6 +217,7 @@ def _async_setup_component(hass: core.HomeAssistant,
         if warn_task:
             warn_task.cancel()
     _LOGGER.info("Setup of domain %s took %.1f seconds.", domain, end - start)
+    hass.data.setdefault(DATA_SETUP_TIME, {})[domain] = end - start
 
     if result is False:
         log_error("Component failed to initialize.")
@@ -1,5 +1,6 @@
 """Helpers to install PyPi packages."""
 import asyncio
+import hashlib
 import logging
 import os
 from subprocess import PIPE, Popen
@@ -8,10 +9,13 @@ import threading
 from urllib.parse import urlparse
 
 from pip.locations import running_under_virtualenv
-from typing import Optional
+from typing import Optional, Set
 
 import pkg_resources
 
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.json import load_json, save_json
+
 _LOGGER = logging.getLogger(__name__)
 
 INSTALL_LOCK = threading.Lock()
@@ -71,6 +75,52 @@ def check_package_exists(package: str) -> bool:
     return any(dist in req for dist in env[req.project_name])
 
 
+def environment_fingerprint() -> str:
+    """Return a fingerprint of the directories packages are loaded from.
+
+    Installing or removing a package changes the modification time of the
+    directory it is installed in.
+    """
+    fingerprint = hashlib.sha1()
+
+    for path in sys.path:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        fingerprint.update('{}:{}\n'.format(path, mtime).encode('utf-8'))
+
+    return fingerprint.hexdigest()
+
+
+def load_requirements_cache(path: str) -> Set[str]:
+    """Load the requirements that were met when the cache was saved.
+
+    Returns an empty set when packages were installed or removed since.
+    """
+    try:
+        cache = load_json(path)
+    except HomeAssistantError:
+        return set()
+
+    if not isinstance(cache, dict) or \
+            cache.get('fingerprint') != environment_fingerprint():
+        return set()
+
+    return set(cache.get('requirements', []))
+
+
+def save_requirements_cache(path: str, requirements: Set[str]) -> None:
+    """Save the requirements that are met in the current environment."""
+    try:
+        save_json(path, {
+            'fingerprint': environment_fingerprint(),
+            'requirements': sorted(requirements),
+        })
+    except HomeAssistantError:
+        pass
+
+
 def _get_user_site(deps_dir: str) -> tuple:
     """Get arguments and environment for subprocess used in get_user_site."""
     env = os.environ.copy()
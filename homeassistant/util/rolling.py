@@ -0,0 +1,148 @@
+"""Rolling window statistics that are updated incrementally."""
+from bisect import bisect_left, insort
+from collections import deque
+import math
+
+
+class RollingWindow(object):
+    """Keep the statistics of the last values added to a window.
+
+    Adding or evicting a value updates the mean and variance with Welford's
+    algorithm and keeps a sorted copy of the values for the median, min and
+    max, instead of computing them from all values for every update.
+    """
+
+    def __init__(self, size, max_age=None):
+        """Initialize the window for size values no older than max_age."""
+        self.size = size
+        self.max_age = max_age
+        self._values = deque()
+        self._timestamps = deque()
+        self._sorted = []
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._total = 0.0
+        self._evictions = 0
+
+    def __len__(self):
+        """Return the number of values in the window."""
+        return len(self._values)
+
+    def add(self, value, timestamp=None):
+        """Add a value, evicting the oldest one if the window is full."""
+        if len(self._values) >= self.size:
+            self._evict()
+
+        self._values.append(value)
+        self._timestamps.append(timestamp)
+        insort(self._sorted, value)
+
+        delta = value - self._mean
+        self._mean += delta / len(self._values)
+        self._m2 += delta * (value - self._mean)
+        self._total += value
+
+    def purge(self, now):
+        """Evict the values that are older than max_age at now."""
+        if self.max_age is None:
+            return
+
+        timestamps = self._timestamps
+        while timestamps and now - timestamps[0] > self.max_age:
+            self._evict()
+
+    def clear(self):
+        """Remove all values."""
+        self._values.clear()
+        self._timestamps.clear()
+        self._sorted = []
+        self._mean = self._m2 = self._total = 0.0
+        self._evictions = 0
+
+    def _evict(self):
+        """Remove the oldest value."""
+        value = self._values.popleft()
+        self._timestamps.popleft()
+        del self._sorted[bisect_left(self._sorted, value)]
+
+        count = len(self._values)
+        if not count:
+            self._mean = self._m2 = self._total = 0.0
+            return
+
+        delta = value - self._mean
+        self._mean -= delta / count
+        self._m2 = max(self._m2 - delta * (value - self._mean), 0.0)
+        self._total -= value
+
+        # Removing values accumulates rounding errors, start over regularly
+        self._evictions += 1
+        if self._evictions >= self.size:
+            self._resync()
+
+    def _resync(self):
+        """Recompute the running sums from the values in the window."""
+        count = len(self._values)
+        self._total = math.fsum(self._values)
+        self._mean = self._total / count
+        self._m2 = math.fsum((value - self._mean) ** 2
+                             for value in self._values)
+        self._evictions = 0
+
+    def items(self):
+        """Return the values and their timestamps from oldest to newest."""
+        return list(zip(self._values, self._timestamps))
+
+    @property
+    def first(self):
+        """Return the oldest value."""
+        return self._values[0] if self._values else None
+
+    @property
+    def last(self):
+        """Return the newest value."""
+        return self._values[-1] if self._values else None
+
+    @property
+    def total(self):
+        """Return the sum of the values."""
+        return self._total if self._values else None
+
+    @property
+    def mean(self):
+        """Return the mean of the values."""
+        return self._mean if self._values else None
+
+    @property
+    def variance(self):
+        """Return the sample variance, which needs at least two values."""
+        count = len(self._values)
+        return self._m2 / (count - 1) if count > 1 else None
+
+    @property
+    def stdev(self):
+        """Return the sample standard deviation."""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    @property
+    def median(self):
+        """Return the median of the values."""
+        count = len(self._sorted)
+        if not count:
+            return None
+
+        middle = count // 2
+        if count % 2:
+            return self._sorted[middle]
+        return (self._sorted[middle - 1] + self._sorted[middle]) / 2
+
+    @property
+    def min(self):
+        """Return the smallest value."""
+        return self._sorted[0] if self._sorted else None
+
+    @property
+    def max(self):
+        """Return the largest value."""
+        return self._sorted[-1] if self._sorted else None
@@ -1,9 +1,11 @@
 """YAML utility functions."""
+import json
 import logging
 import os
 import sys
 import fnmatch
 from collections import OrderedDict
+from hashlib import sha1
 from typing import Union, List, Dict
 
 import yaml
@@ -24,6 +26,13 @@ _SECRET_NAMESPACE = 'homeassistant'
 SECRET_YAML = 'secrets.yaml'
 __SECRET_CACHE = {}  # type: Dict
 
+# Version of the format of the parsed files cache
+YAML_CACHE_VERSION = 2
+
+# Parsed files, path => (digest of the content, parsed tree)
+__YAML_CACHE = {}  # type: Dict
+__YAML_CACHE_CHANGED = False
+
 
 class NodeListClass(list):
     """Wrapper class to be able to add attributes on a list."""
@@ -37,14 +46,31 @@ class NodeStrClass(str):
     pass
 
 
-def _add_reference(obj, loader, node):
+class _Deferred(object):
+    """Tag of a parsed file that is resolved each time the file is loaded.
+
+    Included files, secrets and environment variables are resolved when
+    loading s.t. parsed files can be cached on their own content.
+    """
+
+    __slots__ = ['tag', 'value', 'config_file', 'line']
+
+    def __init__(self, tag, value, config_file, line):
+        """Initialize the deferred tag."""
+        self.tag = tag
+        self.value = value
+        self.config_file = config_file
+        self.line = line
+
+
+def _add_reference(obj, config_file, line):
     """Add file reference information to an object."""
     if isinstance(obj, list):
         obj = NodeListClass(obj)
     if isinstance(obj, str):
         obj = NodeStrClass(obj)
-    setattr(obj, '__config_file__', loader.name)
-    setattr(obj, '__line__', node.start_mark.line)
+    setattr(obj, '__config_file__', config_file)
+    setattr(obj, '__line__', line)
     return obj
 
 
@@ -52,6 +78,12 @@ def _add_reference(obj, loader, node):
 class SafeLineLoader(yaml.SafeLoader):
     """Loader class that keeps track of line numbers."""
 
+    def __init__(self, stream, name=None):
+        """Initialize the loader."""
+        super(SafeLineLoader, self).__init__(stream)
+        if name is not None:
+            self.name = name
+
     def compose_node(self, parent: yaml.nodes.Node, index) -> yaml.nodes.Node:
         """Annotate a node with the first line it was seen."""
         last_line = self.line  # type: int
@@ -61,20 +93,220 @@ class SafeLineLoader(yaml.SafeLoader):
         return node
 
 
+if getattr(yaml, '__with_libyaml__', False):
+    # pylint: disable=no-member
+    class CSafeLineLoader(yaml.CSafeLoader):
+        """Loader class using libyaml that keeps track of line numbers.
+
+        Line numbers are taken from the start marks of the nodes.
+        """
+
+        def __init__(self, stream, name=None):
+            """Initialize the loader."""
+            super(CSafeLineLoader, self).__init__(stream)
+            self.stream = stream
+            self.name = name or getattr(stream, 'name', '<file>')
+
+    _LOADER = CSafeLineLoader
+else:
+    _LOADER = SafeLineLoader
+
+
 def load_yaml(fname: str) -> Union[List, Dict]:
     """Load a YAML file."""
+    # If configuration file is empty YAML returns None
+    # We convert that to an empty dict
+    return _resolve(_parse_yaml(fname)) or OrderedDict()
+
+
+def _parse_yaml(fname: str):
+    """Return the parsed tree of a YAML file.
+
+    Files are only parsed again when their content changed.
+    """
+    global __YAML_CACHE_CHANGED  # pylint: disable=invalid-name
+
     try:
         with open(fname, encoding='utf-8') as conf_file:
-            # If configuration file is empty YAML returns None
-            # We convert that to an empty dict
-            return yaml.load(conf_file, Loader=SafeLineLoader) or OrderedDict()
-    except yaml.YAMLError as exc:
-        _LOGGER.error(exc)
-        raise HomeAssistantError(exc)
+            content = conf_file.read()
     except UnicodeDecodeError as exc:
         _LOGGER.error("Unable to read file %s: %s", fname, exc)
         raise HomeAssistantError(exc)
 
+    digest = sha1(content.encode('utf-8')).hexdigest()
+    cached = __YAML_CACHE.get(fname)
+
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+
+    loader = _LOADER(content, fname)
+    try:
+        tree = loader.get_single_data()
+    except yaml.YAMLError as exc:
+        _LOGGER.error(exc)
+        raise HomeAssistantError(exc)
+    finally:
+        loader.dispose()
+
+    __YAML_CACHE[fname] = (digest, tree)
+    __YAML_CACHE_CHANGED = True
+    return tree
+
+
+def _resolve(obj):
+    """Return a copy of a parsed tree with the deferred tags resolved."""
+    if isinstance(obj, _Deferred):
+        return _resolve_deferred(obj)
+
+    if isinstance(obj, dict):
+        resolved = OrderedDict(
+            (_resolve(key), _resolve(value)) for key, value in obj.items())
+    elif isinstance(obj, list):
+        resolved = NodeListClass(_resolve(value) for value in obj)
+    else:
+        return obj
+
+    if hasattr(obj, '__config_file__'):
+        resolved = _add_reference(
+            resolved, obj.__config_file__, obj.__line__)
+
+    return resolved
+
+
+def _resolve_deferred(deferred: _Deferred):
+    """Return the value of a deferred tag."""
+    if deferred.tag == '!include':
+        return _include_yaml(deferred)
+    elif deferred.tag == '!include_dir_list':
+        return _include_dir_list_yaml(deferred)
+    elif deferred.tag == '!include_dir_merge_list':
+        return _include_dir_merge_list_yaml(deferred)
+    elif deferred.tag == '!include_dir_named':
+        return _include_dir_named_yaml(deferred)
+    elif deferred.tag == '!include_dir_merge_named':
+        return _include_dir_merge_named_yaml(deferred)
+    elif deferred.tag == '!env_var':
+        return _env_var_yaml(deferred)
+    return _secret_yaml(deferred)
+
+
+def _encode_tree(obj):
+    """Return a parsed tree as JSON data.
+
+    Containers, strings with a file reference and deferred tags are encoded
+    as a list starting with their type.
+    """
+    if obj is None or isinstance(obj, (bool, int, float)):
+        return obj
+
+    if isinstance(obj, _Deferred):
+        return ['tag', obj.tag, obj.value, obj.config_file, obj.line]
+
+    reference = [getattr(obj, '__config_file__', None),
+                 getattr(obj, '__line__', None)]
+
+    if isinstance(obj, str):
+        if isinstance(obj, NodeStrClass):
+            return ['str', str(obj)] + reference
+        return obj
+    elif isinstance(obj, dict):
+        return ['dict', [[_encode_tree(key), _encode_tree(value)]
+                         for key, value in obj.items()]] + reference
+    elif isinstance(obj, list):
+        return ['list', [_encode_tree(value) for value in obj]] + reference
+
+    raise TypeError("Unable to cache {}".format(type(obj).__name__))
+
+
+def _decode_tree(data):
+    """Return a parsed tree from JSON data."""
+    if not isinstance(data, list):
+        return data
+
+    kind = data[0]
+
+    if kind == 'tag':
+        return _Deferred(*data[1:])
+    elif kind == 'str':
+        obj = data[1]
+    elif kind == 'dict':
+        obj = OrderedDict((_decode_tree(key), _decode_tree(value))
+                          for key, value in data[1])
+    elif kind == 'list':
+        obj = [_decode_tree(value) for value in data[1]]
+    else:
+        raise ValueError("Unknown type {}".format(kind))
+
+    config_file, line = data[2:]
+    if config_file is None:
+        return NodeListClass(obj) if kind == 'list' else obj
+    return _add_reference(obj, config_file, line)
+
+
+def load_yaml_cache(path: str) -> None:
+    """Load the parsed files cache from disk.
+
+    This method needs to run in an executor.
+    """
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+
+        if not isinstance(cache, dict) or \
+                cache.get('version') != YAML_CACHE_VERSION:
+            return
+
+        files = {fname: (digest, _decode_tree(tree))
+                 for fname, (digest, tree) in cache['files'].items()}
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, TypeError, KeyError, IndexError) as err:
+        _LOGGER.warning("Unable to load YAML cache %s: %s", path, err)
+        return
+
+    for fname, entry in files.items():
+        __YAML_CACHE.setdefault(fname, entry)
+
+
+def save_yaml_cache(path: str) -> None:
+    """Save the parsed files cache to disk if files were parsed.
+
+    Secrets are not saved, they are parsed from secrets.yaml on each load.
+    Files with values that can not be stored as JSON are parsed again.
+    This method needs to run in an executor.
+    """
+    global __YAML_CACHE_CHANGED  # pylint: disable=invalid-name
+
+    if not __YAML_CACHE_CHANGED:
+        return
+
+    files = {}
+    for fname, (digest, tree) in __YAML_CACHE.items():
+        if os.path.basename(fname) == SECRET_YAML:
+            continue
+        try:
+            files[fname] = [digest, _encode_tree(tree)]
+        except TypeError as err:
+            _LOGGER.debug("Not caching %s: %s", fname, err)
+
+    try:
+        with open(path, 'w', encoding='utf-8') as cache_file:
+            json.dump({'version': YAML_CACHE_VERSION, 'files': files},
+                      cache_file)
+    except (OSError, ValueError) as err:
+        _LOGGER.warning("Unable to save YAML cache %s: %s", path, err)
+        return
+
+    __YAML_CACHE_CHANGED = False
+
+
+def clear_yaml_cache() -> None:
+    """Clear the parsed files cache.
+
+    Async friendly.
+    """
+    __YAML_CACHE.clear()
+
 
 def dump(_dict: dict) -> str:
     """Dump YAML to a string and remove null."""
@@ -91,15 +323,16 @@ def clear_secret_cache() -> None:
     __SECRET_CACHE.clear()
 
 
-def _include_yaml(loader: SafeLineLoader,
-                  node: yaml.nodes.Node) -> Union[List, Dict]:
+def _include_yaml(deferred: _Deferred) -> Union[List, Dict]:
     """Load another YAML file and embeds it using the !include tag.
 
     Example:
         device_tracker: !include device_tracker.yaml
     """
-    fname = os.path.join(os.path.dirname(loader.name), node.value)
-    return _add_reference(load_yaml(fname), loader, node)
+    fname = os.path.join(os.path.dirname(deferred.config_file),
+                         deferred.value)
+    return _add_reference(
+        load_yaml(fname), deferred.config_file, deferred.line)
 
 
 def _is_file_valid(name: str) -> bool:
@@ -117,44 +350,40 @@ def _find_files(directory: str, pattern: str):
                 yield filename
 
 
-def _include_dir_named_yaml(loader: SafeLineLoader,
-                            node: yaml.nodes.Node) -> OrderedDict:
+def _include_dir_named_yaml(deferred: _Deferred) -> OrderedDict:
     """Load multiple files from directory as a dictionary."""
     mapping = OrderedDict()  # type: OrderedDict
-    loc = os.path.join(os.path.dirname(loader.name), node.value)
+    loc = os.path.join(os.path.dirname(deferred.config_file), deferred.value)
     for fname in _find_files(loc, '*.yaml'):
         filename = os.path.splitext(os.path.basename(fname))[0]
         mapping[filename] = load_yaml(fname)
-    return _add_reference(mapping, loader, node)
+    return _add_reference(mapping, deferred.config_file, deferred.line)
 
 
-def _include_dir_merge_named_yaml(loader: SafeLineLoader,
-                                  node: yaml.nodes.Node) -> OrderedDict:
+def _include_dir_merge_named_yaml(deferred: _Deferred) -> OrderedDict:
     """Load multiple files from directory as a merged dictionary."""
     mapping = OrderedDict()  # type: OrderedDict
-    loc = os.path.join(os.path.dirname(loader.name), node.value)
+    loc = os.path.join(os.path.dirname(deferred.config_file), deferred.value)
     for fname in _find_files(loc, '*.yaml'):
         if os.path.basename(fname) == SECRET_YAML:
             continue
         loaded_yaml = load_yaml(fname)
         if isinstance(loaded_yaml, dict):
             mapping.update(loaded_yaml)
-    return _add_reference(mapping, loader, node)
+    return _add_reference(mapping, deferred.config_file, deferred.line)
 
 
-def _include_dir_list_yaml(loader: SafeLineLoader,
-                           node: yaml.nodes.Node):
+def _include_dir_list_yaml(deferred: _Deferred):
     """Load multiple files from directory as a list."""
-    loc = os.path.join(os.path.dirname(loader.name), node.value)
+    loc = os.path.join(os.path.dirname(deferred.config_file), deferred.value)
     return [load_yaml(f) for f in _find_files(loc, '*.yaml')
             if os.path.basename(f) != SECRET_YAML]
 
 
-def _include_dir_merge_list_yaml(loader: SafeLineLoader,
-                                 node: yaml.nodes.Node):
+def _include_dir_merge_list_yaml(deferred: _Deferred):
     """Load multiple files from directory as a merged list."""
-    loc = os.path.join(os.path.dirname(loader.name),
-                       node.value)  # type: str
+    loc = os.path.join(os.path.dirname(deferred.config_file),
+                       deferred.value)  # type: str
     merged_list = []  # type: List
     for fname in _find_files(loc, '*.yaml'):
         if os.path.basename(fname) == SECRET_YAML:
@@ -162,7 +391,7 @@ def _include_dir_merge_list_yaml(loader: SafeLineLoader,
         loaded_yaml = load_yaml(fname)
         if isinstance(loaded_yaml, list):
             merged_list.extend(loaded_yaml)
-    return _add_reference(merged_list, loader, node)
+    return _add_reference(merged_list, deferred.config_file, deferred.line)
 
 
 def _ordered_dict(loader: SafeLineLoader,
@@ -178,32 +407,41 @@ def _ordered_dict(loader: SafeLineLoader,
         try:
             hash(key)
         except TypeError:
-            fname = getattr(loader.stream, 'name', '')
             raise yaml.MarkedYAMLError(
                 context="invalid key: \"{}\"".format(key),
-                context_mark=yaml.Mark(fname, 0, line, -1, None, None)
+                context_mark=yaml.Mark(loader.name, 0, line, -1, None, None)
             )
 
         if key in seen:
-            fname = getattr(loader.stream, 'name', '')
             _LOGGER.error(
                 'YAML file %s contains duplicate key "%s". '
-                'Check lines %d and %d.', fname, key, seen[key], line)
+                'Check lines %d and %d.', loader.name, key, seen[key], line)
         seen[key] = line
 
-    return _add_reference(OrderedDict(nodes), loader, node)
+    return _add_reference(
+        OrderedDict(nodes), loader.name, node.start_mark.line)
 
 
 def _construct_seq(loader: SafeLineLoader, node: yaml.nodes.Node):
     """Add line number and file name to Load YAML sequence."""
     obj, = loader.construct_yaml_seq(node)
-    return _add_reference(obj, loader, node)
+    return _add_reference(obj, loader.name, node.start_mark.line)
+
+
+def _construct_deferred(loader: SafeLineLoader, node: yaml.nodes.Node):
+    """Defer a tag to when the parsed file is loaded."""
+    return _Deferred(node.tag, loader.construct_scalar(node), loader.name,
+                     node.start_mark.line)
+
 
+def _construct_resolved(loader: SafeLineLoader, node: yaml.nodes.Node):
+    """Resolve a tag while loading with the plain safe loader."""
+    return _resolve_deferred(_construct_deferred(loader, node))
 
-def _env_var_yaml(loader: SafeLineLoader,
-                  node: yaml.nodes.Node):
+
+def _env_var_yaml(deferred: _Deferred):
     """Load environment variables and embed it into the configuration YAML."""
-    args = node.value.split()
+    args = deferred.value.split()
 
     # Check for a default value
     if len(args) > 1:
@@ -211,8 +449,8 @@ def _env_var_yaml(loader: SafeLineLoader,
     elif args[0] in os.environ:
         return os.environ[args[0]]
     else:
-        _LOGGER.error("Environment variable %s not defined.", node.value)
-        raise HomeAssistantError(node.value)
+        _LOGGER.error("Environment variable %s not defined.", deferred.value)
+        raise HomeAssistantError(deferred.value)
 
 
 def _load_secret_yaml(secret_path: str) -> Dict:
@@ -239,17 +477,16 @@ def _load_secret_yaml(secret_path: str) -> Dict:
 
 
 # pylint: disable=protected-access
-def _secret_yaml(loader: SafeLineLoader,
-                 node: yaml.nodes.Node):
+def _secret_yaml(deferred: _Deferred):
     """Load secrets and embed it into the configuration YAML."""
-    secret_path = os.path.dirname(loader.name)
+    secret_path = os.path.dirname(deferred.config_file)
     while True:
         secrets = _load_secret_yaml(secret_path)
 
-        if node.value in secrets:
+        if deferred.value in secrets:
             _LOGGER.debug("Secret %s retrieved from secrets.yaml in "
-                          "folder %s", node.value, secret_path)
-            return secrets[node.value]
+                          "folder %s", deferred.value, secret_path)
+            return secrets[deferred.value]
 
         if secret_path == os.path.dirname(sys.path[0]):
             break  # sys.path[0] set to config/deps folder by bootstrap
@@ -260,18 +497,19 @@ def _secret_yaml(loader: SafeLineLoader,
 
     if keyring:
         # do some keyring stuff
-        pwd = keyring.get_password(_SECRET_NAMESPACE, node.value)
+        pwd = keyring.get_password(_SECRET_NAMESPACE, deferred.value)
         if pwd:
-            _LOGGER.debug("Secret %s retrieved from keyring", node.value)
+            _LOGGER.debug("Secret %s retrieved from keyring", deferred.value)
             return pwd
 
     global credstash  # pylint: disable=invalid-name
 
     if credstash:
         try:
-            pwd = credstash.getSecret(node.value, table=_SECRET_NAMESPACE)
+            pwd = credstash.getSecret(deferred.value, table=_SECRET_NAMESPACE)
             if pwd:
-                _LOGGER.debug("Secret %s retrieved from credstash", node.value)
+                _LOGGER.debug("Secret %s retrieved from credstash",
+                              deferred.value)
                 return pwd
         except credstash.ItemNotFound:
             pass
@@ -279,23 +517,25 @@ def _secret_yaml(loader: SafeLineLoader,
             # Catch if package installed and no config
             credstash = None
 
-    _LOGGER.error("Secret %s not defined", node.value)
-    raise HomeAssistantError(node.value)
-
-
-yaml.SafeLoader.add_constructor('!include', _include_yaml)
-yaml.SafeLoader.add_constructor(yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
-                                _ordered_dict)
-yaml.SafeLoader.add_constructor(
-    yaml.resolver.BaseResolver.DEFAULT_SEQUENCE_TAG, _construct_seq)
-yaml.SafeLoader.add_constructor('!env_var', _env_var_yaml)
-yaml.SafeLoader.add_constructor('!secret', _secret_yaml)
-yaml.SafeLoader.add_constructor('!include_dir_list', _include_dir_list_yaml)
-yaml.SafeLoader.add_constructor('!include_dir_merge_list',
-                                _include_dir_merge_list_yaml)
-yaml.SafeLoader.add_constructor('!include_dir_named', _include_dir_named_yaml)
-yaml.SafeLoader.add_constructor('!include_dir_merge_named',
-                                _include_dir_merge_named_yaml)
+    _LOGGER.error("Secret %s not defined", deferred.value)
+    raise HomeAssistantError(deferred.value)
+
+
+DEFERRED_TAGS = ('!include', '!include_dir_list', '!include_dir_merge_list',
+                 '!include_dir_named', '!include_dir_merge_named',
+                 '!env_var', '!secret')
+
+for _loader in (yaml.SafeLoader, SafeLineLoader, _LOADER):
+    _loader.add_constructor(
+        yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _ordered_dict)
+    _loader.add_constructor(
+        yaml.resolver.BaseResolver.DEFAULT_SEQUENCE_TAG, _construct_seq)
+
+    # The loaders used by load_yaml keep the tags in the parsed tree
+    for _tag in DEFERRED_TAGS:
+        _loader.add_constructor(
+            _tag, _construct_resolved if _loader is yaml.SafeLoader
+            else _construct_deferred)
 
 
 # From: https://gist.github.com/miracle2k/3184458
@@ -426,7 +426,7 @@ def patch_yaml_files(files_dict, endswith=True):
     # match using endswith, start search with longest string
     matchlist = sorted(list(files_dict.keys()), key=len) if endswith else []
 
-    def mock_open_f(fname, **_):
+    def mock_open_f(fname, *_, **__):
         """Mock open() in the yaml module, used by load_yaml."""
         # Return the mocked file on full match
         if fname in files_dict:
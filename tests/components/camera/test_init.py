@@ -100,26 +100,56 @@ class TestGetImage(object):
             run_coroutine_threadsafe(camera.async_get_image(
                 self.hass, 'camera.demo_camera'), self.hass.loop).result()
 
-    def test_get_image_with_timeout(self, aioclient_mock):
-        """Try to get image with timeout."""
-        aioclient_mock.get(self.url, exc=asyncio.TimeoutError())
+    def test_get_image_from_other_instance_with_timeout(
+            self, aioclient_mock):
+        """Try to get image from a camera of another instance with timeout."""
+        self.hass.states.set('camera.remote', 'idle', {
+            ATTR_ENTITY_PICTURE: '/api/camera_proxy/camera.remote?token=1'})
+        aioclient_mock.get(
+            "{}/api/camera_proxy/camera.remote?token=1".format(
+                self.hass.config.api.base_url), exc=asyncio.TimeoutError())
 
         with pytest.raises(HomeAssistantError):
             run_coroutine_threadsafe(camera.async_get_image(
-                self.hass, 'camera.demo_camera'), self.hass.loop).result()
+                self.hass, 'camera.remote'), self.hass.loop).result()
 
         assert len(aioclient_mock.mock_calls) == 1
 
-    def test_get_image_with_bad_http_state(self, aioclient_mock):
-        """Try to get image with bad http status."""
-        aioclient_mock.get(self.url, status=400)
+    def test_get_image_from_other_instance_with_bad_http_state(
+            self, aioclient_mock):
+        """Try to get image from a camera of another instance with error."""
+        self.hass.states.set('camera.remote', 'idle', {
+            ATTR_ENTITY_PICTURE: '/api/camera_proxy/camera.remote?token=1'})
+        aioclient_mock.get(
+            "{}/api/camera_proxy/camera.remote?token=1".format(
+                self.hass.config.api.base_url), status=400)
 
         with pytest.raises(HomeAssistantError):
             run_coroutine_threadsafe(camera.async_get_image(
-                self.hass, 'camera.demo_camera'), self.hass.loop).result()
+                self.hass, 'camera.remote'), self.hass.loop).result()
 
         assert len(aioclient_mock.mock_calls) == 1
 
+    @patch('homeassistant.components.camera.demo.DemoCamera.camera_image',
+           side_effect=asyncio.TimeoutError())
+    def test_get_image_with_timeout(self, mock_camera):
+        """Try to get image with timeout."""
+        with pytest.raises(HomeAssistantError):
+            run_coroutine_threadsafe(camera.async_get_image(
+                self.hass, 'camera.demo_camera'), self.hass.loop).result()
+
+        assert mock_camera.called
+
+    @patch('homeassistant.components.camera.demo.DemoCamera.camera_image',
+           return_value=None)
+    def test_get_image_without_image(self, mock_camera):
+        """Try to get image from a camera without image."""
+        with pytest.raises(HomeAssistantError):
+            run_coroutine_threadsafe(camera.async_get_image(
+                self.hass, 'camera.demo_camera'), self.hass.loop).result()
+
+        assert mock_camera.called
+
 
 @asyncio.coroutine
 def test_snapshot_service(hass, mock_camera):
@@ -136,3 +166,73 @@ def test_snapshot_service(hass, mock_camera):
 
         assert len(mock_write.mock_calls) == 1
         assert mock_write.mock_calls[0][1][0] == b'Test'
+
+
+@asyncio.coroutine
+def test_concurrent_images_share_fetch(hass, mock_camera):
+    """Test concurrent consumers of a camera share the fetched image."""
+    with patch('homeassistant.components.camera.demo.DemoCamera.'
+               'camera_image', return_value=b'Test') as mock_image:
+        images = yield from asyncio.gather(
+            camera.async_get_image(hass, 'camera.demo_camera'),
+            camera.async_get_image(hass, 'camera.demo_camera'),
+            loop=hass.loop)
+
+    assert images == [b'Test', b'Test']
+    assert len(mock_image.mock_calls) == 1
+
+
+@asyncio.coroutine
+def test_frame_broker_drops_frames_for_slow_streams(hass, mock_camera):
+    """Test a stream only keeps the newest frame it has not sent."""
+    brokers = hass.data[camera.DATA_FRAME_BROKERS]
+    broker = brokers.async_get('camera.demo_camera')
+
+    subscription = broker.async_subscribe()
+    assert (yield from subscription.queue.get()) == b'Test'
+
+    subscription.interval = 0
+    broker._async_publish(b'first')
+    broker._async_publish(b'second')
+    # Unchanged frames are not passed again
+    broker._async_publish(b'second')
+
+    assert subscription.queue.qsize() == 1
+    assert (yield from subscription.queue.get()) == b'second'
+
+    stats = brokers.async_as_dict()['camera.demo_camera']
+    assert stats['streams'] == 1
+    assert stats['frames'] >= 1
+    assert stats['dropped'] == 1
+
+    broker.async_unsubscribe(subscription)
+    assert brokers.async_as_dict()['camera.demo_camera']['streams'] == 0
+
+
+@asyncio.coroutine
+def test_mjpeg_stream(hass, test_client):
+    """Test the MJPEG stream ends when the camera has no image."""
+    assert (yield from async_setup_component(hass, 'camera', {
+        camera.DOMAIN: {
+            'platform': 'demo'
+        }
+    }))
+    client = yield from test_client(hass.http.app)
+
+    with patch('homeassistant.components.camera.demo.DemoCamera.'
+               'camera_image', side_effect=[b'1', b'2', None]), \
+            patch('homeassistant.components.camera.FRAME_INTERVAL', 0):
+        resp = yield from client.get(
+            '/api/camera_proxy_stream/camera.demo_camera')
+        assert resp.status == 200
+        body = yield from resp.read()
+
+    # The first frame is sent twice
+    assert body.count(b'--frameboundary') == 3
+    assert body.endswith(b'2\r\n')
+
+    resp = yield from client.get('/api/camera_stats')
+    assert resp.status == 200
+    stats = yield from resp.json()
+    assert stats['camera.demo_camera']['frames'] == 2
+    assert stats['camera.demo_camera']['streams'] == 0
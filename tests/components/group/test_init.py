@@ -10,6 +10,7 @@ from homeassistant.const import (
     STATE_ON, STATE_OFF, STATE_HOME, STATE_UNKNOWN, ATTR_ICON, ATTR_HIDDEN,
     ATTR_ASSUMED_STATE, STATE_NOT_HOME, ATTR_FRIENDLY_NAME)
 import homeassistant.components.group as group
+from homeassistant.helpers.event import TRACK_STATE_CHANGE_CALLBACKS
 
 from tests.common import get_test_home_assistant, assert_setup_component
 
@@ -297,6 +298,69 @@ class TestComponentsGroup(unittest.TestCase):
             sorted(group.expand_entity_ids(self.hass,
                                            ['group.group_of_groups'])))
 
+    def test_expand_entity_ids_cached_until_members_change(self):
+        """Test the expanded members are cached until a group changes."""
+        light_group = group.Group.create_group(
+            self.hass, 'light', ['light.test_1', 'light.test_2'])
+        group.Group.create_group(
+            self.hass, 'group_of_groups', ['group.light', 'switch.test_1'])
+
+        self.assertEqual(
+            ['light.test_1', 'light.test_2', 'switch.test_1'],
+            group.expand_entity_ids(self.hass, ['group.group_of_groups']))
+
+        with patch('homeassistant.components.group._expand_entity_ids') \
+                as mock_expand:
+            self.assertEqual(
+                ['light.test_1', 'light.test_2', 'switch.test_1'],
+                group.expand_entity_ids(
+                    self.hass, ['group.group_of_groups']))
+        self.assertFalse(mock_expand.called)
+
+        # Only changes of the members drop the expansion
+        self.hass.states.set('group.light', STATE_ON, {
+            'entity_id': ['light.test_1', 'light.test_2'], 'icon': 'mdi:x'})
+        self.hass.block_till_done()
+
+        with patch('homeassistant.components.group._expand_entity_ids') \
+                as mock_expand:
+            group.expand_entity_ids(self.hass, ['group.group_of_groups'])
+        self.assertFalse(mock_expand.called)
+
+        light_group.update_tracked_entity_ids(
+            ['light.test_1', 'light.test_3'])
+        self.hass.block_till_done()
+
+        self.assertEqual(
+            ['light.test_1', 'light.test_3', 'switch.test_1'],
+            group.expand_entity_ids(self.hass, ['group.group_of_groups']))
+
+    def test_member_changes_do_not_read_all_members(self):
+        """Test the group state is updated from the changed member only."""
+        self.hass.states.set('light.bowl', STATE_ON)
+        self.hass.states.set('light.ceiling', STATE_ON)
+        test_group = group.Group.create_group(
+            self.hass, 'init_group', ['light.Bowl', 'light.Ceiling'])
+
+        with patch.object(group.Group, '_tracking_states') as mock_states:
+            self.hass.states.set('light.bowl', STATE_OFF)
+            self.hass.block_till_done()
+            self.assertEqual(
+                STATE_ON, self.hass.states.get(test_group.entity_id).state)
+
+            self.hass.states.set('light.ceiling', STATE_OFF)
+            self.hass.block_till_done()
+            self.assertEqual(
+                STATE_OFF, self.hass.states.get(test_group.entity_id).state)
+
+            self.hass.states.remove('light.ceiling')
+            self.hass.states.set('light.bowl', STATE_ON)
+            self.hass.block_till_done()
+            self.assertEqual(
+                STATE_ON, self.hass.states.get(test_group.entity_id).state)
+
+        self.assertFalse(mock_states.mock_calls)
+
     def test_set_assumed_state_based_on_tracked(self):
         """Test assumed state."""
         self.hass.states.set('light.Bowl', STATE_ON)
@@ -350,7 +414,9 @@ class TestComponentsGroup(unittest.TestCase):
 
         assert sorted(self.hass.states.entity_ids()) == \
             ['group.empty_group', 'group.second_group', 'group.test_group']
-        assert self.hass.bus.listeners['state_changed'] == 3
+        # Members are tracked by entity_id and groups by domain
+        assert self.hass.bus.listeners['state_changed'] == 2
+        assert len(self.hass.data[TRACK_STATE_CHANGE_CALLBACKS]) == 3
 
         with patch('homeassistant.config.load_yaml_config_file', return_value={
             'group': {
@@ -363,7 +429,8 @@ class TestComponentsGroup(unittest.TestCase):
             self.hass.block_till_done()
 
         assert self.hass.states.entity_ids() == ['group.hello']
-        assert self.hass.bus.listeners['state_changed'] == 1
+        assert self.hass.bus.listeners['state_changed'] == 2
+        assert len(self.hass.data[TRACK_STATE_CHANGE_CALLBACKS]) == 1
 
     def test_stopping_a_group(self):
         """Test that a group correctly removes itself."""
@@ -308,6 +308,48 @@ class TestMQTT(unittest.TestCase):
         self.assertEqual('test-topic', self.calls[0][0])
         self.assertEqual(0x9a, self.calls[0][1])
 
+    def test_subscribe_topic_subtree_wildcard_no_prefix_match(self):
+        """Test a subtree wildcard does not match a longer level."""
+        mqtt.subscribe(self.hass, 'test-topic/#', self.record_calls)
+
+        fire_mqtt_message(self.hass, 'test-topic-long/bier', 'test-payload')
+
+        self.hass.block_till_done()
+        self.assertEqual(0, len(self.calls))
+
+    def test_subscriptions_share_decoded_payload(self):
+        """Test the payload is decoded once for matching subscriptions."""
+        unsub = mqtt.subscribe(self.hass, 'test-topic/+', self.record_calls)
+        mqtt.subscribe(self.hass, 'test-topic/#', self.record_calls)
+        mqtt.subscribe(self.hass, 'test-topic/bier', self.record_calls,
+                       encoding=None)
+
+        fire_mqtt_message(self.hass, 'test-topic/bier', 'test-payload')
+        self.hass.block_till_done()
+
+        self.assertEqual(3, len(self.calls))
+        payloads = sorted((call[1] for call in self.calls), key=str)
+        self.assertEqual(b'test-payload', payloads[0])
+        self.assertEqual('test-payload', payloads[1])
+        self.assertIs(payloads[1], payloads[2])
+
+        unsub()
+        fire_mqtt_message(self.hass, 'test-topic/bier', 'test-payload')
+        self.hass.block_till_done()
+        self.assertEqual(5, len(self.calls))
+
+    def test_router_prunes_removed_topics(self):
+        """Test the topic trie drops the levels of removed subscriptions."""
+        router = mqtt.TopicRouter(self.hass)
+        unsub = router.async_subscribe('a/+/c', None)
+        router.async_subscribe('a/b', None)
+
+        self.assertEqual(1, len(router.match('a/b/c')))
+        unsub()
+        self.assertEqual([], router.match('a/b/c'))
+        self.assertEqual(1, len(router.match('a/b')))
+        self.assertEqual(['b'], list(router._root.children['a'].children))
+
     def test_receiving_non_utf8_message_gets_logged(self):
         """Test receiving a non utf8 encoded message."""
         mqtt.subscribe(self.hass, 'test-topic', self.record_calls)
@@ -316,7 +358,7 @@ class TestMQTT(unittest.TestCase):
             fire_mqtt_message(self.hass, 'test-topic', 0x9a)
             self.hass.block_till_done()
             self.assertIn(
-                "ERROR:homeassistant.components.mqtt:Illegal payload "
+                "ERROR:homeassistant.components.mqtt.router:Illegal payload "
                 "encoding utf-8 from MQTT "
                 "topic: test-topic, Payload: 154",
                 test_handle.output[0])
@@ -7,10 +7,11 @@ import pytest
 
 from homeassistant.core import callback
 from homeassistant.const import MATCH_ALL
-from homeassistant.components.recorder import Recorder
+from homeassistant.components.recorder import Recorder, PurgeTask
 from homeassistant.components.recorder.const import DATA_INSTANCE
 from homeassistant.components.recorder.util import session_scope
-from homeassistant.components.recorder.models import States, Events
+from homeassistant.components.recorder.models import (
+    States, Events, StateAttributes)
 
 from tests.common import get_test_home_assistant, init_recorder_component
 
@@ -201,3 +202,62 @@ def test_recorder_setup_failure():
         rec.join()
 
     hass.stop()
+
+
+def test_saving_state_batched(hass_recorder):
+    """Test saving states that are committed in batches."""
+    hass = hass_recorder({'commit_max_batch': 3, 'commit_max_latency': 0.1})
+    attributes = {'test_attr': 5}
+    for idx in range(10):
+        hass.states.set('test.recorder_{}'.format(idx), 'on', attributes)
+    hass.block_till_done()
+    hass.data[DATA_INSTANCE].block_till_done()
+
+    with session_scope(hass=hass) as session:
+        states = [st.to_native() for st in session.query(States)]
+        assert len(states) == 10
+        for state in states:
+            assert hass.states.get(state.entity_id) == state
+
+        assert session.query(States).filter(
+            States.event_id.is_(None)).count() == 0
+
+
+def test_saving_state_shares_attributes(hass_recorder):
+    """Test identical attributes are stored once."""
+    hass = hass_recorder()
+    states = _add_entities(hass, ['test.recorder', 'test2.recorder'])
+    hass.states.set('test.recorder', 'changed', {'other_attr': 1})
+    hass.block_till_done()
+    hass.data[DATA_INSTANCE].block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StateAttributes).count() == 2
+        db_states = list(session.query(States).order_by(States.state_id))
+        assert [db_state.attributes for db_state in db_states] == \
+            [None, None, None]
+        assert db_states[0].attributes_id == db_states[1].attributes_id
+        assert db_states[0].attributes_id != db_states[2].attributes_id
+        assert [db_state.to_native() for db_state in db_states] == \
+            states + [hass.states.get('test.recorder')]
+
+
+def test_get_batch_stops_at_tasks():
+    """Test that purge and shutdown tasks end a batch."""
+    hass = get_test_home_assistant()
+    rec = Recorder(hass, keep_days=7, purge_interval=2, uri='sqlite://',
+                   include={}, exclude={}, commit_max_batch=2)
+
+    first, second, third = object(), object(), object()
+    purge_task = PurgeTask(7)
+    for item in (second, third, purge_task, None):
+        rec.queue.put(item)
+
+    pending = []
+    assert rec._get_batch(first, pending) == [first, second]
+    assert pending == []
+    assert rec._get_batch(rec.queue.get(), pending) == [third]
+    assert pending == [purge_task]
+    assert rec.queue.get() is None
+
+    hass.stop()
@@ -1,6 +1,7 @@
 """The tests for the Recorder component."""
 import unittest
 from datetime import datetime
+from unittest.mock import patch
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
@@ -9,7 +10,8 @@ import homeassistant.core as ha
 from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.util import dt
 from homeassistant.components.recorder.models import (
-    Base, Events, States, RecorderRuns)
+    Base, Events, States, StateAttributes, RecorderRuns,
+    clear_attributes_cache, load_shared_attributes)
 
 ENGINE = None
 SESSION = None
@@ -63,6 +65,77 @@ class TestStates(unittest.TestCase):
         })
         assert state == States.from_event(event).to_native()
 
+    def test_to_native_shared_attributes(self):
+        """Test converting db state with shared attributes."""
+        session = SESSION()
+        shared = StateAttributes(shared_attrs='{"unit": "C"}')
+        session.add(shared)
+        session.flush()
+        db_state = States(entity_id='sensor.temperature', state='18',
+                          attributes_id=shared.attributes_id)
+        session.add(db_state)
+        session.flush()
+
+        state = db_state.to_native()
+        assert state == ha.State('sensor.temperature', '18', {'unit': 'C'})
+        session.rollback()
+
+    def test_shared_attributes_cache_per_engine(self):
+        """Test the decoded attributes of another database are not used."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+
+        try:
+            for unit in ('C', 'F'):
+                session = SESSION() if unit == 'C' else \
+                    sessionmaker(bind=engine)()
+                shared = StateAttributes(
+                    shared_attrs='{{"unit": "{}"}}'.format(unit))
+                session.add(shared)
+                session.flush()
+                db_state = States(entity_id='sensor.temperature', state='18',
+                                  attributes_id=shared.attributes_id)
+                session.add(db_state)
+                session.flush()
+
+                assert db_state.to_native().attributes == {'unit': unit}
+                session.rollback()
+        finally:
+            engine.dispose()
+
+    def test_load_shared_attributes_with_one_query(self):
+        """Test the shared attributes of rows are loaded at once."""
+        session = SESSION()
+        clear_attributes_cache(ENGINE)
+        db_states = []
+        for unit in ('C', 'F', 'K'):
+            shared = StateAttributes(
+                shared_attrs='{{"unit": "{}"}}'.format(unit))
+            session.add(shared)
+            session.flush()
+            db_states.append(States(
+                entity_id='sensor.temperature', state='18',
+                attributes_id=shared.attributes_id))
+        session.add_all(db_states)
+        session.flush()
+
+        with patch.object(session, 'query',
+                          wraps=session.query) as mock_query:
+            load_shared_attributes(db_states)
+            states = [db_state.to_native() for db_state in db_states]
+
+        assert mock_query.call_count == 1
+        assert [state.attributes['unit'] for state in states] == \
+            ['C', 'F', 'K']
+        session.rollback()
+
+    def test_to_native_detached_shared_attributes(self):
+        """Test converting a detached db state with shared attributes."""
+        db_state = States(entity_id='sensor.temperature', state='18',
+                          attributes_id=1)
+
+        assert db_state.to_native() is None
+
     def test_from_event_to_delete_state(self):
         """Test converting deleting state event to db state."""
         event = ha.Event(EVENT_STATE_CHANGED, {
@@ -5,9 +5,12 @@ from time import sleep
 import unittest
 
 from homeassistant.components import recorder
+import homeassistant.util.dt as dt_util
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.purge import purge_old_data
-from homeassistant.components.recorder.models import States, Events
+from homeassistant.components.recorder.purge import (
+    PurgeRun, purge_batch, purge_old_data)
+from homeassistant.components.recorder.models import (
+    States, Events, StateAttributes)
 from homeassistant.components.recorder.util import session_scope
 from tests.common import get_test_home_assistant, init_recorder_component
 
@@ -140,6 +143,81 @@ class TestRecorderPurge(unittest.TestCase):
             # now we should only have 3 events left
             self.assertEqual(events.count(), 3)
 
+    def test_purge_in_batches(self):
+        """Test purging in batches of a limited size."""
+        self._add_test_events()
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+        purge_run = PurgeRun(4)
+
+        with session_scope(hass=self.hass) as session:
+            states = session.query(States)
+            events = session.query(Events).filter(
+                Events.event_type.like("EVENT_TEST%"))
+
+            assert not purge_batch(instance, purge_run, batch_size=2)
+            self.assertEqual(purge_run.deleted['states'], 2)
+            self.assertEqual(states.count(), 4)
+
+            while not purge_batch(instance, purge_run, batch_size=2):
+                pass
+
+            self.assertEqual(purge_run.deleted['states'], 3)
+            self.assertEqual(purge_run.deleted['events'], 2)
+            self.assertGreater(purge_run.batches, 3)
+            self.assertTrue(purge_run.done)
+
+            self.assertEqual(states.count(), 3)
+            self.assertTrue('iamprotected' in (
+                state.state for state in states))
+            self.assertEqual(events.count(), 4)
+
+    def test_purge_uses_recorded_latest_state(self):
+        """Test protection uses the latest states written by the recorder."""
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+        purge_old_data(instance, 4)
+
+        # Only known from the recorder, not from scanning the table again
+        instance.latest_updated['test.rarely_updated_entity'] = \
+            datetime.now().replace(tzinfo=dt_util.UTC)
+
+        with session_scope(hass=self.hass) as session:
+            states = session.query(States)
+            purge_old_data(instance, 4)
+            self.assertEqual(states.count(), 2)
+            self.assertFalse('iamprotected' in (
+                state.state for state in states))
+
+    def test_purge_unused_attributes(self):
+        """Test deleting shared attributes no state refers to anymore."""
+        instance = self.hass.data[DATA_INSTANCE]
+
+        # The recorder shares the connection of the in memory database
+        self.hass.block_till_done()
+        instance.block_till_done()
+
+        with session_scope(hass=self.hass) as session:
+            used = StateAttributes(shared_attrs='{"used": 1}')
+            unused = StateAttributes(shared_attrs='{"unused": 1}')
+            session.add_all([used, unused])
+            session.flush()
+            session.add(States(
+                entity_id='test.recorder2', domain='test', state='on',
+                attributes_id=used.attributes_id,
+                last_updated=datetime.now()))
+            ids = [used.attributes_id, unused.attributes_id]
+
+        # Purge all batches in the recorder thread
+        instance.do_adhoc_purge(4)
+        instance.block_till_done()
+
+        with session_scope(hass=self.hass) as session:
+            attributes = session.query(StateAttributes).filter(
+                StateAttributes.attributes_id.in_(ids))
+            self.assertEqual(
+                ['{"used": 1}'], [attr.shared_attrs for attr in attributes])
+
     def test_purge_method(self):
         """Test purge method."""
         service_data = {'keep_days': 4}
@@ -0,0 +1,184 @@
+"""The tests for the recorder statistics."""
+from datetime import datetime, timedelta
+import unittest
+from unittest.mock import patch
+
+from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.components.recorder.models import States, Statistics
+from homeassistant.components.recorder.purge import purge_old_data
+from homeassistant.components.recorder.statistics import (
+    PERIOD_DAY, PERIOD_HOUR, Aggregate, aggregate_states, period_end,
+    period_start)
+from homeassistant.components.recorder.util import session_scope
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT
+from homeassistant.core import State
+import homeassistant.util.dt as dt_util
+
+from tests.common import get_test_home_assistant, init_recorder_component
+
+
+def test_period_start():
+    """Test the start of hours and local days."""
+    moment = datetime(2018, 1, 2, 3, 4, 5, tzinfo=dt_util.UTC)
+    assert period_start(PERIOD_HOUR, moment) == \
+        datetime(2018, 1, 2, 3, tzinfo=dt_util.UTC)
+
+    day = period_start(PERIOD_DAY, moment)
+    assert dt_util.as_local(day).hour == 0
+    assert day <= moment < period_end(PERIOD_DAY, day)
+
+
+def test_aggregate_states():
+    """Test only numeric states with a unit are aggregated."""
+    moment = datetime(2018, 1, 2, 3, 4, 5, tzinfo=dt_util.UTC)
+    unit = {ATTR_UNIT_OF_MEASUREMENT: 'W'}
+    states = [
+        State('sensor.power', '10', unit, moment, moment),
+        State('sensor.power', 'unknown', unit, moment, moment),
+        State('sensor.power', '20', unit, moment, moment),
+        State('sensor.power', '6', unit, moment + timedelta(hours=1),
+              moment + timedelta(hours=1)),
+        State('sensor.counter', '12', {}, moment, moment),
+    ]
+
+    aggregates = aggregate_states(states, (PERIOD_HOUR,))
+    assert len(aggregates) == 2
+
+    first = aggregates[('sensor.power', PERIOD_HOUR,
+                        period_start(PERIOD_HOUR, moment))]
+    assert (first.count, first.min, first.max, first.mean, first.last,
+            first.sum) == (2, 10, 20, 15, 20, 30)
+
+    first.merge(aggregates[('sensor.power', PERIOD_HOUR, period_start(
+        PERIOD_HOUR, moment + timedelta(hours=1)))])
+    assert (first.count, first.min, first.max, first.last, first.sum) == \
+        (3, 6, 20, 6, 36)
+
+    empty = Aggregate()
+    assert empty.mean is None
+    empty.merge(first)
+    assert (empty.count, empty.min, empty.max) == (3, 6, 20)
+
+
+class TestRecorderStatistics(unittest.TestCase):
+    """Test the statistics compiled by the recorder."""
+
+    def setUp(self):  # pylint: disable=invalid-name
+        """Setup things to be run when tests are started."""
+        self.hass = get_test_home_assistant()
+        init_recorder_component(self.hass)
+        self.hass.start()
+
+    def tearDown(self):  # pylint: disable=invalid-name
+        """Stop everything that was started."""
+        self.hass.stop()
+
+    def _set_state(self, moment, state, entity_id='sensor.power',
+                   unit='W'):
+        """Record a state at moment."""
+        attributes = {ATTR_UNIT_OF_MEASUREMENT: unit} if unit else {}
+        with patch('homeassistant.core.dt_util.utcnow',
+                   return_value=moment):
+            self.hass.states.set(entity_id, state, attributes)
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+
+    def _statistics(self, period):
+        """Return the stored statistics of a period."""
+        with session_scope(hass=self.hass) as session:
+            return [stats.to_native() for stats in session.query(Statistics)
+                    .filter_by(period=period).order_by(Statistics.start)]
+
+    def test_compile_statistics(self):
+        """Test statistics are updated with each commit."""
+        hour = period_start(PERIOD_HOUR, dt_util.utcnow())
+
+        self._set_state(hour + timedelta(minutes=1), '10')
+        self._set_state(hour + timedelta(minutes=2), '30')
+        self._set_state(hour + timedelta(minutes=3), '20')
+        self._set_state(hour + timedelta(minutes=4), 'on', 'switch.tv', None)
+        self._set_state(hour + timedelta(minutes=61), '2')
+
+        hourly = self._statistics(PERIOD_HOUR)
+        assert len(hourly) == 2
+        assert hourly[0]['start'] == hour
+        assert (hourly[0]['count'], hourly[0]['min'], hourly[0]['max'],
+                hourly[0]['mean'], hourly[0]['last'], hourly[0]['sum']) == \
+            (3, 10, 30, 20, 20, 60)
+        assert (hourly[1]['count'], hourly[1]['last']) == (1, 2)
+
+        daily = self._statistics(PERIOD_DAY)
+        assert sum(stats['count'] for stats in daily) == 4
+
+    def test_compile_statistics_single_query(self):
+        """Test the stored statistics of a commit are loaded at once."""
+        from homeassistant.components.recorder.statistics import (
+            compile_statistics)
+
+        hour = period_start(PERIOD_HOUR, dt_util.utcnow())
+        self._set_state(hour + timedelta(minutes=1), '10')
+        self._set_state(hour + timedelta(minutes=1), '5', 'sensor.energy')
+
+        states = [
+            State('sensor.power', '30', {ATTR_UNIT_OF_MEASUREMENT: 'W'},
+                  last_updated=hour + timedelta(minutes=2)),
+            State('sensor.energy', '7', {ATTR_UNIT_OF_MEASUREMENT: 'kWh'},
+                  last_updated=hour + timedelta(minutes=2)),
+        ]
+
+        with session_scope(hass=self.hass) as session, \
+                patch.object(session, 'query',
+                             wraps=session.query) as mock_query:
+            assert compile_statistics(session, states) == 4
+            assert mock_query.call_count == 1
+
+        hourly = self._statistics(PERIOD_HOUR)
+        assert sorted((stats['entity_id'], stats['count'], stats['sum'])
+                      for stats in hourly) == [
+                          ('sensor.energy', 2, 12), ('sensor.power', 2, 40)]
+
+    def test_statistics_survive_purge(self):
+        """Test purging old states keeps the statistics."""
+        old = dt_util.utcnow() - timedelta(days=10)
+
+        self._set_state(old, '10')
+        self._set_state(old + timedelta(seconds=1), '20')
+        self._set_state(dt_util.utcnow(), '30')
+
+        purge_old_data(self.hass.data[DATA_INSTANCE], 4)
+
+        with session_scope(hass=self.hass) as session:
+            assert session.query(States).count() == 1
+
+        hourly = self._statistics(PERIOD_HOUR)
+        assert [stats['count'] for stats in hourly] == [2, 1]
+        assert hourly[0]['start'] == period_start(PERIOD_HOUR, old)
+
+    def test_get_statistics(self):
+        """Test the history statistics for short and long ranges."""
+        from homeassistant.components import history
+
+        now = dt_util.utcnow()
+        hour = period_start(PERIOD_HOUR, now) - timedelta(hours=2)
+
+        self._set_state(now - timedelta(days=20), '10')
+        self._set_state(hour + timedelta(minutes=1), '20')
+        self._set_state(hour + timedelta(minutes=2), '40')
+
+        raw = history.get_statistics(self.hass, now - timedelta(hours=3), now)
+        assert len(raw['sensor.power']) == 1
+        assert raw['sensor.power'][0]['mean'] == 30
+
+        # Delete the raw states to verify long ranges use the statistics
+        with session_scope(hass=self.hass) as session:
+            session.query(States).delete()
+
+        hourly = history.get_statistics(
+            self.hass, now - timedelta(days=2), now, ['sensor.power'])
+        assert [stats['mean'] for stats in hourly['sensor.power']] == [30]
+
+        daily = history.get_statistics(
+            self.hass, now - timedelta(days=30), now)
+        assert sum(stats['count'] for stats in daily['sensor.power']) == 3
+        assert all(stats['period'] == PERIOD_DAY
+                   for stats in daily['sensor.power'])
@@ -5,6 +5,7 @@ import unittest
 from unittest.mock import patch
 
 from homeassistant.setup import setup_component
+from homeassistant.components import recorder
 from homeassistant.components.sensor.history_stats import HistoryStatsSensor
 import homeassistant.core as ha
 from homeassistant.helpers.template import Template
@@ -136,6 +137,49 @@ class TestHistoryStatsSensor(unittest.TestCase):
         self.assertEqual(sensor3.state, 2)
         self.assertEqual(sensor4.state, 50)
 
+    def test_measure_continues_after_processed_changes(self):
+        """Test updates continue the measure after the processed changes."""
+        self.init_recorder()
+        now = dt_util.utcnow()
+        entity_id = 'binary_sensor.test_id'
+        # Record the past states within the current recorder run
+        self.hass.data[recorder.DATA_INSTANCE].recording_start = \
+            now - timedelta(hours=2)
+
+        def set_state(state, moment):
+            """Record a state change at a moment."""
+            with patch('homeassistant.core.dt_util.utcnow',
+                       return_value=moment):
+                self.hass.states.set(entity_id, state)
+            self.hass.block_till_done()
+            self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        start = Template(
+            str(dt_util.as_timestamp(now - timedelta(hours=1))), self.hass)
+        # Only update the sensor explicitly
+        with patch('homeassistant.components.sensor.history_stats.'
+                   'track_state_change'):
+            sensor = HistoryStatsSensor(
+                self.hass, entity_id, 'on', start, None, timedelta(hours=2),
+                'time', 'test')
+        sensor.hass = self.hass
+
+        set_state('on', now - timedelta(minutes=40))
+        set_state('off', now - timedelta(minutes=20))
+        sensor.update()
+        self.assertEqual(sensor.count, 1)
+        self.assertAlmostEqual(sensor.value, 20 / 60)
+
+        set_state('on', now - timedelta(minutes=10))
+        sensor.update()
+        self.assertEqual(sensor.count, 2)
+        self.assertAlmostEqual(sensor.value, 30 / 60, places=2)
+
+        # No new changes, the entity is still on
+        sensor.update()
+        self.assertEqual(sensor.count, 2)
+        self.assertAlmostEqual(sensor.value, 30 / 60, places=2)
+
     def test_wrong_date(self):
         """Test when start or end value is not a timestamp or a date."""
         good = Template('{{ now() }}', self.hass)
@@ -11,6 +11,8 @@ from unittest.mock import patch
 from datetime import datetime, timedelta
 from tests.common import init_recorder_component
 from homeassistant.components import recorder
+from homeassistant.components.sensor import statistics as statistics_sensor
+from homeassistant.core import CoreState
 
 
 class TestStatisticsSensor(unittest.TestCase):
@@ -195,3 +197,42 @@ class TestStatisticsSensor(unittest.TestCase):
         # check if the result is as in test_sensor_source()
         state = self.hass.states.get('sensor.test_mean')
         self.assertEqual(str(self.mean), state.state)
+
+    def test_initialize_from_database_at_start(self):
+        """Test the sensors set up before the start share one query."""
+        init_recorder_component(self.hass)
+        for value in self.values:
+            self.hass.states.set('sensor.test_monitored', value,
+                                 {ATTR_UNIT_OF_MEASUREMENT: TEMP_CELSIUS})
+            self.hass.states.set('sensor.test_other', value * 2,
+                                 {ATTR_UNIT_OF_MEASUREMENT: TEMP_CELSIUS})
+            self.hass.block_till_done()
+        self.hass.data[recorder.DATA_INSTANCE].block_till_done()
+
+        self.hass.state = CoreState.not_running
+        with patch('homeassistant.components.sensor.statistics._load_states',
+                   wraps=statistics_sensor._load_states) as mock_load:
+            assert setup_component(self.hass, 'sensor', {
+                'sensor': [{
+                    'platform': 'statistics',
+                    'name': 'test',
+                    'entity_id': 'sensor.test_monitored',
+                    'sampling_size': 100,
+                }, {
+                    'platform': 'statistics',
+                    'name': 'other',
+                    'entity_id': 'sensor.test_other',
+                    'sampling_size': 3,
+                }]
+            })
+            self.assertEqual(0, mock_load.call_count)
+
+            self.hass.start()
+            self.hass.block_till_done()
+
+        self.assertEqual(1, mock_load.call_count)
+        state = self.hass.states.get('sensor.test_mean')
+        self.assertEqual(str(self.mean), state.state)
+        state = self.hass.states.get('sensor.other_mean')
+        self.assertEqual(
+            str(round(sum(self.values[-3:]) * 2 / 3, 2)), state.state)
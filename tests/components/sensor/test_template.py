@@ -1,4 +1,6 @@
 """The test for the Template sensor platform."""
+from unittest.mock import patch
+
 from homeassistant.setup import setup_component
 
 from tests.common import get_test_home_assistant, assert_setup_component
@@ -213,3 +215,44 @@ class TestTemplateSensor:
         self.hass.block_till_done()
 
         assert self.hass.states.all() == []
+
+    def test_template_tracks_accessed_states(self):
+        """Test the sensor is only updated when accessed states change."""
+        with assert_setup_component(1):
+            assert setup_component(self.hass, 'sensor', {
+                'sensor': {
+                    'platform': 'template',
+                    'sensors': {
+                        'test_template_sensor': {
+                            'value_template':
+                                "{% if is_state('input_boolean.all', 'on') "
+                                "%}{{ states.light | count }}{% else %}"
+                                "{{ states('light.kitchen') }}{% endif %}"
+                        }
+                    }
+                }
+            })
+
+        self.hass.start()
+        self.hass.block_till_done()
+
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.block_till_done()
+        state = self.hass.states.get('sensor.test_template_sensor')
+        assert state.state == 'on'
+
+        with patch('homeassistant.components.sensor.template.'
+                   'SensorTemplate.async_update') as mock_update:
+            self.hass.states.set('light.bedroom', 'on')
+            self.hass.block_till_done()
+            assert not mock_update.called
+
+        self.hass.states.set('input_boolean.all', 'on')
+        self.hass.block_till_done()
+        state = self.hass.states.get('sensor.test_template_sensor')
+        assert state.state == '2'
+
+        self.hass.states.set('light.hallway', 'on')
+        self.hass.block_till_done()
+        state = self.hass.states.get('sensor.test_template_sensor')
+        assert state.state == '3'
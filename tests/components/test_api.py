@@ -2,6 +2,7 @@
 # pylint: disable=protected-access
 import asyncio
 import json
+from unittest.mock import patch
 
 import pytest
 
@@ -338,6 +339,36 @@ def test_api_template_error(hass, mock_api_client):
     assert resp.status == 400
 
 
+@asyncio.coroutine
+def test_api_template_stats(hass, mock_api_client):
+    """Test the render statistics of the templates."""
+    hass.states.async_set('sensor.temperature', 10)
+
+    for _ in range(2):
+        yield from mock_api_client.post(
+            const.URL_API_TEMPLATE,
+            json={"template": '{{ states.sensor.temperature.state }}'})
+
+    resp = yield from mock_api_client.get('/api/template_stats')
+    assert resp.status == 200
+
+    stats = yield from resp.json()
+    assert [(stat['template'], stat['count']) for stat in stats] == [
+        ('{{ states.sensor.temperature.state }}', 2)]
+
+
+@asyncio.coroutine
+def test_api_poll_stats(hass, mock_api_client):
+    """Test the polling statistics of the entity components."""
+    with patch('homeassistant.components.api.async_poll_stats',
+               return_value={'light': [{'platform': 'demo', 'polls': 2}]}):
+        resp = yield from mock_api_client.get('/api/poll_stats')
+    assert resp.status == 200
+
+    stats = yield from resp.json()
+    assert stats == {'light': [{'platform': 'demo', 'polls': 2}]}
+
+
 @asyncio.coroutine
 def test_stream(hass, mock_api_client):
     """Test the stream."""
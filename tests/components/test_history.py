@@ -1,10 +1,11 @@
 """The tests the History component."""
 # pylint: disable=protected-access,invalid-name
+import asyncio
 from datetime import timedelta
 import unittest
 from unittest.mock import patch, sentinel
 
-from homeassistant.setup import setup_component
+from homeassistant.setup import async_setup_component, setup_component
 import homeassistant.core as ha
 import homeassistant.util.dt as dt_util
 from homeassistant.components import history, recorder
@@ -397,6 +398,86 @@ class TestComponentHistory(unittest.TestCase):
                     history.CONF_ENTITIES: ['media_player.test']}}})
         self.check_significant_states(zero, four, states, config)
 
+    def test_stream_significant_states(self):
+        """Test streaming the significant states per entity."""
+        zero, four, states = self.record_states()
+        one_and_half = zero + timedelta(seconds=1.5)
+        expected = history.get_significant_states(
+            self.hass, one_and_half, four, filters=history.Filters())
+        streamed = []
+
+        def write(entity_states):
+            """Collect the streamed states."""
+            streamed.append(entity_states)
+            return True
+
+        history.stream_significant_states(
+            self.hass, one_and_half, four, None, history.Filters(), True,
+            None, write)
+
+        assert len(streamed) == len(expected)
+        for entity_states in streamed:
+            assert entity_states == expected[entity_states[0].entity_id]
+
+    def test_stream_significant_states_stops(self):
+        """Test streaming stops when the writer returns False."""
+        zero, four, states = self.record_states()
+        streamed = []
+
+        def write(entity_states):
+            """Collect the first streamed states."""
+            streamed.append(entity_states)
+            return False
+
+        history.stream_significant_states(
+            self.hass, zero, four, None, history.Filters(), True, None, write)
+
+        assert len(streamed) == 1
+
+    def test_get_significant_states_max_points(self):
+        """Test downsampling of numeric series."""
+        self.init_recorder()
+        zero = dt_util.utcnow()
+
+        for i in range(10):
+            with patch('homeassistant.components.recorder.dt_util.utcnow',
+                       return_value=zero + timedelta(seconds=i + 1)):
+                self.hass.states.set('sensor.temperature', i)
+                self.hass.states.set('sensor.mode', 'mode{}'.format(i))
+                self.wait_recording_done()
+
+        hist = history.get_significant_states(
+            self.hass, zero, zero + timedelta(seconds=20),
+            filters=history.Filters(), include_start_time_state=False,
+            max_points=3)
+
+        assert len(hist['sensor.mode']) == 10
+        temperature = hist['sensor.temperature']
+        assert [state.state for state in temperature] == ['1.0', '4.0', '7.5']
+        assert [state.attributes[history.ATTR_MIN_VALUE]
+                for state in temperature] == [0, 3, 6]
+        assert [state.attributes[history.ATTR_MAX_VALUE]
+                for state in temperature] == [2, 5, 9]
+        assert temperature[1].last_updated == zero + timedelta(seconds=4)
+
+    def test_downsample_mixed_series(self):
+        """Test non-numeric states are kept when downsampling."""
+        zero = dt_util.utcnow()
+        states = [
+            ha.State('sensor.temperature',
+                     'unavailable' if i == 5 else i, {'unit': 'C'},
+                     last_updated=zero + timedelta(seconds=i))
+            for i in range(10)]
+
+        result = history.downsample(states, 3)
+
+        assert [state.state for state in result] == \
+            ['1.0', '3.5', 'unavailable', '7.5']
+        assert result[1].attributes == {
+            'unit': 'C', history.ATTR_MIN_VALUE: 3,
+            history.ATTR_MAX_VALUE: 4}
+        assert result[2] is states[5]
+
     def check_significant_states(self, zero, four, states, config): \
             # pylint: disable=no-self-use
         """Check if significant states are retrieved."""
@@ -483,3 +564,44 @@ class TestComponentHistory(unittest.TestCase):
             set_state(therm, 22, attributes={'current_temperature': 21,
                                              'hidden': True})
         return zero, four, states
+
+
+@asyncio.coroutine
+def test_history_stream_view(hass, test_client):
+    """Test the history is streamed as a JSON list of entity histories."""
+    hass.config.components.add('recorder')
+    assert (yield from async_setup_component(hass, 'history', {'history': {}}))
+    client = yield from test_client(hass.http.app)
+
+    def mock_stream(hass, start_time, end_time, entity_ids, filters,
+                    include_start_time_state, max_points, write):
+        """Stream two entity histories."""
+        assert entity_ids == ['light.kitchen', 'light.bed']
+        assert max_points == 50
+        write([ha.State('light.kitchen', 'on'),
+               ha.State('light.kitchen', 'off')])
+        write([ha.State('light.bed', 'on')])
+
+    with patch('homeassistant.components.history.stream_significant_states',
+               side_effect=mock_stream):
+        resp = yield from client.get(
+            '/api/history/stream?filter_entity_id=light.kitchen,light.bed'
+            '&max_points=50')
+        assert resp.status == 200
+        result = yield from resp.json()
+
+    assert [[state['state'] for state in states] for states in result] == \
+        [['on', 'off'], ['on']]
+
+
+@asyncio.coroutine
+def test_history_stream_view_invalid_max_points(hass, test_client):
+    """Test an invalid max_points is rejected."""
+    hass.config.components.add('recorder')
+    assert (yield from async_setup_component(hass, 'history', {'history': {}}))
+    client = yield from test_client(hass.http.app)
+
+    resp = yield from client.get('/api/history/stream?max_points=0')
+    assert resp.status == 400
+    resp = yield from client.get('/api/history/period?max_points=abc')
+    assert resp.status == 400
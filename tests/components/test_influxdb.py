@@ -1,15 +1,11 @@
 """The tests for the InfluxDB component."""
+import os
 import unittest
 import datetime
 from unittest import mock
 
-from datetime import timedelta
-from unittest.mock import MagicMock
-
 import influxdb as influx_client
 
-from homeassistant.util import dt as dt_util
-from homeassistant import core as ha
 from homeassistant.setup import setup_component
 import homeassistant.components.influxdb as influxdb
 from homeassistant.const import EVENT_STATE_CHANGED, STATE_OFF, STATE_ON, \
@@ -31,6 +27,9 @@ class TestInfluxDB(unittest.TestCase):
     def tearDown(self):
         """Clear data."""
         self.hass.stop()
+        spool_path = self.hass.config.path(influxdb.SPOOL_FILE)
+        if os.path.isfile(spool_path):
+            os.remove(spool_path)
 
     def test_setup_config_full(self, mock_client):
         """Test the setup with full configuration."""
@@ -169,6 +168,8 @@ class TestInfluxDB(unittest.TestCase):
                 body[0]['fields']['value'] = out[1]
 
             self.handler_method(event)
+
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -203,6 +204,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -223,6 +225,7 @@ class TestInfluxDB(unittest.TestCase):
         mock_client.return_value.write_points.side_effect = \
             influx_client.exceptions.InfluxDBClientError('foo')
         self.handler_method(event)
+        self.hass.data[influxdb.DOMAIN].block_till_done()
 
     def test_event_listener_states(self, mock_client):
         """Test the event listener against ignored states."""
@@ -245,6 +248,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             if state_state == 1:
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -278,6 +282,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -312,6 +317,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             if domain == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -356,6 +362,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == 'included':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -401,6 +408,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             if domain == 'fake':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -456,6 +464,8 @@ class TestInfluxDB(unittest.TestCase):
                 body[0]['fields']['value'] = out[1]
 
             self.handler_method(event)
+
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -498,6 +508,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             if entity_id == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -543,6 +554,7 @@ class TestInfluxDB(unittest.TestCase):
             },
         }]
         self.handler_method(event)
+        self.hass.data[influxdb.DOMAIN].block_till_done()
         self.assertEqual(
             mock_client.return_value.write_points.call_count, 1
         )
@@ -588,6 +600,7 @@ class TestInfluxDB(unittest.TestCase):
             },
         }]
         self.handler_method(event)
+        self.hass.data[influxdb.DOMAIN].block_till_done()
         self.assertEqual(
             mock_client.return_value.write_points.call_count, 1
         )
@@ -648,6 +661,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self.hass.data[influxdb.DOMAIN].block_till_done()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -657,9 +671,10 @@ class TestInfluxDB(unittest.TestCase):
             )
             mock_client.return_value.write_points.reset_mock()
 
-    def test_scheduled_write(self, mock_client):
-        """Test the event listener to retry after write failures."""
-        self._setup(max_retries=1)
+    def test_spool_write_during_outage(self, mock_client):
+        """Test points are spooled while the database is not reachable."""
+        self._setup()
+        writer = self.hass.data[influxdb.DOMAIN]
 
         state = mock.MagicMock(
             state=1, domain='fake', entity_id='entity.id', object_id='entity',
@@ -668,152 +683,66 @@ class TestInfluxDB(unittest.TestCase):
         mock_client.return_value.write_points.side_effect = \
             IOError('foo')
 
-        start = dt_util.utcnow()
-
         self.handler_method(event)
+        writer.block_till_done()
         json_data = mock_client.return_value.write_points.call_args[0][0]
         self.assertEqual(mock_client.return_value.write_points.call_count, 1)
+        self.assertEqual(writer.points_spooled, 1)
+        self.assertTrue(os.path.isfile(writer.spool_path))
 
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
-        self.hass.block_till_done()
-        self.assertEqual(mock_client.return_value.write_points.call_count, 2)
-        mock_client.return_value.write_points.assert_called_with(json_data)
+        # No writes until the retry delay passed
+        self.handler_method(event)
+        writer.block_till_done()
+        self.assertEqual(mock_client.return_value.write_points.call_count, 1)
+        self.assertEqual(writer.points_spooled, 2)
 
-        shifted_time = shifted_time + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
-        self.hass.block_till_done()
-        self.assertEqual(mock_client.return_value.write_points.call_count, 2)
+        mock_client.return_value.write_points.side_effect = None
+        writer.retry_delay = 0
+        writer._retry_at = 0
 
+        self.handler_method(event)
+        writer.block_till_done()
+        self.assertEqual(mock_client.return_value.write_points.call_args_list,
+                         [mock.call(json_data)] * 4)
+        self.assertEqual(writer.points_spooled, 0)
+        self.assertEqual(writer.points_flushed, 3)
+        self.assertFalse(os.path.isfile(writer.spool_path))
+
+    def test_spool_limit(self, mock_client):
+        """Test points are dropped when the spool is full."""
+        self._setup(spool_limit=1)
+        writer = self.hass.data[influxdb.DOMAIN]
+
+        state = mock.MagicMock(
+            state=1, domain='fake', entity_id='entity.id', object_id='entity',
+            attributes={})
+        event = mock.MagicMock(data={'new_state': state}, time_fired=12345)
+        mock_client.return_value.write_points.side_effect = \
+            IOError('foo')
 
-class TestRetryOnErrorDecorator(unittest.TestCase):
-    """Test the RetryOnError decorator."""
+        self.handler_method(event)
+        writer.block_till_done()
+        self.handler_method(event)
+        writer.block_till_done()
+        self.assertEqual(writer.points_spooled, 1)
+        self.assertEqual(writer.points_dropped, 1)
 
-    def setUp(self):
-        """Setup things to be run when tests are started."""
-        self.hass = get_test_home_assistant()
+    def test_writes_queued_points_in_batch(self, mock_client):
+        """Test points queued while writing are written in one batch."""
+        self._setup()
+        writer = self.hass.data[influxdb.DOMAIN]
 
-    def tearDown(self):
-        """Clear data."""
-        self.hass.stop()
+        with writer.queue.mutex:
+            # Queue the points before the writer can get any of them
+            for _ in range(3):
+                writer.queue.queue.append(
+                    {'measurement': 'test', 'fields': {'value': 1}})
+                writer.queue.unfinished_tasks += 1
+            writer.queue.not_empty.notify()
 
-    def test_no_retry(self):
-        """Test that it does not retry if configured."""
-        mock_method = MagicMock()
-        wrapped = influxdb.RetryOnError(self.hass)(mock_method)
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        mock_method.side_effect = Exception()
-        self.assertRaises(Exception, wrapped, 1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 2)
-        mock_method.assert_called_with(1, 2, test=3)
-
-    def test_single_retry(self):
-        """Test that retry stops after a single try if configured."""
-        mock_method = MagicMock()
-        retryer = influxdb.RetryOnError(self.hass, retry_limit=1)
-        wrapped = retryer(mock_method)
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        start = dt_util.utcnow()
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
-        self.hass.block_till_done()
-        self.assertEqual(mock_method.call_count, 1)
-
-        mock_method.side_effect = Exception()
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 2)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        for cnt in range(3):
-            start = dt_util.utcnow()
-            shifted_time = start + (timedelta(seconds=20 + 1))
-            self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                               {ha.ATTR_NOW: shifted_time})
-            self.hass.block_till_done()
-            self.assertEqual(mock_method.call_count, 3)
-            mock_method.assert_called_with(1, 2, test=3)
-
-    def test_multi_retry(self):
-        """Test that multiple retries work."""
-        mock_method = MagicMock()
-        retryer = influxdb.RetryOnError(self.hass, retry_limit=4)
-        wrapped = retryer(mock_method)
-        mock_method.side_effect = Exception()
-
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-
-        for cnt in range(3):
-            start = dt_util.utcnow()
-            shifted_time = start + (timedelta(seconds=20 + 1))
-            self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                               {ha.ATTR_NOW: shifted_time})
-            self.hass.block_till_done()
-            self.assertEqual(mock_method.call_count, cnt + 2)
-            mock_method.assert_called_with(1, 2, test=3)
-
-    def test_max_queue(self):
-        """Test the maximum queue length."""
-        # make a wrapped method
-        mock_method = MagicMock()
-        retryer = influxdb.RetryOnError(
-            self.hass, retry_limit=4, queue_limit=3)
-        wrapped = retryer(mock_method)
-        mock_method.side_effect = Exception()
-
-        # call it once, call fails, queue fills to 1
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 1)
-        mock_method.assert_called_with(1, 2, test=3)
-        self.assertEqual(len(wrapped._retry_queue), 1)
-
-        # two more calls that failed. queue is 3
-        wrapped(1, 2, test=3)
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 3)
-        self.assertEqual(len(wrapped._retry_queue), 3)
-
-        # another call, queue gets limited to 3
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 4)
-        self.assertEqual(len(wrapped._retry_queue), 3)
-
-        # time passes
-        start = dt_util.utcnow()
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
-        self.hass.block_till_done()
-
-        # only the three queued calls where repeated
-        self.assertEqual(mock_method.call_count, 7)
-        self.assertEqual(len(wrapped._retry_queue), 3)
-
-        # another call, queue stays limited
-        wrapped(1, 2, test=3)
-        self.assertEqual(mock_method.call_count, 8)
-        self.assertEqual(len(wrapped._retry_queue), 3)
-
-        # disable the side effect
-        mock_method.side_effect = None
-
-        # time passes, all calls should succeed
-        start = dt_util.utcnow()
-        shifted_time = start + (timedelta(seconds=20 + 1))
-        self.hass.bus.fire(ha.EVENT_TIME_CHANGED,
-                           {ha.ATTR_NOW: shifted_time})
-        self.hass.block_till_done()
-
-        # three queued calls succeeded, queue empty.
-        self.assertEqual(mock_method.call_count, 11)
-        self.assertEqual(len(wrapped._retry_queue), 0)
+        writer.block_till_done()
+        self.assertEqual(mock_client.return_value.write_points.call_count, 1)
+        self.assertEqual(
+            len(mock_client.return_value.write_points.call_args[0][0]), 3)
+        self.assertEqual(writer.points_flushed, 3)
+        self.assertIsNotNone(writer.flush_latency)
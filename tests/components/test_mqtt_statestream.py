@@ -157,6 +157,49 @@ class TestMqttStateStream(object):
         mock_pub.assert_has_calls(calls, any_order=True)
         assert mock_pub.called
 
+    @patch('homeassistant.components.mqtt.async_publish')
+    @patch('homeassistant.core.dt_util.utcnow')
+    def test_state_changed_attr_sends_changed_only(self, mock_utcnow,
+                                                   mock_pub):
+        """"Test only the changed attributes are published again."""
+        e_id = 'fake.entity'
+
+        assert self.add_statestream(base_topic='pub',
+                                    publish_attributes=True)
+        self.hass.block_till_done()
+        mock_pub.reset_mock()
+
+        old_state = State(e_id, 'off', {'testing': 'YES', 'count': 1})
+        new_state = State(e_id, 'off', {'testing': 'YES', 'count': 2})
+        mock_state_change_event(self.hass, new_state, old_state)
+        self.hass.block_till_done()
+
+        assert mock_pub.mock_calls == [
+            call(self.hass, 'pub/fake/entity/state', 'off', 1, True),
+            call(self.hass, 'pub/fake/entity/count', '2', 1, True),
+        ]
+
+    @patch('homeassistant.components.mqtt.async_publish')
+    @patch('homeassistant.core.dt_util.utcnow')
+    def test_state_changed_attr_clears_removed(self, mock_utcnow, mock_pub):
+        """"Test the retained messages of removed attributes are cleared."""
+        e_id = 'fake.entity'
+
+        assert self.add_statestream(base_topic='pub',
+                                    publish_attributes=True)
+        self.hass.block_till_done()
+        mock_pub.reset_mock()
+
+        old_state = State(e_id, 'off', {'testing': 'YES', 'count': 1})
+        new_state = State(e_id, 'off', {'testing': 'YES'})
+        mock_state_change_event(self.hass, new_state, old_state)
+        self.hass.block_till_done()
+
+        assert mock_pub.mock_calls == [
+            call(self.hass, 'pub/fake/entity/state', 'off', 1, True),
+            call(self.hass, 'pub/fake/entity/count', '', 1, True),
+        ]
+
     @patch('homeassistant.components.mqtt.async_publish')
     @patch('homeassistant.core.dt_util.utcnow')
     def test_state_changed_event_include_domain(self, mock_utcnow, mock_pub):
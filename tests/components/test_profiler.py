@@ -0,0 +1,159 @@
+"""The tests for the profiler component."""
+import asyncio
+import os
+from unittest.mock import patch
+
+from homeassistant.components import profiler
+from homeassistant.core import callback
+from homeassistant.setup import async_setup_component
+
+from tests.common import mock_http_component_app
+
+
+@asyncio.coroutine
+def async_setup_profiler(hass):
+    """Set up the profiler with a mocked HTTP component."""
+    app = mock_http_component_app(hass)
+    assert (yield from async_setup_component(hass, profiler.DOMAIN, {
+        profiler.DOMAIN: {profiler.CONF_BUFFER_SIZE: 50}}))
+    hass.http.views[profiler.ProfilerView.name].register(app.router)
+    return app
+
+
+@asyncio.coroutine
+def test_records_jobs_and_events(hass):
+    """Test jobs and event fan-out are only recorded while profiling."""
+    yield from async_setup_profiler(hass)
+    prof = hass.data[profiler.DATA_PROFILER]
+
+    @callback
+    def listener(event):
+        """Listen to the test event."""
+        pass
+
+    @asyncio.coroutine
+    def coro_listener(event):
+        """Listen to the test event with a coroutine."""
+        yield from asyncio.sleep(0, loop=hass.loop)
+
+    def executor_listener(event):
+        """Listen to the test event in the executor."""
+        pass
+
+    @callback
+    def state_listener(entity_id, old_state, new_state):
+        """Listen to state changes of the test entity."""
+        pass
+
+    for func in (listener, coro_listener, executor_listener):
+        hass.bus.async_listen('test_event', func)
+    hass.helpers.event.async_track_state_change('test.entity', state_listener)
+
+    hass.bus.async_fire('test_event')
+    yield from hass.async_block_till_done()
+    assert not prof.jobs
+
+    yield from hass.services.async_call(
+        profiler.DOMAIN, profiler.SERVICE_START, blocking=True)
+    assert prof.running
+
+    hass.bus.async_fire('test_event')
+    hass.bus.async_fire('test_event')
+    hass.states.async_set('test.entity', 'on')
+    yield from hass.async_block_till_done()
+
+    yield from hass.services.async_call(
+        profiler.DOMAIN, profiler.SERVICE_STOP, blocking=True)
+    assert not prof.running
+    assert 'async_add_job' not in vars(hass)
+    assert 'async_run_job' not in vars(hass)
+    assert 'async_fire' not in vars(hass.bus)
+
+    stats = prof.async_as_dict()
+    jobs = {job['name'].rsplit('.', 1)[-1]: job for job in stats['jobs']}
+    assert jobs['listener']['count'] == 2
+    assert jobs['coro_listener']['count'] == 2
+    assert jobs['executor_listener']['count'] == 2
+    assert jobs['state_listener']['count'] == 1
+    assert stats['events']['test_event'] == {'fired': 2, 'listeners': 6}
+    assert len(stats['records']) == len(prof.records)
+
+    recorded = len(prof.records)
+    hass.bus.async_fire('test_event')
+    yield from hass.async_block_till_done()
+    assert len(prof.records) == recorded
+
+
+@asyncio.coroutine
+def test_coroutine_exceptions_are_raised(hass):
+    """Test timed coroutines pass on results and exceptions."""
+    yield from async_setup_profiler(hass)
+    prof = hass.data[profiler.DATA_PROFILER]
+    prof.async_start()
+
+    @asyncio.coroutine
+    def failing():
+        """Fail after a suspension."""
+        yield from asyncio.sleep(0, loop=hass.loop)
+        raise ValueError()
+
+    @asyncio.coroutine
+    def succeeding():
+        """Return a value."""
+        yield from asyncio.sleep(0, loop=hass.loop)
+        return 42
+
+    task = hass.async_add_job(failing())
+    yield from asyncio.wait([task], loop=hass.loop)
+    assert isinstance(task.exception(), ValueError)
+
+    assert (yield from hass.async_add_job(succeeding)) == 42
+    prof.async_stop()
+
+    assert len(prof.jobs) == 2
+
+
+@asyncio.coroutine
+def test_loop_lag_and_cprofile(hass):
+    """Test the loop lag is measured and cProfile statistics are saved."""
+    yield from async_setup_profiler(hass)
+    prof = hass.data[profiler.DATA_PROFILER]
+
+    with patch('homeassistant.components.profiler.LAG_INTERVAL', 0):
+        yield from hass.services.async_call(
+            profiler.DOMAIN, profiler.SERVICE_START, {'cprofile': True},
+            blocking=True)
+        yield from asyncio.sleep(0.01, loop=hass.loop)
+
+    with patch('cProfile.Profile.dump_stats') as mock_dump:
+        yield from hass.services.async_call(
+            profiler.DOMAIN, profiler.SERVICE_STOP, blocking=True)
+
+    assert any(record[1] == profiler.KIND_LOOP_LAG
+               for record in prof.records)
+    assert prof.max_loop_lag >= 0
+    assert len(mock_dump.mock_calls) == 1
+    path = mock_dump.mock_calls[0][1][0]
+    assert os.path.dirname(path) == hass.config.config_dir
+    assert os.path.basename(path).startswith('profiler_')
+
+
+@asyncio.coroutine
+def test_profiler_view(hass, test_client):
+    """Test the profiler statistics are served over HTTP."""
+    app = yield from async_setup_profiler(hass)
+    hass.data[profiler.DATA_PROFILER].async_start()
+    yield from hass.async_add_job(lambda: None)
+
+    client = yield from test_client(app)
+
+    resp = yield from client.get('/api/profiler', params={'records': 1})
+    assert resp.status == 200
+    data = yield from resp.json()
+    assert data['running']
+    assert len(data['records']) == 1
+
+    resp = yield from client.get('/api/profiler', params={'records': 'x'})
+    assert resp.status == 400
+
+    hass.data[profiler.DATA_PROFILER].async_stop()
@@ -333,3 +333,113 @@ def test_pending_msg_overflow(hass, mock_low_queue, websocket_client):
         })
     msg = yield from websocket_client.receive()
     assert msg.type == WSMsgType.close
+
+
+@asyncio.coroutine
+def test_subscriptions_share_listener_and_serialization(
+        hass, websocket_client):
+    """Test subscriptions share one listener and serialized event."""
+    init_count = sum(hass.bus.async_listeners().values())
+
+    for iden in (5, 6):
+        websocket_client.send_json({
+            'id': iden,
+            'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+            'event_type': 'test_event'
+        })
+        msg = yield from websocket_client.receive_json()
+        assert msg['success']
+
+    assert sum(hass.bus.async_listeners().values()) == init_count + 1
+
+    with patch.object(wapi, 'JSON_DUMP', wraps=wapi.JSON_DUMP) as mock_dump:
+        hass.bus.async_fire('test_event', {'hello': 'world'})
+
+        msgs = []
+        with timeout(3, loop=hass.loop):
+            for _ in range(2):
+                msgs.append((yield from websocket_client.receive_json()))
+
+    assert mock_dump.call_count == 1
+    assert sorted(msg['id'] for msg in msgs) == [5, 6]
+    for msg in msgs:
+        assert msg['type'] == wapi.TYPE_EVENT
+        assert msg['event']['data'] == {'hello': 'world'}
+
+
+@asyncio.coroutine
+def test_get_subscription_stats(hass, websocket_client):
+    """Test get_subscription_stats command."""
+    websocket_client.send_json({
+        'id': 5,
+        'type': wapi.TYPE_GET_SUBSCRIPTION_STATS,
+    })
+
+    msg = yield from websocket_client.receive_json()
+    assert msg['id'] == 5
+    assert msg['type'] == wapi.TYPE_RESULT
+    assert msg['success']
+    assert msg['result'] == []
+
+    websocket_client.send_json({
+        'id': 6,
+        'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+        'event_type': 'test_event'
+    })
+    msg = yield from websocket_client.receive_json()
+    assert msg['success']
+
+    websocket_client.send_json({
+        'id': 7,
+        'type': wapi.TYPE_GET_SUBSCRIPTION_STATS,
+    })
+
+    msg = yield from websocket_client.receive_json()
+    assert msg['id'] == 7
+    assert msg['success']
+    assert len(msg['result']) == 1
+    assert sorted(msg['result'][0]) == [
+        'dropped', 'max_pending', 'pending', 'sent']
+    assert msg['result'][0]['dropped'] == 0
+
+
+def test_slow_client_drops_events(hass, mock_low_queue):
+    """Test events are dropped and counted for clients not keeping up."""
+    conn = wapi.ActiveConnection(hass, None)
+
+    with patch.object(conn, 'cancel') as mock_cancel:
+        for _ in range(5 + 3):
+            conn.send_event_outside('event')
+
+        assert conn.stats() == {
+            'pending': 3,
+            'max_pending': 3,
+            'sent': 0,
+            'dropped': 5,
+        }
+        assert not mock_cancel.called
+
+        conn.send_event_outside('event')
+
+        assert mock_cancel.called
+
+
+def test_slow_client_gets_command_replies(hass, mock_low_queue):
+    """Test commands are answered while events are dropped."""
+    conn = wapi.ActiveConnection(hass, None)
+
+    with patch.object(conn, 'cancel') as mock_cancel:
+        for _ in range(5):
+            conn.send_event_outside('event')
+        assert conn.dropped_count == 2
+
+        conn.handle_ping({'id': 5, 'type': wapi.TYPE_PING})
+        conn.handle_get_subscription_stats({
+            'id': 6, 'type': wapi.TYPE_GET_SUBSCRIPTION_STATS})
+
+    assert not mock_cancel.called
+    assert conn.to_write.qsize() == 5
+    for _ in range(3):
+        assert conn.to_write.get_nowait() == 'event'
+    assert conn.to_write.get_nowait()['type'] == wapi.TYPE_PONG
+    assert conn.to_write.get_nowait()['id'] == 6
@@ -1,7 +1,9 @@
 """The tests for the TTS component."""
 import ctypes
+import json
 import os
 import shutil
+import time
 from unittest.mock import patch, PropertyMock
 
 import pytest
@@ -13,7 +15,9 @@ from homeassistant.components.tts.demo import DemoProvider
 from homeassistant.components.media_player import (
     SERVICE_PLAY_MEDIA, MEDIA_TYPE_MUSIC, ATTR_MEDIA_CONTENT_ID,
     ATTR_MEDIA_CONTENT_TYPE, DOMAIN as DOMAIN_MP)
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.setup import setup_component
+from homeassistant.util.async import run_callback_threadsafe
 
 from tests.common import (
     get_test_home_assistant, get_test_instance_port, assert_setup_component,
@@ -43,11 +47,12 @@ class TestTTS(object):
 
     def teardown_method(self):
         """Stop everything that was started."""
+        # Stopping writes the index into the cache dir
+        self.hass.stop()
+
         if os.path.isdir(self.default_tts_cache):
             shutil.rmtree(self.default_tts_cache)
 
-        self.hass.stop()
-
     def test_setup_component_demo(self):
         """Setup the demo platform with defaults."""
         config = {
@@ -562,3 +567,215 @@ class TestTTS(object):
         req = requests.get(url)
         assert req.status_code == 200
         assert req.content == demo_data
+
+    def test_setup_component_load_cache_from_index(self):
+        """Setup component and load the file cache from the index."""
+        _, demo_data = self.demo_provider.get_tts_audio("bla", 'en')
+        filename = "265944c108cbb00b2a621be5930513e03a0bb2cd_en_-_demo.mp3"
+
+        os.mkdir(self.default_tts_cache)
+        with open(os.path.join(self.default_tts_cache, filename),
+                  "wb") as voice_file:
+            voice_file.write(demo_data)
+        with open(os.path.join(self.default_tts_cache, tts.INDEX_FILENAME),
+                  "w") as index_file:
+            json.dump({'version': tts.INDEX_VERSION, 'files': {
+                "265944c108cbb00b2a621be5930513e03a0bb2cd_en_-_demo":
+                    [filename, len(demo_data), time.time()],
+            }}, index_file)
+
+        config = {
+            tts.DOMAIN: {
+                'platform': 'demo',
+            }
+        }
+
+        with patch('os.listdir') as mock_listdir, \
+                assert_setup_component(1, tts.DOMAIN):
+            setup_component(self.hass, tts.DOMAIN, config)
+
+        assert not mock_listdir.called
+
+        self.hass.start()
+
+        url = "{}/api/tts_proxy/{}".format(
+            self.hass.config.api.base_url, filename)
+
+        req = requests.get(url)
+        assert req.status_code == 200
+        assert req.content == demo_data
+
+    def test_setup_component_index_older_than_cache_dir(self):
+        """Setup component and list files added after the index."""
+        filename = "265944c108cbb00b2a621be5930513e03a0bb2cd_en_-_demo.mp3"
+        index_path = os.path.join(self.default_tts_cache, tts.INDEX_FILENAME)
+
+        os.mkdir(self.default_tts_cache)
+        with open(index_path, "w") as index_file:
+            json.dump({'version': tts.INDEX_VERSION, 'files': {}}, index_file)
+        os.utime(index_path, (time.time() - 60, time.time() - 60))
+
+        with open(os.path.join(self.default_tts_cache, filename),
+                  "wb") as voice_file:
+            voice_file.write(b'voice')
+
+        config = {
+            tts.DOMAIN: {
+                'platform': 'demo',
+                'cache_max_size': 1,
+            }
+        }
+
+        # The unindexed file counts towards the size of the cache
+        with assert_setup_component(1, tts.DOMAIN), \
+                patch('homeassistant.components.tts.MEGABYTE', 4):
+            setup_component(self.hass, tts.DOMAIN, config)
+        self.hass.block_till_done()
+
+        assert not os.path.isfile(
+            os.path.join(self.default_tts_cache, filename))
+
+    def test_setup_component_write_index(self):
+        """Setup component without index and write it at stop."""
+        _, demo_data = self.demo_provider.get_tts_audio("bla", 'en')
+        filename = "265944c108cbb00b2a621be5930513e03a0bb2cd_en_-_demo.mp3"
+
+        os.mkdir(self.default_tts_cache)
+        with open(os.path.join(self.default_tts_cache, filename),
+                  "wb") as voice_file:
+            voice_file.write(demo_data)
+
+        config = {
+            tts.DOMAIN: {
+                'platform': 'demo',
+            }
+        }
+
+        with assert_setup_component(1, tts.DOMAIN):
+            setup_component(self.hass, tts.DOMAIN, config)
+
+        self.hass.bus.fire(EVENT_HOMEASSISTANT_STOP)
+        self.hass.block_till_done()
+
+        with open(os.path.join(self.default_tts_cache,
+                               tts.INDEX_FILENAME)) as index_file:
+            index = json.load(index_file)
+
+        assert index['version'] == tts.INDEX_VERSION
+        assert index['files'] == {
+            "265944c108cbb00b2a621be5930513e03a0bb2cd_en_-_demo":
+                [filename, len(demo_data), os.path.getmtime(
+                    os.path.join(self.default_tts_cache, filename))],
+        }
+
+    def test_setup_component_remove_old_cache_files(self):
+        """Setup component and remove the files older than the max age."""
+        filename = "265944c108cbb00b2a621be5930513e03a0bb2cd_en_-_demo.mp3"
+        cache_file = os.path.join(self.default_tts_cache, filename)
+
+        os.mkdir(self.default_tts_cache)
+        with open(cache_file, "wb") as voice_file:
+            voice_file.write(b'voice')
+
+        last_used = time.time() - 2 * 86400
+        os.utime(cache_file, (last_used, last_used))
+
+        config = {
+            tts.DOMAIN: {
+                'platform': 'demo',
+                'cache_max_age': 1,
+            }
+        }
+
+        with assert_setup_component(1, tts.DOMAIN):
+            setup_component(self.hass, tts.DOMAIN, config)
+        self.hass.block_till_done()
+
+        assert not os.path.isfile(cache_file)
+
+    def test_memory_cache_removes_least_recently_used(self):
+        """Test the memory cache stays within its size."""
+        manager = tts.SpeechManager(self.hass)
+        manager.memory_size = 10
+
+        def store(key, data):
+            """Store a voice in the memory cache."""
+            run_callback_threadsafe(
+                self.hass.loop, manager._async_store_to_memcache, key,
+                key + '.mp3', data).result()
+
+        store('first', b'1234')
+        store('second', b'1234')
+        manager.mem_cache.move_to_end('first')
+        store('third', b'1234')
+
+        assert list(manager.mem_cache) == ['first', 'third']
+        assert manager.mem_cache_size == 8
+
+        # A voice larger than the cache replaces all other voices
+        store('large', b'12345678901')
+
+        assert list(manager.mem_cache) == ['large']
+        assert manager.mem_cache_size == 11
+
+    def test_file_cache_removes_least_recently_used(self):
+        """Test the file cache stays within its size."""
+        calls = mock_service(self.hass, DOMAIN_MP, SERVICE_PLAY_MEDIA)
+        _, demo_data = self.demo_provider.get_tts_audio("bla", 'en')
+
+        config = {
+            tts.DOMAIN: {
+                'platform': 'demo',
+                'cache_max_size': 1,
+            }
+        }
+
+        with assert_setup_component(1, tts.DOMAIN), \
+                patch('homeassistant.components.tts.MEGABYTE',
+                      len(demo_data)):
+            setup_component(self.hass, tts.DOMAIN, config)
+
+        self.hass.services.call(tts.DOMAIN, 'demo_say', {
+            tts.ATTR_MESSAGE: "I person is on front of your door.",
+        })
+        self.hass.block_till_done()
+        self.hass.services.call(tts.DOMAIN, 'demo_say', {
+            tts.ATTR_MESSAGE: "There is someone at the door.",
+        })
+        self.hass.block_till_done()
+
+        assert len(calls) == 2
+        assert os.listdir(self.default_tts_cache) == [
+            "{}_en_-_demo.mp3".format(
+                calls[1].data[ATTR_MEDIA_CONTENT_ID].split('/')[-1][:40])]
+
+    def test_cache_view_counts_hits_and_misses(self):
+        """Test the cache statistics are served over HTTP."""
+        mock_service(self.hass, DOMAIN_MP, SERVICE_PLAY_MEDIA)
+
+        config = {
+            tts.DOMAIN: {
+                'platform': 'demo',
+            }
+        }
+
+        with assert_setup_component(1, tts.DOMAIN):
+            setup_component(self.hass, tts.DOMAIN, config)
+
+        self.hass.start()
+
+        for _ in range(2):
+            self.hass.services.call(tts.DOMAIN, 'demo_say', {
+                tts.ATTR_MESSAGE: "I person is on front of your door.",
+            }, blocking=True)
+
+        req = requests.get(
+            "{}/api/tts_cache".format(self.hass.config.api.base_url))
+        assert req.status_code == 200
+
+        info = req.json()
+        assert info[tts.STAT_MISSES] == 1
+        assert info[tts.STAT_MEMORY_HITS] == 1
+        assert info[tts.STAT_DISK_HITS] == 0
+        assert info['memory_entries'] == 1
+        assert info['disk_entries'] == 1
@@ -7,8 +7,10 @@ import unittest
 from unittest.mock import patch, MagicMock
 
 from homeassistant.bootstrap import async_setup_component
-from homeassistant.const import ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_START
+from homeassistant.const import (
+    ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_START, EVENT_SERVICE_EXECUTED)
 from homeassistant.components import zwave
+from homeassistant.core import callback
 from homeassistant.components.binary_sensor.zwave import get_device
 from homeassistant.components.zwave import (
     const, CONFIG_SCHEMA, CONF_DEVICE_CONFIG_GLOB, DATA_NETWORK)
@@ -313,6 +315,54 @@ def test_value_discovery_existing_entity(hass, mock_openzwave):
         'current_temperature'] == 23.5
 
 
+@asyncio.coroutine
+def test_value_discovery_checks_only_pending_values_of_node(
+        hass, mock_openzwave):
+    """Test new values are only checked against entities of their node."""
+    mock_receivers = []
+
+    def mock_connect(receiver, signal, *args, **kwargs):
+        if signal == MockNetwork.SIGNAL_VALUE_ADDED:
+            mock_receivers.append(receiver)
+
+    with patch('pydispatch.dispatcher.connect', new=mock_connect):
+        yield from async_setup_component(hass, 'zwave', {'zwave': {
+            'new_entity_ids': True,
+            }})
+
+    node = MockNode(node_id=11, generic=const.GENERIC_TYPE_THERMOSTAT)
+    setpoint = MockValue(
+        data=22.0, node=node, index=12, instance=13,
+        command_class=const.COMMAND_CLASS_THERMOSTAT_SETPOINT,
+        genre=const.GENRE_USER, units='C')
+    hass.async_add_job(mock_receivers[0], node, setpoint)
+    yield from hass.async_block_till_done()
+
+    entity_values = hass.data[const.DATA_ENTITY_VALUES]
+    assert len(entity_values) == 1
+    assert const.COMMAND_CLASS_SENSOR_MULTILEVEL in \
+        entity_values[0].missing_command_classes()
+
+    other_node = MockNode(node_id=12)
+    other_values = [MockValue(
+        data=1, node=other_node, index=idx, instance=13,
+        command_class=const.COMMAND_CLASS_SENSOR_MULTILEVEL,
+        genre=const.GENRE_USER) for idx in range(3)]
+
+    with patch.object(zwave.ZWaveDeviceEntityValues, 'check_value') \
+            as mock_check, \
+            patch.object(zwave, 'check_node_schema') as mock_node_schema:
+        mock_node_schema.return_value = False
+        for value in other_values:
+            hass.async_add_job(mock_receivers[0], other_node, value)
+        yield from hass.async_block_till_done()
+
+        assert not mock_check.called
+        # Only the schemas for sensor multilevel primary values are tested
+        assert 0 < len(mock_node_schema.mock_calls) < \
+            len(zwave.DISCOVERY_SCHEMAS) * len(other_values)
+
+
 @asyncio.coroutine
 def test_power_schemes(hass, mock_openzwave):
     """Test power attribute."""
@@ -492,6 +542,8 @@ class TestZWaveDeviceEntityValues(unittest.TestCase):
                          sorted([self.primary, None, None],
                                 key=lambda a: id(a)))
         assert not discovery.async_load_platform.called
+        assert values.missing_command_classes() == {
+            'mock_secondary_class', 'mock_optional_class'}
 
         values.check_value(self.secondary)
         self.hass.block_till_done()
@@ -847,15 +899,22 @@ class TestZWaveServices(unittest.TestCase):
 
     def test_stop_network(self):
         """Test zwave stop_network service."""
-        with patch.object(self.hass.bus, 'fire') as mock_fire:
-            self.hass.services.call('zwave', 'stop_network', {})
-            self.hass.block_till_done()
+        events = []
+
+        @callback
+        def listener(event):
+            """Record the fired events."""
+            events.append(event.event_type)
+
+        self.hass.bus.listen(const.EVENT_NETWORK_STOP, listener)
+        self.hass.bus.listen(EVENT_SERVICE_EXECUTED, listener)
+
+        self.hass.services.call('zwave', 'stop_network', {})
+        self.hass.block_till_done()
 
-            assert self.zwave_network.stop.called
-            assert len(self.zwave_network.stop.mock_calls) == 1
-            assert mock_fire.called
-            assert len(mock_fire.mock_calls) == 2
-            assert mock_fire.mock_calls[0][1][0] == const.EVENT_NETWORK_STOP
+        assert self.zwave_network.stop.called
+        assert len(self.zwave_network.stop.mock_calls) == 1
+        assert events == [const.EVENT_NETWORK_STOP, EVENT_SERVICE_EXECUTED]
 
     def test_rename_node(self):
         """Test zwave rename_node service."""
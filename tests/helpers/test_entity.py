@@ -231,6 +231,107 @@ def test_async_schedule_update_ha_state(hass):
     assert update_call is True
 
 
+@asyncio.coroutine
+def test_update_ha_state_skips_unchanged(hass):
+    """Test the state is only written when something changed."""
+    class PlainEntity(entity.Entity):
+        """Entity with plain attributes instead of properties."""
+
+        hidden = False
+        force_update = False
+        state_attributes = None
+
+    ent = PlainEntity()
+    ent.hass = hass
+    ent.entity_id = 'test.plain'
+    ent.state_attributes = attributes = {'brightness': 100}
+
+    with patch.object(hass.states, 'async_set',
+                      wraps=hass.states.async_set) as mock_set:
+        yield from ent.async_update_ha_state()
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 1
+
+        # Attributes changed in place by the entity
+        attributes['brightness'] = 200
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 2
+        assert hass.states.get(ent.entity_id).attributes['brightness'] == 200
+
+        ent.hidden = True
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 3
+
+        # The state was removed by someone else
+        hass.states.async_remove(ent.entity_id)
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 4
+
+        ent.force_update = True
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 5
+
+
+@asyncio.coroutine
+def test_update_ha_state_skips_unchanged_version(hass):
+    """Test the state is not read while the state version is unchanged."""
+    reads = []
+
+    class VersionedEntity(entity.Entity):
+        """Entity with a state version."""
+
+        state_version = 1
+
+        @property
+        def state(self):
+            """Return the state."""
+            reads.append(1)
+            return 'on'
+
+    ent = VersionedEntity()
+    ent.hass = hass
+    ent.entity_id = 'test.versioned'
+
+    with patch.object(hass.states, 'async_set',
+                      wraps=hass.states.async_set) as mock_set:
+        yield from ent.async_update_ha_state()
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 1
+        assert len(reads) == 1
+
+        ent.state_version = 2
+        yield from ent.async_update_ha_state()
+        assert len(mock_set.mock_calls) == 2
+        assert len(reads) == 2
+
+
+@asyncio.coroutine
+def test_async_schedule_update_ha_state_coalesced(hass):
+    """Test forced refreshes are coalesced until the scheduled one starts."""
+    updates = []
+
+    @asyncio.coroutine
+    def async_update():
+        """Mock async update."""
+        updates.append(1)
+
+    mock_entity = entity.Entity()
+    mock_entity.hass = hass
+    mock_entity.entity_id = 'comp_test.test_entity'
+    mock_entity.async_update = async_update
+
+    mock_entity.async_schedule_update_ha_state(True)
+    mock_entity.async_schedule_update_ha_state(True)
+    yield from hass.async_block_till_done()
+
+    assert len(updates) == 1
+
+    mock_entity.async_schedule_update_ha_state(True)
+    yield from hass.async_block_till_done()
+
+    assert len(updates) == 2
+
+
 @asyncio.coroutine
 def test_async_pararell_updates_with_zero(hass):
     """Test pararell updates with 0 (disabled)."""
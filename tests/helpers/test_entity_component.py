@@ -2,11 +2,14 @@
 # pylint: disable=protected-access
 import asyncio
 from collections import OrderedDict
+from functools import partial
 import logging
 import unittest
 from unittest.mock import patch, Mock, MagicMock
 from datetime import timedelta
 
+import pytest
+
 import homeassistant.core as ha
 import homeassistant.loader as loader
 from homeassistant.exceptions import PlatformNotReady
@@ -28,6 +31,26 @@ _LOGGER = logging.getLogger(__name__)
 DOMAIN = "test_domain"
 
 
+@pytest.fixture
+def no_poll_jitter():
+    """Poll the entities at the start of their slots."""
+    with patch.object(entity_component, 'POLL_JITTER', 0):
+        yield
+
+
+def scheduled_polls(mock_call_later):
+    """Return the delay, target and args of polls scheduled with call_later."""
+    return [call[0] for call in mock_call_later.call_args_list
+            if getattr(call[0][1], '__name__', None) == '_async_poll']
+
+
+def run_scheduled_polls(hass, mock_call_later):
+    """Run the polls scheduled with a mocked call_later."""
+    for _, target, *args in scheduled_polls(mock_call_later):
+        hass.add_job(target, *args)
+    hass.block_till_done()
+
+
 class EntityTest(Entity):
     """Test for the Entity component."""
 
@@ -158,8 +181,11 @@ class TestHelpersEntityComponent(unittest.TestCase):
         update_ok.clear()
         update_err.clear()
 
-        fire_time_changed(self.hass, dt_util.utcnow() + timedelta(seconds=20))
-        self.hass.block_till_done()
+        with patch.object(self.hass.loop, 'call_later') as mock_call_later:
+            fire_time_changed(
+                self.hass, dt_util.utcnow() + timedelta(seconds=20))
+            self.hass.block_till_done()
+        run_scheduled_polls(self.hass, mock_call_later)
 
         assert len(update_ok) == 3
         assert len(update_err) == 1
@@ -671,3 +697,260 @@ def test_raise_error_on_update(hass):
 
     assert len(updates) == 1
     assert 1 in updates
+
+
+@asyncio.coroutine
+def test_polls_spread_over_scan_interval(hass, no_poll_jitter):
+    """Test the polls of the entities are spread over the scan interval."""
+    component = EntityComponent(
+        _LOGGER, DOMAIN, hass, timedelta(seconds=20))
+    updates = []
+    entities = []
+
+    for idx in range(4):
+        ent = EntityTest(should_poll=True)
+        ent.update = partial(updates.append, idx)
+        entities.append(ent)
+
+    yield from component.async_add_entities(entities)
+
+    with patch.object(hass.loop, 'call_later') as mock_call_later:
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=20))
+        yield from hass.async_block_till_done()
+
+    assert len(updates) == 1
+    polls = scheduled_polls(mock_call_later)
+    assert [poll[0] for poll in polls] == [5, 10, 15]
+
+    for _, target, *args in polls:
+        target(*args)
+    yield from hass.async_block_till_done()
+    assert sorted(updates) == [0, 1, 2, 3]
+
+    stats = component.async_poll_stats()
+    assert len(stats) == 1
+    assert stats[0]['cycles'] == 1
+    assert stats[0]['polls'] == 4
+    assert stats[0]['scan_interval'] == 20
+    assert entity_component.async_poll_stats(hass) == {DOMAIN: stats}
+
+
+@asyncio.coroutine
+def test_polling_forgets_removed_entities(hass):
+    """Test the poll states of entities no longer polled are dropped."""
+    component = EntityComponent(
+        _LOGGER, DOMAIN, hass, timedelta(seconds=20))
+    ent1 = EntityTest(should_poll=True)
+    ent2 = EntityTest(should_poll=True)
+    yield from component.async_add_entities([ent1, ent2])
+    platform = component._platforms['core']
+
+    with patch.object(hass.loop, 'call_later') as mock_call_later:
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=20))
+        yield from hass.async_block_till_done()
+    assert set(platform._poll_states) == {ent1.entity_id, ent2.entity_id}
+
+    platform.platform_entities.remove(ent2)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=40))
+    yield from hass.async_block_till_done()
+
+    assert set(platform._poll_states) == {ent1.entity_id}
+    assert mock_call_later.return_value.cancel.called
+
+
+@asyncio.coroutine
+def test_polling_backs_off_after_failures(hass):
+    """Test entities failing to update are polled less often."""
+    component = EntityComponent(
+        _LOGGER, DOMAIN, hass, timedelta(seconds=10))
+    updates = []
+    fail = True
+
+    @asyncio.coroutine
+    def async_update():
+        """Mock a failing update."""
+        updates.append(1)
+        if fail:
+            raise AssertionError("Fake error update")
+
+    ent = EntityTest(should_poll=True)
+    ent.async_update = async_update
+    yield from component.async_add_entities([ent])
+
+    now = dt_util.utcnow()
+    polled = []
+    for cycle in range(1, 8):
+        if cycle == 6:
+            fail = False
+        now += timedelta(seconds=10)
+        async_fire_time_changed(hass, now)
+        yield from hass.async_block_till_done()
+        polled.append(len(updates))
+
+    # Skip one cycle after the first failure and two after the second
+    assert polled == [1, 1, 2, 2, 2, 3, 4]
+
+    stats = component.async_poll_stats()[0]
+    assert stats['failures'] == 2
+    assert stats['backed_off'] == 3
+
+
+@asyncio.coroutine
+def test_polling_skips_entities_still_updating(hass):
+    """Test an entity is not polled again while its poll is running."""
+    component = EntityComponent(
+        _LOGGER, DOMAIN, hass, timedelta(seconds=10))
+    started = asyncio.Event(loop=hass.loop)
+    release = asyncio.Event(loop=hass.loop)
+    updates = []
+
+    @asyncio.coroutine
+    def async_slow_update():
+        """Mock an update that blocks until released."""
+        updates.append(1)
+        started.set()
+        yield from release.wait()
+
+    slow_ent = EntityTest(should_poll=True)
+    slow_ent.async_update = async_slow_update
+    yield from component.async_add_entities([slow_ent])
+
+    now = dt_util.utcnow() + timedelta(seconds=10)
+    async_fire_time_changed(hass, now)
+    yield from started.wait()
+
+    async_fire_time_changed(hass, now + timedelta(seconds=10))
+    yield from asyncio.sleep(0, loop=hass.loop)
+
+    release.set()
+    yield from hass.async_block_till_done()
+
+    assert len(updates) == 1
+    stats = component.async_poll_stats()[0]
+    assert stats['cycles'] == 2
+    assert stats['overruns'] == 1
+
+
+@asyncio.coroutine
+def async_setup_test_platform(hass, platform, entities):
+    """Set up a component with a test platform adding entities."""
+    @asyncio.coroutine
+    def async_setup_platform(hass, config, async_add_devices,
+                             discovery_info=None):
+        """Add the entities."""
+        async_add_devices(entities)
+
+    platform.async_setup_platform = async_setup_platform
+    loader.set_component('test_domain.platform', platform)
+
+    component = EntityComponent(_LOGGER, DOMAIN, hass)
+    yield from component.async_setup({
+        DOMAIN: {
+            'platform': 'platform',
+        }
+    })
+    yield from hass.async_block_till_done()
+    return component
+
+
+@asyncio.coroutine
+def test_entity_service_calls_are_bounded_per_platform(hass):
+    """Test the entities of a platform are called concurrently."""
+    platform = MockPlatform()
+    platform.PARALLEL_UPDATES = 2
+    running = []
+    max_running = 0
+    release = asyncio.Event(loop=hass.loop)
+
+    @asyncio.coroutine
+    def async_turn_on(**kwargs):
+        """Mock a slow turn on."""
+        nonlocal max_running
+        running.append(kwargs)
+        max_running = max(max_running, len(running))
+        yield from release.wait()
+        running.pop()
+
+    entities = [EntityTest(name='test_{}'.format(idx), should_poll=False)
+                for idx in range(5)]
+    for entity in entities:
+        entity.async_turn_on = async_turn_on
+    entities[0]._values['should_poll'] = True
+    entities[0].async_update = Mock(return_value=mock_coro())
+
+    component = yield from async_setup_test_platform(hass, platform, entities)
+
+    task = hass.async_add_job(component.async_call_entity_service(
+        entities, 'async_turn_on', {'brightness': 100}))
+    for _ in range(5):
+        yield from asyncio.sleep(0, loop=hass.loop)
+    running_before_release = list(running)
+
+    release.set()
+    yield from task
+
+    assert running_before_release == [{'brightness': 100}] * 2
+
+    assert max_running == 2
+    assert not running
+    assert len(entities[0].async_update.mock_calls) == 1
+
+
+@asyncio.coroutine
+def test_entity_service_calls_batch_hook(hass):
+    """Test a platform can handle all its entities with one call."""
+    platform = MockPlatform()
+    batches = []
+
+    @asyncio.coroutine
+    def async_turn_on_many(hass, entities, **kwargs):
+        """Turn on all entities at once."""
+        batches.append((entities, kwargs))
+
+    platform.async_turn_on_many = async_turn_on_many
+    entities = [EntityTest(name='test_{}'.format(idx), should_poll=False)
+                for idx in range(3)]
+    for entity in entities:
+        entity.async_turn_on = Mock()
+
+    component = yield from async_setup_test_platform(hass, platform, entities)
+
+    core_entity = EntityTest(name='core', should_poll=False)
+    core_entity.async_turn_on = Mock(return_value=mock_coro())
+    yield from component.async_add_entities([core_entity])
+
+    yield from component.async_call_entity_service(
+        entities + [core_entity], 'async_turn_on', {'brightness': 100})
+
+    assert batches == [(entities, {'brightness': 100})]
+    assert not any(entity.async_turn_on.called for entity in entities)
+    assert core_entity.async_turn_on.mock_calls[0][2] == {'brightness': 100}
+
+
+@asyncio.coroutine
+def test_entity_service_calls_raise_after_all_entities(hass):
+    """Test an error is raised once all entities are called."""
+    component = EntityComponent(_LOGGER, DOMAIN, hass)
+    calls = []
+
+    @asyncio.coroutine
+    def async_fail():
+        """Mock a failing call."""
+        raise ValueError()
+
+    @asyncio.coroutine
+    def async_succeed():
+        """Mock a successful call."""
+        calls.append(1)
+
+    entities = [EntityTest(name='fail', should_poll=False),
+                EntityTest(name='succeed', should_poll=False)]
+    entities[0].async_turn_off = async_fail
+    entities[1].async_turn_off = async_succeed
+    yield from component.async_add_entities(entities)
+
+    with pytest.raises(ValueError):
+        yield from component.async_call_entity_service(
+            entities, 'async_turn_off')
+
+    assert calls == [1]
@@ -11,11 +11,13 @@ from homeassistant.setup import setup_component
 import homeassistant.core as ha
 from homeassistant.const import MATCH_ALL
 from homeassistant.helpers.event import (
+    TRACK_STATE_CHANGE_CALLBACKS,
     track_point_in_utc_time,
     track_point_in_time,
     track_utc_time_change,
     track_time_change,
     track_state_change,
+    track_state_change_domains,
     track_time_interval,
     track_template,
     track_same_state,
@@ -82,6 +84,38 @@ class TestEventHelpers(unittest.TestCase):
         self.hass.block_till_done()
         self.assertEqual(2, len(runs))
 
+    def test_track_point_in_time_scheduler(self):
+        """Test point in time trackers share one ordered time listener."""
+        start = datetime(2017, 10, 10, 15, 0, 0, tzinfo=dt_util.UTC)
+        runs = []
+
+        for offset in (3, 1, 2, 1):
+            track_point_in_utc_time(
+                self.hass, ha.callback(
+                    lambda now, offset=offset: runs.append(offset)),
+                start + timedelta(seconds=offset))
+
+        unsub = track_point_in_utc_time(
+            self.hass, lambda now: runs.append('cancelled'),
+            start + timedelta(seconds=1))
+
+        self.assertEqual(1, self.hass.bus.listeners['time_changed'])
+
+        unsub()
+        self._send_time_changed(start)
+        self.hass.block_till_done()
+        self.assertEqual([], runs)
+
+        self._send_time_changed(start + timedelta(seconds=2))
+        self.hass.block_till_done()
+        self.assertEqual([1, 1, 2], runs)
+
+        # A clock jump forward runs all actions that are overdue
+        self._send_time_changed(start + timedelta(hours=1))
+        self.hass.block_till_done()
+        self.assertEqual([1, 1, 2, 3], runs)
+        self.assertIsNone(self.hass.bus.listeners.get('time_changed'))
+
     def test_track_time_change(self):
         """Test tracking time change."""
         wildcard_runs = []
@@ -193,6 +227,75 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(5, len(wildcard_runs))
         self.assertEqual(6, len(wildercard_runs))
 
+    def test_track_state_change_shares_listener(self):
+        """Test entity trackers share one indexed state_changed listener."""
+        kitchen_runs = []
+        bowl_runs = []
+
+        @ha.callback
+        def kitchen_callback(entity_id, old_state, new_state):
+            kitchen_runs.append(entity_id)
+
+        @ha.callback
+        def bowl_callback(entity_id, old_state, new_state):
+            bowl_runs.append(entity_id)
+
+        unsub_kitchen = track_state_change(
+            self.hass, ['light.Kitchen', 'switch.kitchen'], kitchen_callback)
+        unsub_bowl = track_state_change(
+            self.hass, 'light.bowl', bowl_callback)
+
+        self.assertEqual(1, self.hass.bus.listeners['state_changed'])
+        self.assertEqual(
+            ['light.bowl', 'light.kitchen', 'switch.kitchen'],
+            sorted(self.hass.data[TRACK_STATE_CHANGE_CALLBACKS]))
+
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.states.set('switch.kitchen', 'on')
+        self.hass.states.set('light.bowl', 'on')
+        self.hass.states.set('light.hallway', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['light.kitchen', 'switch.kitchen'], kitchen_runs)
+        self.assertEqual(['light.bowl'], bowl_runs)
+
+        unsub_kitchen()
+        self.assertEqual(
+            ['light.bowl'],
+            list(self.hass.data[TRACK_STATE_CHANGE_CALLBACKS]))
+
+        self.hass.states.set('light.kitchen', 'off')
+        self.hass.block_till_done()
+        self.assertEqual(2, len(kitchen_runs))
+
+        unsub_bowl()
+        self.assertIsNone(self.hass.bus.listeners.get('state_changed'))
+
+    def test_track_state_change_domains(self):
+        """Test tracking the state changes of the entities of domains."""
+        events = []
+
+        @ha.callback
+        def domain_callback(event):
+            events.append(event)
+
+        unsub = track_state_change_domains(
+            self.hass, ['Light', 'switch'], domain_callback)
+
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.states.set('switch.kitchen', 'on')
+        self.hass.states.set('sensor.kitchen', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(
+            ['light.kitchen', 'switch.kitchen'],
+            [event.data['entity_id'] for event in events])
+        self.assertEqual('on', events[0].data['new_state'].state)
+
+        unsub()
+        self.hass.states.set('light.kitchen', 'off')
+        self.hass.block_till_done()
+        self.assertEqual(2, len(events))
+        self.assertIsNone(self.hass.bus.listeners.get('state_changed'))
+
     def test_track_template(self):
         """Test tracking template."""
         specific_runs = []
@@ -264,6 +367,44 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(2, len(wildcard_runs))
         self.assertEqual(2, len(wildercard_runs))
 
+    def test_track_template_accessed_states(self):
+        """Test templates are only rendered when accessed states change."""
+        runs = []
+        tpl = Template(
+            "{{ is_state('input_boolean.switch', 'on') and "
+            "states.sensor | selectattr('state', 'eq', 'high') | list | "
+            "count > 0 }}", self.hass)
+
+        self.hass.states.set('input_boolean.switch', 'off')
+        self.hass.states.set('sensor.level', 'high')
+        self.hass.block_till_done()
+
+        with patch.object(tpl, 'async_render_to_info',
+                          wraps=tpl.async_render_to_info) as mock_render:
+            track_template(
+                self.hass, tpl, lambda *args: runs.append(args))
+            assert len(mock_render.mock_calls) == 1
+
+            # Sensors are not accessed while the switch is off
+            self.hass.states.set('sensor.level', 'low')
+            self.hass.states.set('light.other', 'on')
+            self.hass.block_till_done()
+            assert len(mock_render.mock_calls) == 1
+
+            self.hass.states.set('input_boolean.switch', 'on')
+            self.hass.block_till_done()
+            assert len(mock_render.mock_calls) == 2
+            assert not runs
+
+            self.hass.states.set('sensor.level', 'high')
+            self.hass.block_till_done()
+            assert len(mock_render.mock_calls) == 3
+            assert len(runs) == 1
+
+            self.hass.states.set('light.other', 'off')
+            self.hass.block_till_done()
+            assert len(mock_render.mock_calls) == 3
+
     def test_track_same_state_simple_trigger(self):
         """Test track_same_change with trigger simple."""
         thread_runs = []
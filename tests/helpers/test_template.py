@@ -849,3 +849,61 @@ def test_length_of_states(hass):
 
     tpl = template.Template('{{ states.sensor | length }}', hass)
     assert tpl.async_render() == '2'
+
+
+@asyncio.coroutine
+def test_render_to_info_collects_accessed_states(hass):
+    """Test the states accessed while rendering are recorded."""
+    hass.states.async_set('light.kitchen', 'on')
+    hass.states.async_set('sensor.temperature', '21')
+
+    info = template.Template(
+        "{{ is_state('light.kitchen', 'on') and "
+        "states.sensor.temperature.state }}", hass).async_render_to_info()
+    assert info.result == '21'
+    assert info.entities == {'light.kitchen', 'sensor.temperature'}
+    assert not info.domains
+    assert not info.all_states
+
+    # Only the states accessed by the taken branch are recorded
+    info = template.Template(
+        "{{ is_state('light.kitchen', 'off') and "
+        "states.sensor.temperature.state }}", hass).async_render_to_info()
+    assert info.entities == {'light.kitchen'}
+
+    info = template.Template(
+        "{{ states.sensor | length }}", hass).async_render_to_info()
+    assert info.domains == {'sensor'}
+
+    info = template.Template(
+        "{% for state in states %}{{ state.state }}{% endfor %}",
+        hass).async_render_to_info()
+    assert info.all_states
+
+    info = template.Template(
+        "{{ states.sensor.missing.state }}", hass).async_render_to_info()
+    assert info.result == ''
+    assert info.entities == {'sensor.missing'}
+
+    info = template.Template(
+        "{{ states.sensor.missing.state | is_defined }}",
+        hass).async_render_to_info()
+    assert isinstance(info.exception, TemplateError)
+    assert info.entities == {'sensor.missing'}
+
+
+@asyncio.coroutine
+def test_templates_share_compiled_code_and_stats(hass):
+    """Test identical templates share the compiled template."""
+    tpl1 = template.Template('{{ 1 + 1 }}', hass)
+    tpl2 = template.Template('{{ 1 + 1 }}', hass)
+
+    assert tpl1.async_render() == '2'
+    assert tpl2.async_render() == '2'
+    assert tpl1._compiled is tpl2._compiled
+
+    template.Template('{{ 2 + 2 }}', hass).async_render()
+
+    stats = {stat['template']: stat['count']
+             for stat in template.async_render_stats(hass)}
+    assert stats == {'{{ 1 + 1 }}': 2, '{{ 2 + 2 }}': 1}
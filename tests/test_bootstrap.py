@@ -6,10 +6,11 @@ from unittest.mock import Mock, patch
 import logging
 
 import homeassistant.config as config_util
-from homeassistant import bootstrap
+from homeassistant import bootstrap, loader
 import homeassistant.util.dt as dt_util
 
-from tests.common import patch_yaml_files, get_test_config_dir
+from tests.common import (
+    patch_yaml_files, get_test_config_dir, MockModule, MockPlatform)
 
 ORIG_TIMEZONE = dt_util.DEFAULT_TIME_ZONE
 VERSION_PATH = os.path.join(get_test_config_dir(), config_util.VERSION_FILE)
@@ -52,3 +53,34 @@ def test_home_assistant_core_config_validation(hass):
         }
     }, hass)
     assert result is None
+
+
+@asyncio.coroutine
+def test_preload_components(hass):
+    """Test configured platforms and dependencies are imported ahead."""
+    loader.set_component('comp_a', MockModule('comp_a', ['comp_b']))
+    loader.set_component('comp_b', MockModule('comp_b'))
+    loader.set_component(
+        'comp_a.plat', MockPlatform(dependencies=['comp_missing']))
+
+    preload = loader.preload_component
+
+    with patch('homeassistant.loader.preload_component',
+               side_effect=preload) as mock_preload:
+        yield from bootstrap.async_preload_components(hass, {
+            'comp_a': {'platform': 'plat'},
+            'comp_a 2': [{'platform': 'plat'}, {'no_platform': True}],
+        }, ['comp_a'])
+
+    assert sorted(args[0] for args, _ in mock_preload.call_args_list) == \
+        ['comp_a', 'comp_a.plat', 'comp_b', 'comp_missing']
+
+
+def test_log_setup_times(hass, caplog):
+    """Test the setup times are logged slowest first."""
+    caplog.set_level(logging.INFO)
+    hass.data[bootstrap.DATA_SETUP_TIME] = {'fast': 0.5, 'slow': 2}
+
+    bootstrap.async_log_setup_times(hass)
+
+    assert '2.00s  slow\n    0.50s  fast' in caplog.text
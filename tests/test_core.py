@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from tempfile import TemporaryDirectory
 
 import pytz
+import voluptuous as vol
 import pytest
 
 import homeassistant.core as ha
@@ -20,7 +21,8 @@ from homeassistant.util.unit_system import (METRIC_SYSTEM)
 from homeassistant.const import (
     __version__, EVENT_STATE_CHANGED, ATTR_FRIENDLY_NAME, CONF_UNIT_SYSTEM,
     ATTR_NOW, EVENT_TIME_CHANGED, EVENT_HOMEASSISTANT_STOP,
-    EVENT_HOMEASSISTANT_CLOSE, EVENT_SERVICE_REGISTERED, EVENT_SERVICE_REMOVED)
+    EVENT_HOMEASSISTANT_CLOSE, EVENT_SERVICE_REGISTERED, EVENT_SERVICE_REMOVED,
+    EVENT_CALL_SERVICE, EVENT_SERVICE_EXECUTED, ATTR_SERVICE_CALL_ID)
 
 from tests.common import get_test_home_assistant
 
@@ -453,6 +455,18 @@ class TestState(unittest.TestCase):
         state = ha.State('domain.hello', 'world', {'some': 'attr'})
         self.assertEqual(state, ha.State.from_dict(state.as_dict()))
 
+    def test_attributes_diff(self):
+        """Test the changed and removed attributes of a state."""
+        old = ha.State('domain.hello', 'world', {'a': 1, 'b': 2, 'c': 3})
+        new = ha.State('domain.hello', 'world', {'a': 1, 'b': 5, 'd': 4})
+
+        self.assertEqual(({'b': 5, 'd': 4}, ['c']), new.attributes_diff(old))
+        self.assertEqual(({'a': 1, 'b': 5, 'd': 4}, []),
+                         new.attributes_diff(None))
+
+        same = ha.State('domain.hello', 'moon', new.attributes)
+        self.assertEqual(({}, []), same.attributes_diff(new))
+
     def test_dict_conversion_with_wrong_data(self):
         """Test conversion with wrong data."""
         self.assertIsNone(ha.State.from_dict(None))
@@ -511,6 +525,34 @@ class TestStateMachine(unittest.TestCase):
         states = sorted(state.entity_id for state in self.states.all())
         self.assertEqual(['light.bowl', 'switch.ac'], states)
 
+    def test_domain_index(self):
+        """Test the domain index is kept up to date."""
+        self.states.set('light.Kitchen', 'on')
+        self.states.set('light.bowl', 'off')
+
+        self.assertEqual(
+            ['light.bowl', 'light.kitchen'],
+            sorted(state.entity_id for state
+                   in self.hass.states.async_all('Light')))
+        self.assertEqual(
+            'off', self.states.get('light.bowl').state)
+        self.assertEqual(
+            ['light.bowl', 'light.kitchen'],
+            self.hass.states.async_sorted_entity_ids('light'))
+        self.assertEqual(
+            ['light.bowl', 'light.kitchen', 'switch.ac'],
+            self.hass.states.async_sorted_entity_ids())
+
+        self.states.remove('light.bowl')
+        self.states.remove('switch.ac')
+
+        self.assertEqual(
+            ['light.kitchen'], self.hass.states.async_entity_ids('light'))
+        self.assertEqual([], self.hass.states.async_entity_ids('switch'))
+        self.assertEqual(
+            ['light.kitchen'], self.hass.states.async_sorted_entity_ids())
+        self.assertEqual([], self.hass.states.async_all('switch'))
+
     def test_remove(self):
         """Test remove method."""
         events = []
@@ -585,6 +627,22 @@ class TestStateMachine(unittest.TestCase):
         self.hass.block_till_done()
         self.assertEqual(1, len(events))
 
+    def test_unchanged_attributes_are_shared(self):
+        """Test states share unchanged attributes."""
+        self.states.set('light.bowl', 'on', {'brightness': 100})
+        old_state = self.states.get('light.bowl')
+
+        self.states.set('light.bowl', 'off', {'brightness': 100})
+        new_state = self.states.get('light.bowl')
+
+        self.assertIsNot(old_state, new_state)
+        self.assertIs(old_state.attributes, new_state.attributes)
+        self.assertIs(old_state.entity_id, new_state.entity_id)
+
+        self.states.set('light.bowl', 'off', {'brightness': 50})
+        self.assertEqual(
+            {'brightness': 50}, self.states.get('light.bowl').attributes)
+
 
 class TestServiceCall(unittest.TestCase):
     """Test ServiceCall class."""
@@ -673,6 +731,85 @@ class TestServiceRegistry(unittest.TestCase):
         finally:
             ha.SERVICE_CALL_LIMIT = prior
 
+    def test_call_with_result(self):
+        """Test the result of a blocking call is passed to the caller."""
+        @ha.callback
+        def failing_handler(call):
+            """Service handler that raises."""
+            raise ValueError('failed')
+
+        def executor_handler(call):
+            """Service handler running in the executor."""
+            pass
+
+        self.services.register('test_domain', 'fail', failing_handler)
+        self.services.register('test_domain', 'executor', executor_handler)
+        executed = []
+
+        @ha.callback
+        def service_executed(event):
+            """Record the executed events."""
+            executed.append(event)
+
+        self.hass.bus.listen(EVENT_SERVICE_EXECUTED, service_executed)
+
+        result = run_coroutine_threadsafe(
+            self.services.async_call_with_result('test_domain', 'fail'),
+            self.hass.loop).result()
+        assert not result.success
+        assert isinstance(result.exception, ValueError)
+        assert result.duration >= 0
+
+        assert not self.services.call('test_domain', 'fail', blocking=True)
+
+        result = run_coroutine_threadsafe(
+            self.services.async_call_with_result('test_domain', 'executor'),
+            self.hass.loop).result()
+        assert result.success
+        self.hass.block_till_done()
+
+        # Observers still get the executed event of successful calls
+        assert [event.data[ATTR_SERVICE_CALL_ID] for event in executed] == \
+            [result.call_id]
+        assert not self.services._pending_calls
+
+    def test_call_with_invalid_data(self):
+        """Test a blocking call with invalid data counts as executed."""
+        calls = []
+
+        @ha.callback
+        def service_handler(call):
+            """Service handler."""
+            calls.append(call)
+
+        self.services.register(
+            'test_domain', 'validated', service_handler,
+            schema=vol.Schema({vol.Required('value'): int}))
+
+        assert self.services.call('test_domain', 'validated',
+                                  {'value': 'abc'}, blocking=True)
+        assert not calls
+
+        result = run_coroutine_threadsafe(
+            self.services.async_call_with_result(
+                'test_domain', 'validated', {'value': 'abc'}),
+            self.hass.loop).result()
+        assert isinstance(result.exception, vol.Invalid)
+
+    def test_call_resolved_by_executed_event(self):
+        """Test a call executed by another instance is resolved."""
+        @ha.callback
+        def remote_executor(event):
+            """Execute the service like a remote instance."""
+            self.hass.bus.async_fire(
+                EVENT_SERVICE_EXECUTED,
+                {ATTR_SERVICE_CALL_ID: event.data[ATTR_SERVICE_CALL_ID]},
+                ha.EventOrigin.remote)
+
+        self.hass.bus.listen(EVENT_CALL_SERVICE, remote_executor)
+
+        assert self.services.call('remote_domain', 'service', blocking=True)
+
     def test_async_service(self):
         """Test registering and calling an async service."""
         calls = []
@@ -203,6 +203,23 @@ class TestSetup:
         assert not setup.setup_component(self.hass, 'comp')
         assert 'comp' not in self.hass.config.components
 
+    @mock.patch('homeassistant.util.package.install_package',
+                return_value=True)
+    def test_cached_requirements_are_not_installed(self, mock_install):
+        """Test requirements known to be met are skipped."""
+        self.hass.config.skip_pip = False
+        self.hass.data[setup.DATA_REQUIREMENTS] = {'package==0.0.1'}
+        loader.set_component(
+            'comp', MockModule('comp', requirements=[
+                'package==0.0.1', 'other==0.0.2']))
+
+        assert setup.setup_component(self.hass, 'comp')
+        assert mock_install.call_count == 1
+        assert mock_install.call_args[0][0] == 'other==0.0.2'
+        assert self.hass.data[setup.DATA_REQUIREMENTS] == \
+            {'package==0.0.1', 'other==0.0.2'}
+        assert 'comp' in self.hass.data[setup.DATA_SETUP_TIME]
+
     @mock.patch('homeassistant.setup.os.path.dirname')
     @mock.patch('homeassistant.util.package.running_under_virtualenv',
                 return_value=True)
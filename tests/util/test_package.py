@@ -201,6 +201,19 @@ def test_check_package_zip():
     assert not package.check_package_exists(TEST_ZIP_REQ)
 
 
+def test_requirements_cache(tmpdir):
+    """Test the cache is discarded when the environment changes."""
+    path = str(tmpdir.join('requirements.json'))
+    assert package.load_requirements_cache(path) == set()
+
+    package.save_requirements_cache(path, {TEST_NEW_REQ})
+    assert package.load_requirements_cache(path) == {TEST_NEW_REQ}
+
+    with patch('homeassistant.util.package.environment_fingerprint',
+               return_value='changed'):
+        assert package.load_requirements_cache(path) == set()
+
+
 def test_get_user_site(deps_dir, lib_dir, mock_popen, mock_env_copy):
     """Test get user site directory."""
     env = mock_env_copy()
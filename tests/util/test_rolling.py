@@ -0,0 +1,62 @@
+"""Test Home Assistant rolling window util methods."""
+from datetime import datetime, timedelta
+import random
+import statistics
+
+from homeassistant.util.rolling import RollingWindow
+
+
+def test_statistics_match_full_recompute():
+    """Test the incremental statistics match the statistics module."""
+    window = RollingWindow(25)
+    values = []
+
+    for _ in range(500):
+        value = random.uniform(-100, 100)
+        window.add(value)
+        values = (values + [value])[-25:]
+
+        assert len(window) == len(values)
+        assert abs(window.mean - statistics.mean(values)) < 1e-9
+        assert abs(window.total - sum(values)) < 1e-9
+        assert window.median == statistics.median(values)
+        assert window.min == min(values)
+        assert window.max == max(values)
+        assert (window.first, window.last) == (values[0], values[-1])
+        if len(values) > 1:
+            assert abs(window.variance - statistics.variance(values)) < 1e-6
+            assert abs(window.stdev - statistics.stdev(values)) < 1e-6
+
+
+def test_empty_and_single_value():
+    """Test the statistics that need more values are None."""
+    window = RollingWindow(5)
+    assert window.mean is None
+    assert window.median is None
+    assert window.min is None
+
+    window.add(4)
+    assert (window.mean, window.median, window.total) == (4, 4, 4)
+    assert window.variance is None
+    assert window.stdev is None
+
+    window.clear()
+    assert not window
+    assert window.items() == []
+
+
+def test_purge_by_age():
+    """Test values older than max_age are evicted."""
+    start = datetime(2018, 1, 1)
+    window = RollingWindow(10, timedelta(minutes=3))
+
+    for minute, value in enumerate([1, 2, 3, 4, 5]):
+        window.add(value, start + timedelta(minutes=minute))
+
+    window.purge(start + timedelta(minutes=5))
+    assert [value for value, _ in window.items()] == [3, 4, 5]
+    assert (window.min, window.max, window.mean) == (3, 5, 4)
+
+    window.purge(start + timedelta(minutes=10))
+    assert not window
+    assert window.total is None
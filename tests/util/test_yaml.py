@@ -1,5 +1,6 @@
 """Test Home Assistant yaml loader."""
 import io
+import json
 import os
 import unittest
 import logging
@@ -426,3 +427,97 @@ def test_duplicate_key(caplog):
     with patch_yaml_files(files):
         load_yaml_config_file(YAML_CONFIG_FILE)
     assert 'contains duplicate key' in caplog.text
+
+
+def test_parsed_files_are_cached():
+    """Test files are only parsed again when their content changed."""
+    files = {'cached.yaml': 'key:\n  - value'}
+
+    with patch_yaml_files(files), \
+            patch('homeassistant.util.yaml._LOADER',
+                  wraps=yaml._LOADER) as mock_loader:
+        first = yaml.load_yaml('cached.yaml')
+        first['key'].append('changed')
+        second = yaml.load_yaml('cached.yaml')
+        assert mock_loader.call_count == 1
+
+        files['cached.yaml'] = 'key: other'
+        assert yaml.load_yaml('cached.yaml') == {'key': 'other'}
+        assert mock_loader.call_count == 2
+
+    assert second == {'key': ['value']}
+    assert second['key'].__config_file__ == 'cached.yaml'
+    assert second['key'].__line__ == 1
+
+
+def test_yaml_cache_persisted(tmpdir):
+    """Test the cache of parsed files is saved without secrets."""
+    config_path = str(tmpdir.join(YAML_CONFIG_FILE))
+    cache_path = str(tmpdir.join('.yaml_cache'))
+    tmpdir.join(YAML_CONFIG_FILE).write(
+        'included: !include included.yaml\n'
+        'password: !secret password\n'
+        'env: !env_var YAML_CACHE_TEST default')
+    tmpdir.join('included.yaml').write('value: 1')
+    tmpdir.join(yaml.SECRET_YAML).write('password: secret')
+
+    yaml.clear_secret_cache()
+    config = yaml.load_yaml(config_path)
+    yaml.save_yaml_cache(cache_path)
+    yaml.clear_yaml_cache()
+    yaml.clear_secret_cache()
+
+    with open(cache_path, 'rb') as cache_file:
+        assert b'secret' not in cache_file.read().replace(b'!secret', b'')
+
+    yaml.load_yaml_cache(cache_path)
+
+    with patch('homeassistant.util.yaml._LOADER',
+               wraps=yaml._LOADER) as mock_loader, \
+            patch.dict(os.environ, {'YAML_CACHE_TEST': 'from env'}):
+        cached_config = yaml.load_yaml(config_path)
+
+    yaml.clear_secret_cache()
+
+    # Only the secrets are parsed again
+    assert mock_loader.call_count == 1
+    assert cached_config['included'] == config['included'] == {'value': 1}
+    assert cached_config['included'].__config_file__ == config_path
+    assert cached_config['password'] == 'secret'
+    assert config['env'] == 'default'
+    assert cached_config['env'] == 'from env'
+
+
+def test_yaml_cache_stores_plain_data(tmpdir, caplog):
+    """Test the cache is JSON and files with other values are skipped."""
+    config_path = str(tmpdir.join(YAML_CONFIG_FILE))
+    cache_path = str(tmpdir.join('.yaml_cache'))
+    tmpdir.join(YAML_CONFIG_FILE).write(
+        'list:\n  - 1\n  - name\nnull: ~\n1: true')
+    tmpdir.join('date.yaml').write('date: 2018-01-01')
+
+    yaml.clear_yaml_cache()
+    config = yaml.load_yaml(config_path)
+    yaml.load_yaml(str(tmpdir.join('date.yaml')))
+    yaml.save_yaml_cache(cache_path)
+    yaml.clear_yaml_cache()
+
+    with open(cache_path) as cache_file:
+        cache = json.load(cache_file)
+    assert list(cache['files']) == [config_path]
+
+    yaml.load_yaml_cache(cache_path)
+
+    with patch('homeassistant.util.yaml._LOADER') as mock_loader:
+        cached_config = yaml.load_yaml(config_path)
+
+    assert not mock_loader.called
+    assert cached_config == config
+    assert list(cached_config) == ['list', None, 1]
+    assert cached_config['list'].__line__ == config['list'].__line__ == 1
+
+    yaml.clear_yaml_cache()
+    tmpdir.join('.yaml_cache').write_binary(b'\x80\x04not json')
+    yaml.load_yaml_cache(cache_path)
+
+    assert 'Unable to load YAML cache' in caplog.text